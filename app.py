@@ -3,12 +3,17 @@ import secrets
 from datetime import timedelta
 
 from flask import Flask
+from loguru import logger
 
 from controllers import auth_controller
 from controllers import user_controller
 from controllers import book_controller
 from controllers import review_controller
 from controllers import public_controller
+from models import db
+from config import cover_config, session_config
+from services import cover_mirror, covers, fragment_cache, metrics, sessions
+from services.passwords import password_hasher
 
 # Gustavo de Souza
 # Israel Victor
@@ -16,7 +21,17 @@ from controllers import public_controller
 # Yasmin Trembulack
 
 app = Flask(__name__, template_folder="./views/templates", static_folder="./views/static")
-app.secret_key = secrets.token_hex(32)
+
+# Processos do bcrypt criados antes de qualquer thread da aplicação (fork seguro)
+password_hasher.start()
+
+# Chave fixa (SECRET_KEY) mantém sessões e links de senha válidos entre reinícios e workers
+app.secret_key = session_config['secret_key'] or secrets.token_hex(32)
+if not session_config['secret_key'] and not app.debug:
+    # Chave aleatória por processo: com vários workers, cada um assina os cookies com uma
+    # chave diferente e os usuários são deslogados ao cair em outro worker
+    logger.warning("SECRET_KEY não definida: usando uma chave aleatória deste processo. "
+                   "Defina SECRET_KEY em produção (sessões e links de senha dependem dela).")
 
 app.permanent_session_lifetime = timedelta(days=3)
 
@@ -27,8 +42,26 @@ app.config.update(
     MAIL_PASSWORD=os.getenv('MAIL_PASSWORD'),
     MAIL_USE_TLS=os.getenv('MAIL_USE_TLS', 'True') == 'True',
     MAIL_USE_SSL=os.getenv('MAIL_USE_SSL', 'False') == 'True',
+    # Corpo maior que isso é recusado (413) antes de ser lido; o import de livros aumenta o limite na própria rota
+    MAX_CONTENT_LENGTH=cover_config['max_upload_bytes'],
 )
 
+# Uma conexão/transação por request (commit ou rollback no teardown)
+db.init_app(app)
+
+# Sessão no servidor (MySQL ou arquivos): o cookie leva só o ID assinado
+sessions.init_app(app)
+
+# Miniaturas WebP/JPEG das capas e cópia local das capas externas nos templates
+covers.init_app(app)
+cover_mirror.init_app(app)
+
+# {% cache %} nos templates: cards e avaliações só são re-renderizados quando a entidade muda
+fragment_cache.init_app(app)
+
+# Métricas de requests, banco e caches em /metrics
+metrics.init_app(app)
+
 auth_controller.configure_routes(app)
 user_controller.configure_routes(app)
 book_controller.configure_routes(app)
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import sys
+import threading
+
+# Todos os clientes fazem login a partir de 127.0.0.1: sem isto o limite por IP do /login
+# (RATE_LIMIT_LOGIN_IP, 20/min) responde 429 depois de ~20 logins. Precisa vir antes de
+# qualquer import que carregue config.py; com --base-url, configure o servidor alvo igual.
+os.environ.setdefault("RATE_LIMIT_LOGIN_IP", "1000000/60")
+# queries/request vem do header Server-Timing do query log (contagem por request no servidor)
+os.environ.setdefault("QUERY_LOG_ENABLED", "True")
+os.environ.setdefault("QUERY_LOG_SERVER_TIMING", "True")
+
+from loguru import logger
+from werkzeug.serving import make_server
+
+from benchmarks.harness import Runner, compare, create_bench_user, drop_bench_user, to_json
+from benchmarks.scenarios import SCENARIOS, load_fixtures
+from services.seeding import Seeder
+
+
+# Benchmark de todas as rotas: vazão, p50/p95/p99 e queries SQL por request.
+#   python benchmark.py --seed-books 100000 --seed-users 10000 --seed-reviews 500000
+#   python benchmark.py --concurrency 16 --duration 20 --output resultado.json
+#   python benchmark.py --baseline benchmarks/baseline.json        -> exit 1 se houver regressão
+#   python benchmark.py --save-baseline benchmarks/baseline.json
+# queries/request vem do header Server-Timing de cada resposta; com --base-url, o servidor alvo
+# precisa de QUERY_LOG_ENABLED=True (e QUERY_LOG_SERVER_TIMING=True).
+parser = argparse.ArgumentParser(description="Benchmark das rotas da aplicação.")
+parser.add_argument("--base-url", help="aplicação já em execução (padrão: sobe o app neste processo)")
+parser.add_argument("--port", type=int, default=5055, help="porta do servidor embutido")
+parser.add_argument("--concurrency", type=int, default=8, help="clientes simultâneos por cenário")
+parser.add_argument("--duration", type=float, default=10, help="segundos medidos por cenário")
+parser.add_argument("--warmup", type=float, default=2, help="segundos de aquecimento (não medidos)")
+parser.add_argument("--calibration", type=int, default=20, help="requests sequenciais para medir queries/request (0 desliga)")
+parser.add_argument("--only", nargs="*", help="nomes dos cenários a executar")
+parser.add_argument("--include-writes", action="store_true", help="inclui cenários que gravam no banco")
+parser.add_argument("--seed", type=int, help="semente para sorteio de IDs e dados gerados")
+parser.add_argument("--seed-users", type=int, default=0)
+parser.add_argument("--seed-books", type=int, default=0)
+parser.add_argument("--seed-reviews", type=int, default=0)
+parser.add_argument("--seed-workers", type=int, default=4)
+parser.add_argument("--output", help="grava o resultado em JSON neste arquivo")
+parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+parser.add_argument("--tolerance", type=float, default=0.15, help="variação aceita em p95/vazão (0.15 = 15%%)")
+parser.add_argument("--save-baseline", help="grava o resultado como novo baseline")
+args = parser.parse_args()
+
+# --- dados ---
+if args.seed_users or args.seed_books or args.seed_reviews:
+    seeder = Seeder(workers=args.seed_workers, seed=args.seed)
+    seeder.seed_users(args.seed_users)
+    seeder.seed_books(args.seed_books)
+    seeder.seed_reviews(args.seed_reviews)
+
+# --- servidor ---
+server = None
+base_url = args.base_url
+if not base_url:
+    from app import app
+    server = make_server("127.0.0.1", args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-server", daemon=True).start()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+bench_user = create_bench_user()
+results = []
+try:
+    runner = Runner(base_url, load_fixtures(bench_user), args.concurrency, args.duration,
+                    args.warmup, args.calibration, args.seed)
+    for scenario in SCENARIOS:
+        if args.only and scenario.name not in args.only:
+            continue
+        if scenario.writes and not args.include_writes:
+            continue
+        result = runner.run(scenario)
+        results.append(result)
+        logger.info(f"{result.name}: {result.throughput}/s | p50 {result.p50_ms}ms | p95 {result.p95_ms}ms | "
+                    f"p99 {result.p99_ms}ms | erros {result.errors} | queries/req {result.queries_per_request}")
+finally:
+    drop_bench_user(bench_user)
+    if server:
+        server.shutdown()
+
+settings = {key: getattr(args, key) for key in ("concurrency", "duration", "warmup", "calibration", "include_writes")}
+report = to_json(results, settings)
+print(report)
+for path in filter(None, (args.output, args.save_baseline)):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(report)
+
+if args.baseline:
+    with open(args.baseline, encoding="utf-8") as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    for regression in regressions:
+        logger.error(f"Regressão: {regression}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,235 @@
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+import bcrypt
+import requests
+from loguru import logger
+
+from benchmarks.scenarios import BENCH_PASSWORD, Fixtures, Scenario
+from models.db import get_cursor
+from models.review import Review
+
+# Header Server-Timing do query log (models/query_log.py): db;dur=1.23;desc="4 queries"
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+# ==========================================================
+# 📊 Resultado por cenário
+# ==========================================================
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    duration: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    queries_per_request: Optional[float] = None
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Percentil por posto mais próximo (samples já ordenadas)."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))]
+
+
+def summarize(name: str, latencies: List[float], errors: int, duration: float) -> ScenarioResult:
+    samples = sorted(latencies)
+    ms = lambda value: round(value * 1000, 2)
+    return ScenarioResult(
+        name=name,
+        requests=len(samples),
+        errors=errors,
+        duration=round(duration, 2),
+        throughput=round(len(samples) / duration, 1) if duration else 0.0,
+        p50_ms=ms(percentile(samples, 0.50)),
+        p95_ms=ms(percentile(samples, 0.95)),
+        p99_ms=ms(percentile(samples, 0.99)),
+        max_ms=ms(samples[-1]) if samples else 0.0,
+    )
+
+
+# ==========================================================
+# 👤 Usuário do benchmark (admin) — criado e removido a cada execução
+# ==========================================================
+def create_bench_user() -> Dict[str, str]:
+    user = {"id": str(uuid4()), "username": f"bench_{uuid4().hex[:8]}"}
+    hashed_password = bcrypt.hashpw(BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    with get_cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (id, username, password, email, role) VALUES (%s, %s, %s, %s, 'admin')",
+            (user["id"], user["username"], hashed_password, f"{user['username']}@example.com"),
+        )
+    return user
+
+
+def drop_bench_user(user: Dict[str, str]) -> None:
+    # Remove as avaliações pelo model (mantém book_stats) antes do usuário
+    with get_cursor() as cursor:
+        cursor.execute("SELECT id FROM reviews WHERE user_id = %s", (user["id"],))
+        review_ids = [row["id"] for row in cursor.fetchall()]
+    for review_id in review_ids:
+        Review.delete_review(review_id)
+    with get_cursor() as cursor:
+        cursor.execute("DELETE FROM users WHERE id = %s", (user["id"],))
+
+
+def request_queries(response: requests.Response) -> Optional[int]:
+    """Comandos SQL do request, contados pelo próprio servidor (None sem QUERY_LOG_ENABLED)."""
+    match = _SERVER_TIMING_QUERIES.search(response.headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else None
+
+
+# ==========================================================
+# 🚀 Execução
+# ==========================================================
+class Runner:
+    """
+    Dispara cada cenário com N clientes concorrentes (uma requests.Session por cliente)
+    durante `duration` segundos e mede latência, vazão e erros.
+    """
+
+    def __init__(self, base_url: str, fixtures: Fixtures, concurrency: int = 8, duration: float = 10,
+                 warmup: float = 2, calibration: int = 20, seed: Optional[int] = None):
+        self.base_url = base_url.rstrip("/")
+        self.fixtures = fixtures
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.calibration = calibration
+        self.seed = seed
+
+    def _client(self, scenario: Scenario) -> requests.Session:
+        client = requests.Session()
+        if scenario.login:
+            response = client.post(
+                f"{self.base_url}/login",
+                data={"email_username": self.fixtures.bench_user["username"], "password": BENCH_PASSWORD},
+                allow_redirects=False,
+            )
+            if response.status_code != 302:
+                raise RuntimeError(f"Login do usuário de benchmark falhou ({response.status_code})")
+        return client
+
+    def _send(self, client: requests.Session, scenario: Scenario, rng: random.Random) -> requests.Response:
+        url = self.base_url + scenario.path(self.fixtures, rng)
+        data = scenario.data(self.fixtures, rng) if scenario.data else None
+        response = client.request(scenario.method, url, data=data, allow_redirects=False)
+        response.content  # lê o corpo inteiro (inclui o tempo de transferência)
+        return response
+
+    def _request(self, client: requests.Session, scenario: Scenario, rng: random.Random) -> bool:
+        return self._send(client, scenario, rng).status_code in scenario.ok_status
+
+    def _worker(self, scenario: Scenario, index: int, until: float, measure_from: float,
+                latencies: List[float], errors: List[int]) -> None:
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        try:
+            client = self._client(scenario)
+        except Exception as e:
+            # Cliente que nem começou conta como erro (senão o cenário sairia com menos requests e 0 erros)
+            logger.error(f"Cliente {index} de {scenario.name} não iniciou: {e}")
+            errors.append(1)
+            return
+        local_latencies: List[float] = []
+        local_errors = 0
+        while True:
+            started = time.perf_counter()
+            if started >= until:
+                break
+            try:
+                ok = self._request(client, scenario, rng)
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            if started >= measure_from:
+                local_latencies.append(elapsed)
+                local_errors += not ok
+        # Junta só no final: sem lock por request
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+    def queries_per_request(self, scenario: Scenario) -> Optional[float]:
+        """
+        Média de comandos SQL por request, lida do header Server-Timing de cada resposta
+        (contagem do próprio request: threads em segundo plano e outros clientes do MySQL não entram).
+        """
+        if not self.calibration:
+            return None
+        rng = random.Random(self.seed)
+        counts: List[int] = []
+        try:
+            client = self._client(scenario)
+            for _ in range(self.calibration):
+                count = request_queries(self._send(client, scenario, rng))
+                if count is None:
+                    logger.warning(f"{scenario.name}: resposta sem Server-Timing; "
+                                   f"ative QUERY_LOG_ENABLED no servidor para medir queries/request")
+                    return None
+                counts.append(count)
+        except Exception as e:
+            logger.warning(f"Não foi possível medir queries de {scenario.name}: {e}")
+            return None
+        return round(sum(counts) / len(counts), 2)
+
+    def run(self, scenario: Scenario) -> ScenarioResult:
+        latencies: List[float] = []
+        errors: List[int] = []
+        started = time.perf_counter()
+        measure_from = started + self.warmup
+        until = measure_from + self.duration
+        threads = [
+            threading.Thread(target=self._worker, args=(scenario, i, until, measure_from, latencies, errors),
+                             name=f"bench-{scenario.name}-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        result = summarize(scenario.name, latencies, sum(errors), self.duration)
+        result.queries_per_request = self.queries_per_request(scenario)
+        return result
+
+
+# ==========================================================
+# 📈 Comparação com o baseline
+# ==========================================================
+def compare(results: List[ScenarioResult], baseline: Dict[str, Any], tolerance: float = 0.15) -> List[str]:
+    """Lista as regressões em relação ao baseline (p95, vazão, queries/request e erros)."""
+    previous = {item["name"]: item for item in baseline.get("scenarios", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result.name)
+        if not old:
+            continue
+        if old["p95_ms"] and result.p95_ms > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result.name}: p95 {old['p95_ms']}ms → {result.p95_ms}ms")
+        if old["throughput"] and result.throughput < old["throughput"] * (1 - tolerance):
+            regressions.append(f"{result.name}: vazão {old['throughput']}/s → {result.throughput}/s")
+        old_queries = old.get("queries_per_request")
+        if old_queries is not None and result.queries_per_request is not None \
+                and result.queries_per_request > old_queries + 0.5:
+            regressions.append(f"{result.name}: queries/request {old_queries} → {result.queries_per_request}")
+        if result.errors > old.get("errors", 0):
+            regressions.append(f"{result.name}: erros {old.get('errors', 0)} → {result.errors}")
+    return regressions
+
+
+def to_json(results: List[ScenarioResult], settings: Dict[str, Any]) -> str:
+    return json.dumps({
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": settings,
+        "scenarios": [asdict(result) for result in results],
+    }, indent=2, ensure_ascii=False)
@@ -0,0 +1,81 @@
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from models.db import get_cursor
+
+# Senha do usuário criado pelo benchmark (admin, para cobrir as rotas restritas)
+BENCH_PASSWORD = "bench-senha-123"
+
+
+@dataclass
+class Fixtures:
+    """IDs reais do banco sorteados pelos cenários (amostra, não a tabela inteira)."""
+    book_ids: List[str]
+    categories: List[str]
+    words: List[str]
+    bench_user: Dict[str, str]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[Fixtures, random.Random], str]
+    data: Optional[Callable[[Fixtures, random.Random], Dict[str, Any]]] = None
+    login: bool = False
+    # Cenários que escrevem no banco só rodam com --include-writes
+    writes: bool = False
+    ok_status: tuple = (200, 302, 304)
+
+
+def _book(fx: Fixtures, rng: random.Random) -> str:
+    return rng.choice(fx.book_ids)
+
+
+# Uma entrada por rota dos controllers (as destrutivas — update/delete — ficam de fora)
+SCENARIOS: List[Scenario] = [
+    Scenario("index", "GET", lambda fx, rng: "/"),
+    Scenario("contact", "GET", lambda fx, rng: "/contact"),
+    Scenario("get_books", "GET", lambda fx, rng: "/get_books"),
+    Scenario("get_books_page", "GET", lambda fx, rng: f"/get_books?page={rng.randint(2, 50)}", login=True),
+    Scenario("search", "GET", lambda fx, rng: f"/search?q={rng.choice(fx.words)}"),
+    Scenario("search_category", "GET",
+             lambda fx, rng: f"/search?q={rng.choice(fx.words)}&category={rng.choice(fx.categories)}"),
+    Scenario("suggest", "GET", lambda fx, rng: f"/suggest?q={rng.choice(fx.words)[:3]}"),
+    Scenario("get_book", "GET", lambda fx, rng: f"/get_book/{_book(fx, rng)}"),
+    Scenario("download_sample", "GET", lambda fx, rng: f"/download_sample/{_book(fx, rng)}"),
+    Scenario("login_page", "GET", lambda fx, rng: "/login"),
+    Scenario("login", "POST", lambda fx, rng: "/login",
+             data=lambda fx, rng: {"email_username": fx.bench_user["username"], "password": BENCH_PASSWORD}),
+    Scenario("forgot_password_page", "GET", lambda fx, rng: "/forgot_password"),
+    Scenario("create_user_page", "GET", lambda fx, rng: "/create_user"),
+    Scenario("get_users", "GET", lambda fx, rng: "/get_users", login=True),
+    Scenario("get_user", "GET", lambda fx, rng: f"/get_user/{fx.bench_user['id']}", login=True),
+    Scenario("create_book_page", "GET", lambda fx, rng: "/create_book", login=True),
+    Scenario("create_review_page", "GET", lambda fx, rng: f"/create_review/{_book(fx, rng)}", login=True),
+    Scenario("create_review", "POST", lambda fx, rng: f"/create_review/{_book(fx, rng)}", login=True, writes=True,
+             data=lambda fx, rng: {"rating": rng.randint(1, 5), "comment": "Avaliação gerada pelo benchmark."}),
+]
+
+
+def load_fixtures(bench_user: Dict[str, str], sample_size: int = 1000) -> Fixtures:
+    with get_cursor() as cursor:
+        # Amostra barata: IDs a partir de um ponto aleatório do índice primário
+        cursor.execute("SELECT id FROM books WHERE id >= %s ORDER BY id LIMIT %s",
+                       (f"{random.randrange(16):x}", sample_size))
+        book_ids = [row["id"] for row in cursor.fetchall()]
+        if len(book_ids) < sample_size:
+            cursor.execute("SELECT id FROM books ORDER BY id LIMIT %s", (sample_size,))
+            book_ids = [row["id"] for row in cursor.fetchall()]
+        if not book_ids:
+            raise ValueError("Nenhum livro no banco: rode com --seed-books (ou insert_random_authors.py seed).")
+
+        cursor.execute("SELECT DISTINCT category FROM books WHERE category IS NOT NULL")
+        categories = [row["category"] for row in cursor.fetchall()] or ["Fiction"]
+
+        cursor.execute("SELECT title FROM books WHERE id IN ({})".format(", ".join(["%s"] * len(book_ids[:200]))),
+                       book_ids[:200])
+        words = [w for row in cursor.fetchall() for w in row["title"].split() if len(w) >= 4 and w.isalpha()]
+
+    return Fixtures(book_ids, categories, words or ["livro"], bench_user)
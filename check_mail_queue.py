@@ -0,0 +1,101 @@
+import argparse
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from flask_mail import Mail
+
+from services.mail_queue import MailQueue
+
+
+# Testa a fila de e-mails de ponta a ponta contra um SMTP local (requer o pacote `aiosmtpd`):
+# enfileira mensagens, recusa as primeiras entregas (451) para exercitar o retry com backoff,
+# envia algumas para um destinatário recusado (550) que não pode atrasar as demais
+# e confere se cada mensagem válida chegou exatamente uma vez.
+#   python check_mail_queue.py
+#   python check_mail_queue.py --messages 200 --workers 4 --reject 5 --bad 10
+parser = argparse.ArgumentParser(description="Teste da fila de e-mails com um servidor aiosmtpd local.")
+parser.add_argument("--messages", type=int, default=20, help="mensagens enfileiradas")
+parser.add_argument("--workers", type=int, default=2, help="threads de entrega")
+parser.add_argument("--reject", type=int, default=3, help="entregas recusadas com 451 antes de aceitar")
+parser.add_argument("--bad", type=int, default=3, help="mensagens para um destinatário recusado com 550")
+parser.add_argument("--port", type=int, default=8025, help="porta do SMTP local")
+parser.add_argument("--timeout", type=float, default=60, help="segundos para todas as mensagens chegarem")
+args = parser.parse_args()
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    sys.exit("Instale o aiosmtpd para rodar este teste: pip install aiosmtpd")
+
+
+BAD_RECIPIENT = "invalido@localhost"
+
+
+class Inbox:
+    """Handler do aiosmtpd: recusa as primeiras entregas e o destinatário inválido e guarda os assuntos recebidos."""
+
+    def __init__(self, reject: int):
+        self.reject = reject
+        self.subjects = []
+        self.lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == BAD_RECIPIENT:
+            return "550 No such user (simulated)"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            if self.reject > 0:
+                self.reject -= 1
+                return "451 Temporary failure (simulated)"
+            content = envelope.content.decode("utf-8", errors="replace")
+            subject = next((line[9:] for line in content.splitlines() if line.startswith("Subject: ")), "")
+            self.subjects.append(subject)
+        return "250 OK"
+
+
+inbox = Inbox(args.reject)
+smtp = Controller(inbox, hostname="localhost", port=args.port)
+smtp.start()
+
+app = Flask(__name__)
+app.config.update(MAIL_SERVER="localhost", MAIL_PORT=args.port, MAIL_USE_TLS=False, MAIL_USE_SSL=False,
+                  MAIL_DEFAULT_SENDER="litscore@localhost")
+
+with tempfile.TemporaryDirectory() as spool_dir:
+    # Backoff curto: as mensagens recusadas voltam para a fila em décimos de segundo
+    queue = MailQueue(spool_dir, workers=args.workers, max_attempts=args.reject + 3,
+                      backoff=0.1, max_backoff=1, poll_interval=0.1)
+    queue.init_app(app, Mail(app))
+
+    started = time.perf_counter()
+    expected = {f"Teste {index}" for index in range(args.messages)}
+    for index in range(args.bad):
+        queue.enqueue(f"Inválida {index}", [BAD_RECIPIENT], "Destinatário recusado.")
+    for subject in sorted(expected):
+        queue.enqueue(subject, ["leitor@localhost"], "Mensagem de teste da fila.")
+    enqueued = time.perf_counter() - started
+
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline:
+        with inbox.lock:
+            if len(inbox.subjects) >= len(expected):
+                break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    time.sleep(0.5)  # entregas em dobro chegariam logo em seguida
+    queue.stop()
+    smtp.stop()
+
+    received = list(inbox.subjects)
+    missing = expected - set(received)
+    duplicated = len(received) - len(set(received))
+    print(f"{args.messages + args.bad} enfileiradas em {enqueued * 1000:.1f} ms | {len(set(received))} entregues "
+          f"em {elapsed:.2f}s | {duplicated} duplicadas | {len(missing)} faltando | "
+          f"{queue.depth()} na fila (recusadas aguardando nova tentativa)")
+    sys.exit(0 if not missing and not duplicated else 1)
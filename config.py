@@ -12,3 +12,157 @@ db_config = {
     "database": os.getenv("DB_NAME"),
     "port": int(os.getenv("DB_PORT", 3306))
 }
+
+# Pool de conexões reutilizáveis usado por models.db.get_cursor
+pool_config = {
+    "size": int(os.getenv("DB_POOL_SIZE", 5)),                    # conexões mantidas abertas
+    "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", 10)),   # conexões extras em picos
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),           # espera máxima no checkout (s)
+    "recycle": int(os.getenv("DB_POOL_RECYCLE", 3600)),           # tempo de vida máximo (s)
+    "pre_ping": os.getenv("DB_POOL_PRE_PING", "True") == "True",  # health check no checkout
+    "ping_interval": float(os.getenv("DB_POOL_PING_INTERVAL", 5)) # só pinga conexões ociosas há mais tempo (s)
+}
+
+# Cache de metadados do catálogo (categorias etc.)
+cache_config = {
+    "ttl": float(os.getenv("CACHE_TTL", 300)),
+    "max_entries": int(os.getenv("CACHE_MAX_ENTRIES", 1024)),
+    "redis_url": os.getenv("CACHE_REDIS_URL"),  # opcional: backend compartilhado entre workers
+}
+
+# Páginas públicas renderizadas para visitantes anônimos (services/response_cache.py); usa o
+# CACHE_REDIS_URL quando configurado, senão memória de cada worker
+response_cache_config = {
+    "enabled": os.getenv("RESPONSE_CACHE_ENABLED", "True") == "True",
+    "ttl": float(os.getenv("RESPONSE_CACHE_TTL", 60)),                 # limite de atraso entre workers sem Redis
+    "max_entries": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 512)),
+    "max_age": int(os.getenv("RESPONSE_CACHE_MAX_AGE", 0)),            # Cache-Control; 0 = sempre revalidar (ETag)
+}
+
+# Fragmentos de template em cache ({% cache %}: cards de livros, lista de avaliações); memória de cada worker
+fragment_cache_config = {
+    "enabled": os.getenv("FRAGMENT_CACHE_ENABLED", "True") == "True",
+    "max_bytes": int(os.getenv("FRAGMENT_CACHE_MAX_MB", 16)) * 1024 * 1024,
+    "max_entries": int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", 20_000)),
+    "ttl": float(os.getenv("FRAGMENT_CACHE_TTL", 3600)),
+}
+
+# Índice em memória do autocomplete (/suggest)
+suggest_config = {
+    "max_entries": int(os.getenv("SUGGEST_MAX_ENTRIES", 2_000_000)),
+    "max_bytes": int(os.getenv("SUGGEST_MAX_MB", 256)) * 1024 * 1024,  # orçamento de memória
+    "rebuild_on_startup": os.getenv("SUGGEST_REBUILD_ON_STARTUP", "True") == "True",
+}
+
+# Cache em disco dos PDFs de amostra (/download_sample)
+sample_config = {
+    "cache_dir": os.getenv("SAMPLE_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "samples"),
+    "max_age": int(os.getenv("SAMPLE_MAX_AGE", 3600)),  # Cache-Control do navegador (s)
+}
+
+# Fila persistente de e-mails (services/mail_queue.py)
+mail_queue_config = {
+    "spool_dir": os.getenv("MAIL_SPOOL_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool", "mail"),
+    "workers": int(os.getenv("MAIL_WORKERS", 2)),
+    "max_attempts": int(os.getenv("MAIL_MAX_ATTEMPTS", 5)),
+    "backoff": float(os.getenv("MAIL_RETRY_BACKOFF", 30)),   # 30s, 60s, 120s...
+    "max_backoff": float(os.getenv("MAIL_RETRY_MAX_BACKOFF", 3600)),
+}
+
+
+def _widths(name: str, default: str):
+    """"240,480" → (240, 480)."""
+    return tuple(int(width) for width in (os.getenv(name) or default).split(","))
+
+
+# Capas dos livros (services/covers.py): variantes 1x/2x para a grade e para a página de detalhes,
+# gravadas em disco ("local") ou em um bucket S3/compatível ("s3", requer boto3)
+cover_config = {
+    "backend": os.getenv("COVER_STORAGE", "local"),
+    "upload_dir": os.getenv("COVER_UPLOAD_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "views", "static", "cover_uploads"),
+    "public_url": os.getenv("COVER_PUBLIC_URL") or None,   # URL base das capas (CDN); padrão: /static ou o bucket
+    "s3_bucket": os.getenv("COVER_S3_BUCKET"),
+    "s3_prefix": os.getenv("COVER_S3_PREFIX", "cover_uploads/"),
+    "s3_endpoint_url": os.getenv("COVER_S3_ENDPOINT_URL") or None,  # MinIO etc.; credenciais via AWS_* do boto3
+    "s3_region": os.getenv("COVER_S3_REGION") or None,
+    "max_upload_bytes": int(os.getenv("COVER_MAX_UPLOAD_MB", 10)) * 1024 * 1024,
+    "thumb_widths": _widths("COVER_THUMB_WIDTHS", "240,480"),
+    "detail_widths": _widths("COVER_DETAIL_WIDTHS", "450,900"),
+    "quality": int(os.getenv("COVER_QUALITY", 80)),        # WebP/JPEG
+    "workers": int(os.getenv("COVER_WORKERS", 2)),         # threads que geram as variantes
+    "missing_ttl": float(os.getenv("COVER_MISSING_TTL", 300)),        # s até consultar de novo variantes ausentes
+    "release_grace": float(os.getenv("COVER_RELEASE_GRACE", 3600)),   # capas gravadas/reusadas há menos tempo ficam para a varredura
+}
+
+# Cópia local das capas com URL externa (services/cover_mirror.py)
+cover_mirror_config = {
+    "enabled": os.getenv("COVER_MIRROR_ENABLED", "True") == "True",
+    "index_dir": os.getenv("COVER_MIRROR_INDEX_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "cover_mirror"),
+    "workers": int(os.getenv("COVER_MIRROR_WORKERS", 4)),              # downloads simultâneos
+    "max_pending": int(os.getenv("COVER_MIRROR_MAX_PENDING", 200)),
+    "max_bytes": int(os.getenv("COVER_MIRROR_MAX_MB", 5)) * 1024 * 1024,
+    "timeout": float(os.getenv("COVER_MIRROR_TIMEOUT", 10)),
+    "revalidate_after": float(os.getenv("COVER_MIRROR_REVALIDATE_AFTER", 7 * 86400)),  # GET condicional (ETag)
+    "retry_after": float(os.getenv("COVER_MIRROR_RETRY_AFTER", 3600)),                 # depois de uma falha
+}
+
+# Importação em massa de livros (uploads do endpoint administrativo)
+import_config = {
+    "upload_dir": os.getenv("IMPORT_UPLOAD_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool", "imports"),
+    "batch_size": int(os.getenv("IMPORT_BATCH_SIZE", 1000)),
+    "max_upload_bytes": int(os.getenv("IMPORT_MAX_UPLOAD_MB", 512)) * 1024 * 1024,
+}
+
+# Instrumentação de consultas por request (models/query_log.py); desligada não custa nada
+query_log_config = {
+    "enabled": os.getenv("QUERY_LOG_ENABLED", "False") == "True",
+    "slow_ms": float(os.getenv("QUERY_LOG_SLOW_MS", 200)),               # consultas acima disso vão para o log
+    "slow_log_path": os.getenv("QUERY_LOG_SLOW_PATH", "logs/slow_queries.log"),
+    "n_plus_one_threshold": int(os.getenv("QUERY_LOG_N_PLUS_ONE", 5)),   # mesma consulta repetida mais que K vezes
+    "server_timing": os.getenv("QUERY_LOG_SERVER_TIMING", "True") == "True",
+    "max_records": int(os.getenv("QUERY_LOG_MAX_RECORDS", 200)),         # consultas detalhadas guardadas por request
+}
+
+# Endpoint /metrics (services/metrics.py); METRICS_TOKEN exige "Authorization: Bearer <token>".
+# Sem token fica desligado por padrão: pool, rotas e latências não ficam públicos
+_metrics_token = os.getenv("METRICS_TOKEN") or None
+metrics_config = {
+    "enabled": os.getenv("METRICS_ENABLED", "True" if _metrics_token else "False") == "True",
+    "token": _metrics_token,
+}
+
+# Hash de senhas (services/passwords.py): pool de processos com fila limitada
+password_config = {
+    "rounds": int(os.getenv("BCRYPT_ROUNDS", 12)),                       # custo; hashes antigos são refeitos no login
+    "workers": int(os.getenv("PASSWORD_WORKERS") or os.cpu_count() or 2),  # 0 = threads em vez de processos
+    "max_pending": int(os.getenv("PASSWORD_MAX_PENDING") or 4 * (os.cpu_count() or 2)),
+    "queue_timeout": float(os.getenv("PASSWORD_QUEUE_TIMEOUT", 2)),      # espera máxima por vaga (s)
+}
+
+
+def _rate(name: str, default: str):
+    """"5/900" → (5 tentativas, janela de 900s)."""
+    limit, period = os.getenv(name, default).split("/")
+    return int(limit), float(period)
+
+
+# Rate limit (services/rate_limit.py); RATE_LIMIT_REDIS_URL compartilha os contadores entre workers
+rate_limit_config = {
+    "login_ip": _rate("RATE_LIMIT_LOGIN_IP", "20/60"),                # tentativas por IP
+    "login_account": _rate("RATE_LIMIT_LOGIN_ACCOUNT", "5/900"),      # falhas por conta (email/username)
+    "forgot_password_ip": _rate("RATE_LIMIT_FORGOT_PASSWORD", "5/900"),
+    "create_user_ip": _rate("RATE_LIMIT_CREATE_USER", "5/3600"),
+    "max_keys": int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000)),       # chaves em memória (LRU)
+    "redis_url": os.getenv("RATE_LIMIT_REDIS_URL") or None,
+    "trust_proxy": os.getenv("RATE_LIMIT_TRUST_PROXY", "False") == "True",  # usa X-Forwarded-For
+}
+
+# Sessões no servidor (services/sessions.py): "mysql" (tabela sessions, migração 0004), "file" ou "cookie"
+session_config = {
+    "secret_key": os.getenv("SECRET_KEY") or None,  # fixa: sessões sobrevivem a reinícios e valem em todos os workers
+    "backend": os.getenv("SESSION_BACKEND", "mysql"),
+    "file_dir": os.getenv("SESSION_FILE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool", "sessions"),
+    "refresh_interval": float(os.getenv("SESSION_REFRESH_INTERVAL", 300)),  # grava a renovação do prazo no máximo a cada N s
+    "cleanup_interval": float(os.getenv("SESSION_CLEANUP_INTERVAL", 600)),
+    "cleanup_batch": int(os.getenv("SESSION_CLEANUP_BATCH", 1000)),         # linhas removidas por transação
+}
@@ -1,10 +1,15 @@
-import bcrypt
-
-from flask_mail import Mail, Message
+from flask_mail import Mail
 from flask import Flask, flash, redirect, render_template, request, session, url_for
 
 from loguru import logger
+from models.db import end_transaction
 from models.user import User
+from services.mail_queue import mail_queue
+from services.passwords import PasswordServiceBusy, password_hasher
+from services.rate_limit import (
+    forgot_password_limiter, login_account_limiter, login_ip_limiter, rate_limit, rejected,
+)
+from services.sessions import regenerate_session
 
 from itsdangerous import URLSafeTimedSerializer
 
@@ -20,6 +25,9 @@ def configure_routes(app: Flask):
     # ==========================================================
     mail = Mail(app)
 
+    # Entrega assíncrona: o request só grava na fila e os workers enviam via SMTP
+    mail_queue.init_app(app, mail)
+
 
     # ==========================================================
     # 🔑 Gerador de tokens seguros
@@ -33,6 +41,7 @@ def configure_routes(app: Flask):
     # 🔐 LOGIN - Página e autenticação de usuários
     # ==========================================================
     @app.route('/login', methods=['GET', 'POST'])
+    @rate_limit(login_ip_limiter, 'login.html')
     def login():
         if request.method == 'GET':
             return render_template('login.html')
@@ -46,25 +55,35 @@ def configure_routes(app: Flask):
                 flash('Preencha todos os campos.', 'warning')
                 return render_template('login.html')
 
-            # --- busca por email OU username ---
-            user = (
-                User.get_user_by_field('email', email_username)
-                or User.get_user_by_field('username', email_username)
-            )
+            # --- conta com falhas demais: recusa antes de consultar o banco/bcrypt ---
+            account = email_username.casefold()
+            if not login_account_limiter.allowed(account):
+                return rejected(login_account_limiter, 'login.html')
+
+            # --- busca por email OU username (uma única consulta) ---
+            matches = User.find_by_identity(email=email_username, username=email_username)
+            user = matches.get('email') or matches.get('username')
 
             # --- valida senha ---
-            if not user:
+            # bcrypt roda no pool de processos (fora da thread do request); a conexão volta ao
+            # pool antes da espera e só é retirada de novo para gravar a sessão
+            end_transaction()
+            if not user or not password_hasher.verify(password, user.password):
+                login_account_limiter.hit(account)
                 flash('Credenciais incorretas.', 'error')
                 return render_template('login.html')
 
-            hashed_password = user.password.encode('utf-8')
-            input_password = password.encode('utf-8')
+            login_account_limiter.reset(account)
 
-            if not bcrypt.checkpw(input_password, hashed_password):
-                flash('Credenciais incorretas.', 'error')
-                return render_template('login.html')
+            # --- custo do hash desatualizado: refaz em segundo plano ---
+            if password_hasher.needs_rehash(user.password):
+                user_id = user.id
+                password_hasher.rehash_in_background(
+                    password, lambda hashed: User.update_password(user_id, hashed)
+                )
 
-            # --- autenticação bem-sucedida ---
+            # --- autenticação bem-sucedida (novo ID de sessão) ---
+            regenerate_session(session)
             session['user'] = {
                 "id": user.id,
                 "username": user.username,
@@ -76,6 +95,10 @@ def configure_routes(app: Flask):
             flash(f'Bem-vindo(a), {user.username}!', 'success')
             return redirect(url_for('get_books'))
 
+        except PasswordServiceBusy:
+            flash('Muitos acessos no momento. Tente novamente em instantes.', 'warning')
+            return render_template('login.html'), 503
+
         except Exception as e:
             logger.exception(f'Erro ao fazer login: {e}')
             flash('Erro inesperado ao tentar fazer login.', 'error')
@@ -96,6 +119,7 @@ def configure_routes(app: Flask):
     # 🔄 RECUPERAÇÃO DE SENHA - Etapa 1: Solicitação de redefinição
     # ==========================================================
     @app.route('/forgot_password', methods=['GET', 'POST'])
+    @rate_limit(forgot_password_limiter, 'password.html', forgot_password=True)
     def forgot_password():
         """
         Página de recuperação de senha:
@@ -129,7 +153,8 @@ def configure_routes(app: Flask):
             # ==========================================================
             # 📧 Envio do e-mail de recuperação (via Mailtrap: https://mailtrap.io/home)
             # ==========================================================
-            msg = Message(
+            # Enfileirado no spool local; a entrega (com retry) acontece fora do request
+            mail_queue.enqueue(
                 subject="Recuperação de senha - LitScore",
                 recipients=[user.email],
                 body=f"Redefinição de senha\n\nAcesse: {reset_url}\n\nSe você não solicitou, ignore.",
@@ -137,8 +162,6 @@ def configure_routes(app: Flask):
                 sender=app.config['MAIL_USERNAME']
             )
 
-            mail.send(msg)
-
             flash("Se o e-mail existir, você receberá um link para redefinir sua senha.", "info")
             return redirect(url_for('login'))
 
@@ -173,10 +196,13 @@ def configure_routes(app: Flask):
                 return redirect(url_for('reset_password', token=token))
 
             # --- Atualiza senha no banco (com hash seguro) ---
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            try:
+                hashed_password = password_hasher.hash(password)
+            except PasswordServiceBusy:
+                flash("Muitos acessos no momento. Tente novamente em instantes.", "warning")
+                return redirect(url_for('reset_password', token=token))
             user = User.get_user_by_field('email', email)
-            user.password = hashed_password
-            User.update_user(user)
+            User.update_password(user.id, hashed_password)
 
             flash("Senha atualizada com sucesso!", "success")
             return redirect(url_for('login'))
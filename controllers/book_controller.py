@@ -1,35 +1,39 @@
 import os
-from io import BytesIO
+import threading
 from uuid import uuid4
 
 import requests
 from faker import Faker
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
 from flask import (
     Flask,
+    abort,
     flash,
-    make_response,
+    jsonify,
     redirect,
     render_template,
     request,
+    send_file,
     session,
     url_for
 )
 
-from models.book import Book, BookEntity
+from config import cover_config, import_config, sample_config, suggest_config
+from models.book import Book, BookEntity, DuplicateUpcError
+from models.db import on_commit, savepoint
 from models.review import Review
-from models.user import User
+from models.suggest import suggest_index
+from services.book_import import FORMATS, ON_DUPLICATE, detect_format, get_import_job, start_import_job
+from services.covers import InvalidCover, cover_pipeline
+from services.pdf_samples import sample_cache
+from services.response_cache import response_cache
 
 
 # ==============================
 # ⚙️ CONFIGURAÇÕES INICIAIS
 # ==============================
 fake = Faker("pt_BR")  # gera texto fictício em português
-UPLOAD_FOLDER = r'C:\Users\yastr\Desktop\Projects\Final-Project-BD6P\views\static\cover_uploads'
 
 
 def configure_routes(app: Flask):
@@ -37,17 +41,36 @@ def configure_routes(app: Flask):
     Configura todas as rotas relacionadas a livros.
     """
 
+    # Carrega o índice do autocomplete em segundo plano (não atrasa o startup)
+    if suggest_config['rebuild_on_startup']:
+        threading.Thread(target=suggest_index.rebuild, name='suggest-rebuild', daemon=True).start()
+
+
+    # ==========================================================
+    # 🚫 Upload acima do limite (MAX_CONTENT_LENGTH / request.max_content_length)
+    # ==========================================================
+    @app.errorhandler(RequestEntityTooLarge)
+    def upload_too_large(error):
+        if request.endpoint == 'import_books':
+            return jsonify({"error": "Arquivo maior que o limite permitido."}), 413
+        flash('Arquivo maior que o limite permitido.', 'warning')
+        return redirect(request.referrer or url_for('get_books'))
+
 
     # ==========================================================
     # 📚 GET - Lista todos os livros (com paginação)
     # ==========================================================
     @app.route('/get_books', methods=['GET'])
+    @response_cache.cached
     def get_books():
         per_page = 20
+        # Visitantes anônimos sempre veem a página 1 (nada da query string entra na chave do cache)
         page = int(request.args.get('page', 1)) if session.get('user') else 1
+        # Cursor opaco (keyset): páginas profundas sem OFFSET e sem COUNT exato
+        cursor = request.args.get('cursor') if session.get('user') else None
 
         # Busca os livros paginados
-        books_response = Book.get_books(page, per_page)
+        books_response = Book.get_books(page, per_page, cursor=cursor, exact_total=not cursor)
         pagination = books_response['pagination'].to_dict()
         total_pages = pagination['total_pages']
 
@@ -74,19 +97,57 @@ def configure_routes(app: Flask):
         )
 
 
+    # ==========================================================
+    # 🔎 GET - Busca full-text no catálogo (com facetas por categoria)
+    # ==========================================================
+    @app.route('/search', methods=['GET'])
+    def search():
+        query = request.args.get('q', '').strip()
+        category = request.args.get('category') or None
+        cursor = request.args.get('cursor')
+
+        if not query:
+            return redirect(url_for('get_books'))
+
+        results = Book.search(query, category=category, per_page=20, cursor=cursor)
+        books = results['data']
+
+        return render_template(
+            'books.html',
+            logged_user=session.get('user'),
+            books=books,
+            categories=Book.list_distinct_categories(),
+            facets=results['facets'],
+            search_query=query,
+            search_category=category,
+            pagination_info=results['pagination'].to_dict(),
+            start_page=1,
+            end_page=0,
+            empty_cards=(4 - (len(books) % 4)) % 4
+        )
+
+
+    # ==========================================================
+    # ⌨️ GET - Sugestões de título/autor enquanto o usuário digita
+    # ==========================================================
+    @app.route('/suggest', methods=['GET'])
+    def suggest():
+        query = request.args.get('q', '')
+        limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+        return jsonify({"query": query, "suggestions": suggest_index.suggest(query, limit)})
+
+
     # ==========================================================
     # 📖 GET - Retorna detalhes de um livro específico
     # ==========================================================
     @app.route('/get_book/<book_id>', methods=['GET'])
+    @response_cache.cached
     def get_book(book_id):
         book = Book.get_book_by_field('id', book_id)
         update_review = Review.get_review_by_field('id', request.args.get("review_id"))
 
-        # Busca as avaliações do livro
-        reviews = Review.get_review_by_field('book_id', book_id)
-        if reviews:
-            for review in reviews:
-                review.user = User.get_user_by_field('id', review.user_id)
+        # Busca as avaliações do livro já com os autores (JOIN único, sem N+1)
+        reviews = Review.get_reviews_with_relations('book_id', book_id, with_user=True)
 
         return render_template(
             'book-details.html',
@@ -115,25 +176,21 @@ def configure_routes(app: Flask):
                                    categories=categories)
 
         # --- Dados do formulário ---
+        request.max_content_length = cover_config['max_upload_bytes']  # 413 antes de ler o corpo
         category = request.form.get('category')
         upc = request.form.get('upc')
         cover = request.files.get('cover')
         book_id = str(uuid4())
         img_link = None
 
-        # Verifica se o código UPC já existe
-        if Book.get_book_by_field('upc', upc):
-            flash('Livro com esse código UPC já cadastrado!', 'warning')
-            return redirect(url_for('create_book'))
-
-        # Salva a imagem de capa (se houver)
+        # Salva a imagem de capa (se houver) antes de qualquer acesso ao banco: a gravação não
+        # acontece com a transação aberta; as miniaturas são geradas em segundo plano
         if cover:
-            filename = secure_filename(cover.filename)
-            name, ext = os.path.splitext(filename)
-            new_filename = f"{name}_{book_id}{ext}"
-            img_link = f"cover_uploads/{new_filename}"
-            file_path = os.path.join(UPLOAD_FOLDER, new_filename)
-            cover.save(file_path)
+            try:
+                img_link = cover_pipeline.save_upload(cover)
+            except InvalidCover:
+                flash('Imagem de capa inválida (use JPEG, PNG, WebP ou GIF).', 'warning')
+                return redirect(url_for('create_book'))
 
         # Cria o objeto e insere no banco
         new_book = BookEntity(
@@ -145,7 +202,19 @@ def configure_routes(app: Flask):
             description=request.form.get('description'),
             img_link=img_link
         )
-        Book.create_book(new_book)
+        # UPC repetido é recusado pela restrição UNIQUE (sem SELECT ... FOR UPDATE, que travaria
+        # o intervalo do índice); o savepoint mantém válida a transação do request (sessão, flash)
+        try:
+            with savepoint():
+                created = Book.create_book(new_book)
+        except DuplicateUpcError:
+            cover_pipeline.discard(img_link)
+            flash('Livro com esse código UPC já cadastrado!', 'warning')
+            return redirect(url_for('create_book'))
+        if not created:
+            cover_pipeline.discard(img_link)
+            flash('Não foi possível criar o livro. Tente novamente.', 'error')
+            return redirect(url_for('create_book'))
 
         flash('Livro criado com sucesso!', 'success')
         return redirect(url_for('get_books'))
@@ -173,27 +242,24 @@ def configure_routes(app: Flask):
             )
 
         # --- Atualização ---
+        request.max_content_length = cover_config['max_upload_bytes']  # 413 antes de ler o corpo
         category = request.form.get('category')
         upc = request.form.get('upc')
         cover = request.files.get('cover')
-        img_link = None
+        uploaded_img_link = None
 
-        # Verifica duplicidade de UPC
-        existing_book = Book.get_book_by_field('upc', upc)
-        if existing_book and existing_book.id != book_id:
-            flash('Livro com esse código UPC já cadastrado!', 'warning')
-            return redirect(url_for('get_books'))
+        # Nova capa (se houver) é salva antes de qualquer acesso ao banco
+        if cover:
+            try:
+                uploaded_img_link = cover_pipeline.save_upload(cover)
+            except InvalidCover:
+                flash('Imagem de capa inválida (use JPEG, PNG, WebP ou GIF).', 'warning')
+                return redirect(url_for('update_book', book_id=book_id))
 
         # Atualiza ou mantém capa
-        if cover:
-            filename = secure_filename(cover.filename)
-            name, ext = os.path.splitext(filename)
-            new_filename = f"{name}_{book_id}{ext}"
-            img_link = f"cover_uploads/{new_filename}"
-            file_path = os.path.join(UPLOAD_FOLDER, new_filename)
-            cover.save(file_path)
-        else:
-            img_link = Book.get_book_by_field('id', book_id).img_link
+        current_book = Book.get_book_by_field('id', book_id)
+        previous_img_link = current_book.img_link if current_book else None
+        img_link = uploaded_img_link or previous_img_link
 
         # Atualiza o registro
         updated_book = BookEntity(
@@ -205,7 +271,21 @@ def configure_routes(app: Flask):
             description=request.form.get('description'),
             img_link=img_link
         )
-        Book.update_book(updated_book)
+        try:
+            with savepoint():
+                updated = Book.update_book(updated_book)
+        except DuplicateUpcError:
+            cover_pipeline.discard(uploaded_img_link)
+            flash('Livro com esse código UPC já cadastrado!', 'warning')
+            return redirect(url_for('get_books'))
+        if not updated:
+            cover_pipeline.discard(uploaded_img_link)
+            flash('Não foi possível atualizar o livro. Tente novamente.', 'error')
+            return redirect(url_for('update_book', book_id=book_id))
+
+        on_commit(lambda: sample_cache.invalidate(book_id))
+        if img_link != previous_img_link:
+            on_commit(lambda: cover_pipeline.release(previous_img_link))
 
         flash('Livro atualizado com sucesso!', 'success')
         return redirect(url_for('get_books'))
@@ -218,19 +298,72 @@ def configure_routes(app: Flask):
     def delete_book(book_id):
         book = Book.get_book_by_field('id', book_id)
 
-        # Remove o arquivo da capa local
-        if book and book.img_link:
-            filename = book.img_link.replace('cover_uploads/', '')
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-
         # Remove do banco
         Book.delete_book(book_id)
+        on_commit(lambda: sample_cache.invalidate(book_id))
+
+        # Remove o arquivo da capa local (em segundo plano, se nenhum outro livro usar a mesma capa)
+        if book and book.img_link:
+            on_commit(lambda: cover_pipeline.release(book.img_link))
+
         flash('Livro deletado com sucesso!', 'success')
         return redirect(url_for('get_books'))
 
 
+    # ==========================================================
+    # 📦 POST - Importação em massa (CSV/JSONL) — apenas admin
+    # ==========================================================
+    @app.route('/import_books', methods=['POST'])
+    def import_books():
+        """
+        Recebe um arquivo CSV/JSONL e inicia a importação em segundo plano.
+        Retorna o ID do job para acompanhar o progresso em /import_books/<job_id>.
+        """
+        logged_user = session.get('user')
+        if not logged_user or logged_user.get('role') != 'admin':
+            abort(403)
+
+        request.max_content_length = import_config['max_upload_bytes']
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return jsonify({"error": "Envie o arquivo no campo 'file'."}), 400
+
+        # Opções validadas antes de gravar o arquivo (erro aqui é 400, não um job que falha)
+        fmt = request.form.get('format') or detect_format(upload.filename)
+        on_duplicate = request.form.get('on_duplicate', 'update')
+        try:
+            batch_size = int(request.form.get('batch_size', import_config['batch_size']))
+        except ValueError:
+            batch_size = 0
+        if fmt not in FORMATS:
+            return jsonify({"error": f"format deve ser um de {list(FORMATS)}."}), 400
+        if batch_size < 1:
+            return jsonify({"error": "batch_size deve ser um inteiro positivo."}), 400
+        if on_duplicate not in ON_DUPLICATE:
+            return jsonify({"error": f"on_duplicate deve ser um de {sorted(ON_DUPLICATE)}."}), 400
+
+        # Salva em disco (em blocos) e processa fora do request
+        os.makedirs(import_config['upload_dir'], exist_ok=True)
+        filename = f"{uuid4().hex}_{secure_filename(upload.filename)}"
+        source = os.path.join(import_config['upload_dir'], filename)
+        upload.save(source)
+
+        job = start_import_job(source, fmt=fmt, batch_size=batch_size, on_duplicate=on_duplicate)
+        return jsonify({"job_id": job.job_id, "status_url": url_for('import_books_status', job_id=job.job_id)}), 202
+
+
+    @app.route('/import_books/<job_id>', methods=['GET'])
+    def import_books_status(job_id):
+        logged_user = session.get('user')
+        if not logged_user or logged_user.get('role') != 'admin':
+            abort(403)
+
+        job = get_import_job(job_id)
+        if not job:
+            abort(404)
+        return jsonify(job.to_dict())
+
+
     # ==========================================================
     # 📄 DOWNLOAD - Gera PDF de amostra do livro
     # ==========================================================
@@ -238,50 +371,20 @@ def configure_routes(app: Flask):
     def download_sample(book_id):
         # Busca o livro no banco a partir do ID fornecido pela rota
         book = Book.get_book_by_field("id", book_id)
-
-        # Cria um buffer em memória para gerar o PDF sem salvar arquivo em disco
-        buffer = BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4  # Dimensões da página
-
-        # ---------------------------------------------------------
-        # Página 1 — capa da amostra
-        # ---------------------------------------------------------
-
-        # Título do livro em destaque
-        pdf.setFont("Helvetica-Bold", 22)
-        pdf.drawCentredString(width / 2, height - 80, book.title)
-
-        # Autor do livro
-        pdf.setFont("Helvetica", 14)
-        pdf.drawCentredString(width / 2, height - 110, f"por {book.author}")
-
-        # Pequeno trecho da descrição do livro
-        pdf.setFont("Helvetica", 12)
-        pdf.drawString(50, height - 160, (book.description or "Nenhuma descrição disponível.")[:100])
-        # limita a 100 caracteres
-        
-        # Avança para a próxima página
-        pdf.showPage()
-
-        # ---------------------------------------------------------
-        # Página 2 — início fictício do capítulo
-        # ---------------------------------------------------------
-
-        pdf.setFont("Helvetica-Bold", 16)
-        pdf.drawString(50, height - 60, "Capítulo 1")
-
-        # Texto da amostra gerado automaticamente
-        pdf.setFont("Helvetica", 12)
-        pdf.drawString(50, height - 100, "Este é apenas um trecho de amostra gerado automaticamente.")
-
-        # Finaliza e grava o conteúdo do PDF
-        pdf.save()
-        buffer.seek(0)
-
-        # Criação da resposta HTTP com cabeçalhos apropriados para download
-        response = make_response(buffer.getvalue())
-        response.headers["Content-Type"] = "application/pdf"
-        response.headers["Content-Disposition"] = (f"attachment; filename=amostra_{book.upc}.pdf")
-
-        return response
+        if not book:
+            abort(404)
+
+        # PDF renderizado uma vez por versão do livro e servido direto do disco
+        # (send_file usa sendfile, ETag/Last-Modified → 304 e requisições com Range)
+        path = sample_cache.get_or_render(book)
+
+        return send_file(
+            path,
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=f"amostra_{book.upc}.pdf",
+            conditional=True,
+            etag=True,
+            last_modified=book.updated_at,
+            max_age=sample_config['max_age'],
+        )
@@ -1,10 +1,12 @@
 from datetime import datetime, timezone
-import bcrypt
 
 from loguru import logger
 
 from flask import Flask, flash, redirect, render_template, request, session, url_for
+from models.db import end_transaction
 from models.user import User, UserEntity
+from services.passwords import PasswordServiceBusy, password_hasher
+from services.rate_limit import create_user_limiter, rate_limit
 
 def configure_routes(app: Flask):
     """
@@ -23,9 +25,11 @@ def configure_routes(app: Flask):
         """
         per_page = 20
         page = int(request.args.get('page', 1)) if session.get('user') else 1
+        # Cursor opaco (keyset): páginas profundas sem OFFSET e sem COUNT exato
+        cursor = request.args.get('cursor') if session.get('user') else None
         
         # Busca usuários da camada de modelo
-        users_response = User.get_users(page, per_page)
+        users_response = User.get_users(page, per_page, cursor=cursor, exact_total=not cursor)
         pagination = users_response['pagination'].to_dict()
         total_pages = pagination['total_pages']
 
@@ -75,6 +79,7 @@ def configure_routes(app: Flask):
     # ➕ POST/GET - Cria um novo usuário
     # ==========================================================
     @app.route('/create_user', methods=['GET', 'POST'])
+    @rate_limit(create_user_limiter, 'upsert-user.html')
     def create_user():
         """
         Cria uma novo usuário, incluindo validações de campos, senha e duplicidade de e-mail/username.
@@ -97,11 +102,12 @@ def configure_routes(app: Flask):
                 flash('Todos os campos são obrigatórios.', 'warning')
                 return redirect(url_for('create_user'))
 
-            if User.get_user_by_field('username', username):
+            existing = User.find_by_identity(username=username, email=email)
+            if 'username' in existing:
                 flash('Nome de usuário já utilizado, escolha outro.', 'warning')
                 return redirect(url_for('create_user'))
 
-            if User.get_user_by_field('email', email):
+            if 'email' in existing:
                 flash('Email já cadastrado, tente fazer login.', 'warning')
                 return redirect(url_for('create_user'))
 
@@ -110,7 +116,8 @@ def configure_routes(app: Flask):
                 return redirect(url_for('create_user'))
 
             # ------------------ Criação segura ------------------
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            end_transaction()  # não segura a conexão do pool durante o bcrypt
+            hashed_password = password_hasher.hash(password)
 
             new_user = UserEntity(
                 username=username,
@@ -124,6 +131,10 @@ def configure_routes(app: Flask):
             flash('Usuário cadastrado com sucesso!', 'success')
             return redirect(url_for('login'))
 
+        except PasswordServiceBusy:
+            flash('Muitos acessos no momento. Tente novamente em instantes.', 'warning')
+            return redirect(url_for('create_user'))
+
         except Exception as e:
             logger.exception(f'Erro ao cadastrar usuário: {e}')
             flash('Ocorreu um erro ao cadastrar o usuário.', 'error')
@@ -202,12 +213,13 @@ def configure_routes(app: Flask):
         confirm = form.get('confirm-password')
 
         # ------------------ Validações ------------------
-        existing_user = User.get_user_by_field('username', username)
+        existing = User.find_by_identity(username=username, email=email)
+        existing_user = existing.get('username')
         if existing_user and existing_user.id != user_id:
             flash('Nome de usuário já utilizado, escolha outro.', 'warning')
             return redirect(url_for('update_user', user_id=user_id))
 
-        existing_email = User.get_user_by_field('email', email)
+        existing_email = existing.get('email')
         if existing_email and existing_email.id != user_id:
             flash('Email já cadastrado, tente outro.', 'warning')
             return redirect(url_for('update_user', user_id=user_id))
@@ -219,7 +231,12 @@ def configure_routes(app: Flask):
             flash('As senhas não coincidem.', 'warning')
             return redirect(url_for('update_user', user_id=user_id))
         else:
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            end_transaction()  # não segura a conexão do pool durante o bcrypt
+            try:
+                hashed_password = password_hasher.hash(password)
+            except PasswordServiceBusy:
+                flash('Muitos acessos no momento. Tente novamente em instantes.', 'warning')
+                return redirect(url_for('update_user', user_id=user_id))
 
         # ------------------ Atualização ------------------
         updated_user = UserEntity(
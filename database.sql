@@ -35,4 +35,6 @@ CREATE TABLE IF NOT EXISTS reviews (
   
   CONSTRAINT fk_user_review FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
   CONSTRAINT fk_book_review FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
-)
\ No newline at end of file
+);
+
+-- Índices e demais alterações de schema: python migrate.py apply (ver migrations/)
@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from services.book_import import import_books
+
+
+# Importa livros em massa a partir de CSV (cabeçalho: upc,title,author,img_link,description,category)
+# ou JSONL (um objeto por linha com as mesmas chaves).
+#   python import_books.py catalogo.csv --batch-size 2000
+#   python import_books.py catalogo.jsonl --on-duplicate skip
+parser = argparse.ArgumentParser(description="Importação em massa de livros (CSV/JSONL).")
+parser.add_argument("source", help="arquivo CSV ou JSONL")
+parser.add_argument("--format", choices=["csv", "jsonl"], help="padrão: detectado pela extensão")
+parser.add_argument("--batch-size", type=int, default=1000, help="linhas por INSERT/transação")
+parser.add_argument("--on-duplicate", choices=["update", "skip"], default="update",
+                    help="o que fazer quando o UPC já existe")
+parser.add_argument("--no-resume", action="store_true", help="ignora o checkpoint e começa do início")
+args = parser.parse_args()
+
+
+def report(progress):
+    print(
+        f"\r{progress.rows_read} lidas | {progress.rows_written} gravadas | "
+        f"{progress.rows_invalid} inválidas | {progress.rows_per_second} linhas/s",
+        end="", flush=True,
+    )
+
+
+result = import_books(
+    args.source,
+    fmt=args.format,
+    batch_size=args.batch_size,
+    on_duplicate=args.on_duplicate,
+    resume=not args.no_resume,
+    on_progress=report,
+)
+print()
+for error in result.errors[:20]:
+    print(f"  - {error}")
+print(f"Importação {'concluída' if result.status == 'done' else 'FALHOU'}.")
+sys.exit(0 if result.status == "done" else 1)
@@ -1,42 +1,50 @@
-import random
-import mysql.connector
-from faker import Faker
-from config import db_config
-
-# Configurações do banco
-db = mysql.connector.connect(**db_config)
-
-cursor = db.cursor()
-
-fake_pt = Faker('pt_BR')  # nomes brasileiros
-fake_en = Faker('en_US')  # nomes americanos/ingleses
-
-authors = []
-
-for _ in range(50):
-    # Escolhe aleatoriamente PT ou EN
-    if random.choice([True, False]):
-        authors.append(fake_pt.name())
-    else:
-        authors.append(fake_en.name())
-
-print("Autores gerados:", authors)
-
-# 2️⃣ Buscar todos os livros
-cursor.execute("SELECT id FROM books;")
-books = cursor.fetchall()  # lista de tuplas [(1,), (2,), ...]
-
-# 3️⃣ Atualizar cada livro com um autor aleatório
-for book in books:
-    book_id = book[0]
-    random_author = random.choice(authors)
-    cursor.execute(
-        "UPDATE books SET author = %s WHERE id = %s;",
-        (random_author, book_id)
-    )
-
-db.commit()
-cursor.close()
-db.close()
-
-print("Autores inseridos aleatoriamente nos livros!")
+import argparse
+
+from services.seeding import Seeder
+
+
+# Gera dados sintéticos para desenvolvimento e testes de carga.
+#   python insert_random_authors.py                       -> autores aleatórios nos livros existentes
+#   python insert_random_authors.py authors --count 50
+#   python insert_random_authors.py seed --users 100000 --books 1000000 --reviews 10000000 --workers 8
+parser = argparse.ArgumentParser(description="Geração de dados sintéticos (Faker) em lotes.")
+parser.add_argument("--workers", type=int, default=1, help="processos em paralelo")
+parser.add_argument("--chunk-size", type=int, default=5000, help="linhas por INSERT/UPDATE (um commit por lote)")
+parser.add_argument("--seed", type=int, help="semente para dados reproduzíveis (mesmos dados com qualquer --workers; use em banco limpo)")
+parser.set_defaults(command="authors", count=50)  # sem subcomando: comportamento original
+commands = parser.add_subparsers(dest="command")
+
+authors_parser = commands.add_parser("authors", help="atribui autores aleatórios aos livros existentes")
+authors_parser.add_argument("--count", type=int, default=50, help="quantidade de autores distintos")
+
+seed_parser = commands.add_parser("seed", help="insere usuários, livros e avaliações")
+seed_parser.add_argument("--users", type=int, default=0)
+seed_parser.add_argument("--books", type=int, default=0)
+seed_parser.add_argument("--reviews", type=int, default=0)
+seed_parser.add_argument("--password", default="senha123", help="senha de todos os usuários gerados")
+
+args = parser.parse_args()
+
+
+def report(phase, done, elapsed):
+    print(f"\r{phase}: {done} linhas | {done / elapsed if elapsed else 0:.0f} linhas/s", end="", flush=True)
+
+
+seeder = Seeder(
+    workers=args.workers,
+    chunk_size=args.chunk_size,
+    seed=args.seed,
+    password=getattr(args, "password", "senha123"),
+    on_progress=report,
+)
+
+if args.command == "authors":
+    seeder.randomize_authors(args.count)
+    print("\nAutores inseridos aleatoriamente nos livros!")
+else:
+    # Ordem importa: avaliações referenciam usuários e livros existentes
+    for phase, count in (("users", args.users), ("books", args.books), ("reviews", args.reviews)):
+        if count:
+            getattr(seeder, f"seed_{phase}")(count)
+            print()
+    print("Dados gerados!")
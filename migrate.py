@@ -0,0 +1,181 @@
+"""
+Migrações versionadas do banco.
+
+Uso:
+    python migrate.py status   # lista migrações aplicadas/pendentes
+    python migrate.py apply    # aplica as pendentes, em ordem
+    python migrate.py check    # EXPLAIN das queries quentes; falha se alguma fizer full table scan
+
+Cada arquivo em migrations/ se chama NNNN_descricao.sql e contém comandos separados por ';'.
+As versões aplicadas ficam registradas na tabela schema_migrations (ledger).
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+from dataclasses import dataclass
+from typing import Dict, List
+
+from loguru import logger
+
+from models.book import STATS_JOIN, STATS_SELECT
+from models.db import get_cursor, unit_of_work
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+FILENAME_PATTERN = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+
+LEDGER_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+      version CHAR(4) NOT NULL PRIMARY KEY,
+      name VARCHAR(255) NOT NULL,
+      checksum CHAR(64) NOT NULL,
+      applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Queries quentes dos models (mesmo formato de WHERE/ORDER BY) usadas no `check`.
+# Os parâmetros são apenas valores de exemplo para o EXPLAIN.
+HOT_QUERIES = {
+    "reviews por livro": (
+        "SELECT * FROM reviews WHERE book_id = %s ORDER BY created_at DESC", ("x",)),
+    "reviews por usuário": (
+        "SELECT * FROM reviews WHERE user_id = %s ORDER BY created_at DESC", ("x",)),
+    "livros por categoria": (
+        "SELECT * FROM books WHERE category = %s", ("x",)),
+    "livros por autor": (
+        "SELECT * FROM books WHERE author = %s", ("x",)),
+    "livros por título": (
+        "SELECT * FROM books WHERE title = %s", ("x",)),
+    "categorias distintas": (
+        "SELECT DISTINCT category FROM books", ()),
+    "página de livros (offset, com book_stats)": (
+        f"SELECT b.*, {STATS_SELECT} FROM books b {STATS_JOIN} "
+        "ORDER BY b.created_at ASC, b.id ASC LIMIT %s OFFSET %s", (21, 200)),
+    "reviews do livro com autor (JOIN)": (
+        "SELECT r.*, u.* FROM reviews r LEFT JOIN users u ON u.id = r.user_id "
+        "WHERE r.book_id = %s ORDER BY r.created_at DESC", ("x",)),
+    "usuário por e-mail/username (UNION ALL)": (
+        "SELECT *, 'email' AS matched_by FROM final_project_db.users WHERE email = %s "
+        "UNION ALL SELECT *, 'username' AS matched_by FROM final_project_db.users WHERE username = %s",
+        ("x", "x")),
+    "página de livros (keyset)": (
+        "SELECT * FROM books WHERE created_at > %s OR (created_at = %s AND id > %s) "
+        "ORDER BY created_at ASC, id ASC LIMIT 21", ("2000-01-01", "2000-01-01", "x")),
+    "busca full-text": (
+        "SELECT id FROM books WHERE MATCH(title, author, description, category) "
+        "AGAINST (%s IN BOOLEAN MODE)", ("+dragao*",)),
+    "página de usuários (keyset)": (
+        "SELECT * FROM users WHERE created_at > %s OR (created_at = %s AND id > %s) "
+        "ORDER BY created_at ASC, id ASC LIMIT 21", ("2000-01-01", "2000-01-01", "x")),
+    "limpeza de sessões expiradas": (
+        "SELECT id FROM sessions WHERE expires_at <= %s LIMIT 1000", ("2000-01-01",)),
+}
+
+
+@dataclass
+class Migration:
+    version: str
+    name: str
+    path: str
+
+    @property
+    def sql(self) -> str:
+        with open(self.path, encoding="utf-8") as file:
+            return file.read()
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    def statements(self) -> List[str]:
+        # Remove comentários de linha e separa por ';' (as migrações não usam ';' dentro de strings)
+        lines = [line for line in self.sql.splitlines() if not line.strip().startswith("--")]
+        return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def discover() -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = FILENAME_PATTERN.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+
+def applied() -> Dict[str, Dict]:
+    with get_cursor() as cursor:
+        cursor.execute(LEDGER_DDL)
+        cursor.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+        return {row["version"]: row for row in cursor.fetchall()}
+
+
+def status() -> int:
+    done = applied()
+    for migration in discover():
+        row = done.get(migration.version)
+        if not row:
+            state = "pendente"
+        elif row["checksum"] != migration.checksum:
+            state = f"aplicada em {row['applied_at']} (ALTERADA desde então!)"
+        else:
+            state = f"aplicada em {row['applied_at']}"
+        print(f"{migration.version}_{migration.name}: {state}")
+    return 0
+
+
+def apply() -> int:
+    done = applied()
+    pending = [m for m in discover() if m.version not in done]
+    if not pending:
+        print("Nenhuma migração pendente.")
+        return 0
+
+    for migration in pending:
+        print(f"Aplicando {migration.version}_{migration.name}...")
+        try:
+            # Uma conexão por migração (variáveis de sessão valem até o fim do arquivo).
+            # DDL no MySQL faz commit implícito, então cada comando é aplicado individualmente.
+            with unit_of_work():
+                for statement in migration.statements():
+                    with get_cursor() as cursor:
+                        cursor.execute(statement)
+                with get_cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                        (migration.version, migration.name, migration.checksum),
+                    )
+        except Exception as e:
+            logger.exception(f"Erro ao aplicar migração {migration.version}: {e}")
+            return 1
+    print(f"{len(pending)} migração(ões) aplicada(s).")
+    return 0
+
+
+def check() -> int:
+    failures = 0
+    with get_cursor() as cursor:
+        for label, (query, params) in HOT_QUERIES.items():
+            cursor.execute(f"EXPLAIN {query}", params)
+            plan = cursor.fetchall()
+            # Linhas "<union1,2>"/"<derived2>" são tabelas temporárias do próprio plano, não scans
+            scans = [row for row in plan if row.get("type") == "ALL" and not str(row.get("table")).startswith("<")]
+            if scans:
+                failures += 1
+                tables = ", ".join(str(row.get("table")) for row in scans)
+                print(f"FALHA  {label}: full table scan em {tables}")
+            else:
+                keys = ", ".join(str(row.get("key")) for row in plan)
+                print(f"ok     {label}: {keys}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migrações versionadas do banco.")
+    parser.add_argument("command", choices=["apply", "status", "check"])
+    args = parser.parse_args()
+    return {"apply": apply, "status": status, "check": check}[args.command]()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
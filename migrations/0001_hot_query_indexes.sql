@@ -0,0 +1,18 @@
+-- Índices compostos para os filtros/ordenações usados pelos models.
+
+-- Review.get_review_by_field / get_reviews_with_relations:
+--   WHERE book_id = %s ORDER BY created_at DESC
+CREATE INDEX idx_reviews_book_created ON reviews (book_id, created_at);
+
+--   WHERE user_id = %s ORDER BY created_at DESC
+CREATE INDEX idx_reviews_user_created ON reviews (user_id, created_at);
+
+-- Book.get_book_by_field: WHERE category|author|title = %s
+-- (idx_books_category também atende o SELECT DISTINCT category via loose index scan)
+CREATE INDEX idx_books_category ON books (category);
+CREATE INDEX idx_books_author ON books (author);
+CREATE INDEX idx_books_title ON books (title);
+
+-- fetch_page: ORDER BY created_at, id (OFFSET) e WHERE created_at/id > borda (keyset)
+CREATE INDEX idx_books_created_id ON books (created_at, id);
+CREATE INDEX idx_users_created_id ON users (created_at, id);
@@ -0,0 +1,20 @@
+-- Índice FULLTEXT para Book.search (título, autor, descrição e categoria).
+-- A collation padrão utf8mb4_0900_ai_ci já torna a busca insensível a acentos/maiúsculas;
+-- a lista de stopwords padrão do InnoDB é em inglês, então usamos uma em português.
+
+CREATE TABLE IF NOT EXISTS ft_stopwords_pt (
+  value VARCHAR(30) NOT NULL
+) ENGINE = InnoDB;
+
+INSERT INTO ft_stopwords_pt (value) VALUES
+  ('que'), ('para'), ('com'), ('não'), ('uma'), ('uns'), ('umas'), ('dos'), ('das'),
+  ('nos'), ('nas'), ('pelo'), ('pela'), ('pelos'), ('pelas'), ('mas'), ('como'),
+  ('mais'), ('por'), ('seu'), ('sua'), ('seus'), ('suas'), ('ele'), ('ela'),
+  ('eles'), ('elas'), ('isso'), ('este'), ('esta'), ('esse'), ('essa'), ('aos'),
+  ('num'), ('numa'), ('sem'), ('sob'), ('sobre'), ('entre'), ('até'), ('quando'),
+  ('muito'), ('também'), ('the'), ('and'), ('for'), ('with');
+
+SET @ft_stopwords = CONCAT(DATABASE(), '/ft_stopwords_pt');
+SET SESSION innodb_ft_user_stopword_table = @ft_stopwords;
+
+ALTER TABLE books ADD FULLTEXT INDEX ft_books_search (title, author, description, category);
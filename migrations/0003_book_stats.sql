@@ -0,0 +1,23 @@
+-- Agregados de avaliações por livro, mantidos por Review.create/update/delete_review.
+-- Reconstrução completa: python reconcile_book_stats.py
+
+CREATE TABLE IF NOT EXISTS book_stats (
+  book_id CHAR(36) NOT NULL PRIMARY KEY,
+  review_count INT NOT NULL DEFAULT 0,
+  rating_sum INT NOT NULL DEFAULT 0,
+  rating_1 INT NOT NULL DEFAULT 0,
+  rating_2 INT NOT NULL DEFAULT 0,
+  rating_3 INT NOT NULL DEFAULT 0,
+  rating_4 INT NOT NULL DEFAULT 0,
+  rating_5 INT NOT NULL DEFAULT 0,
+  last_review_at DATETIME NULL,
+
+  CONSTRAINT fk_book_stats_book FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
+);
+
+INSERT INTO book_stats (book_id, review_count, rating_sum, rating_1, rating_2, rating_3, rating_4, rating_5, last_review_at)
+SELECT book_id, COUNT(*), SUM(rating),
+       SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5),
+       MAX(created_at)
+FROM reviews
+GROUP BY book_id;
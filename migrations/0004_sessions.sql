@@ -0,0 +1,11 @@
+-- Sessões no servidor (services/sessions.py, SESSION_BACKEND=mysql).
+-- O cookie guarda apenas o ID assinado; os dados ficam aqui.
+-- expires_at indexado para a limpeza em lotes das sessões expiradas.
+
+CREATE TABLE IF NOT EXISTS sessions (
+  id CHAR(43) NOT NULL PRIMARY KEY,
+  data BLOB NOT NULL,
+  expires_at DATETIME NOT NULL,
+
+  INDEX idx_sessions_expires (expires_at)
+);
@@ -0,0 +1,29 @@
+import argparse
+import sys
+
+from config import cover_mirror_config
+from services.cover_mirror import backfill
+
+
+# Baixa para o servidor as capas de livros que apontam para URLs externas.
+# Capas já espelhadas e ainda dentro do prazo de revalidação são puladas.
+#   python mirror_covers.py
+#   python mirror_covers.py --workers 16 --force
+parser = argparse.ArgumentParser(description="Espelhamento local das capas com URL externa.")
+parser.add_argument("--workers", type=int, default=cover_mirror_config["workers"], help="downloads simultâneos")
+parser.add_argument("--force", action="store_true", help="revalida todas as capas, mesmo as recentes")
+args = parser.parse_args()
+
+
+def report(stats):
+    print(
+        f"\r{stats['total']} capas | {stats['mirrored']} espelhadas | "
+        f"{stats['skipped']} recentes | {stats['failed']} falhas",
+        end="", flush=True,
+    )
+
+
+result = backfill(force=args.force, workers=args.workers, on_progress=report)
+report(result)
+print()
+sys.exit(0 if not result["failed"] else 1)
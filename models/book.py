@@ -1,9 +1,41 @@
 from loguru import logger
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from mysql.connector import IntegrityError, errorcode
 
-from models.db import BaseEntity, get_cursor
-from models.pagination import PaginationInfo
+from models.cache import catalog_cache
+from models.db import IN_BATCH_SIZE, BaseEntity, get_cursor, on_commit
+from models.pagination import PaginationInfo, decode_score_cursor, encode_score_cursor, fetch_page
+from models.suggest import suggest_index
+from models.text import tokenize
+
+
+CATEGORIES_CACHE_KEY = "catalog:categories"
+DATA_VERSION_KEY = "catalog:data_version"  # muda a cada escrita em livros/avaliações
+
+# Índice FULLTEXT ft_books_search (migração 0002)
+SEARCH_MATCH = "MATCH(title, author, description, category) AGAINST (%s IN BOOLEAN MODE)"
+FULLTEXT_MIN_TOKEN = 3
+
+
+# Colunas de book_stats (migração 0003) trazidas junto com o livro via LEFT JOIN
+STATS_SELECT = (
+    "COALESCE(s.review_count, 0) AS review_count, COALESCE(s.rating_sum, 0) AS rating_sum, "
+    "COALESCE(s.rating_1, 0) AS rating_1, COALESCE(s.rating_2, 0) AS rating_2, "
+    "COALESCE(s.rating_3, 0) AS rating_3, COALESCE(s.rating_4, 0) AS rating_4, "
+    "COALESCE(s.rating_5, 0) AS rating_5, s.last_review_at"
+)
+STATS_JOIN = "LEFT JOIN book_stats s ON s.book_id = b.id"
+
+
+def _stat(default: Any = 0):
+    # Campo agregado: não é coluna da tabela books
+    return field(default=default, metadata={"column": False})
+
+
+class DuplicateUpcError(Exception):
+    """Outro livro já usa este código UPC (restrição UNIQUE de books.upc)."""
 
 
 @dataclass
@@ -14,28 +46,39 @@ class BookEntity(BaseEntity):
     img_link: Optional[str]
     description: Optional[str]
     category: Optional[str]
+    review_count: int = _stat()
+    rating_sum: int = _stat()
+    rating_1: int = _stat()
+    rating_2: int = _stat()
+    rating_3: int = _stat()
+    rating_4: int = _stat()
+    rating_5: int = _stat()
+    last_review_at: Optional[datetime] = _stat(None)
 
+    @property
+    def avg_rating(self) -> Optional[float]:
+        """Média das notas (None quando o livro ainda não tem avaliações)."""
+        return self.rating_sum / self.review_count if self.review_count else None
 
-class Book:
+    @property
+    def rating_histogram(self) -> Dict[int, int]:
+        return {n: getattr(self, f"rating_{n}") for n in range(1, 6)}
 
-    # GET - retorna todos os livros
-    @staticmethod
-    def get_books(page: int = 1, per_page: int = 20) -> Dict[str, Any]:
-        try:
-            offset = (page - 1) * per_page
+    @property
+    def cache_key(self) -> str:
+        # As estatísticas vêm de book_stats: avaliações mudam a nota sem mudar books.updated_at
+        return f"{super().cache_key}:{self.review_count}:{self.rating_sum}"
 
-            with get_cursor() as cursor:
-                cursor.execute("SELECT COUNT(*) AS total FROM books")
-                total_books = cursor.fetchone()["total"]
 
-                cursor.execute("SELECT * FROM books ORDER BY created_at ASC LIMIT %s OFFSET %s", (per_page, offset))
-                books = cursor.fetchall()
+class Book:
 
-            pagination = PaginationInfo(
-                page=page,
-                per_page=per_page,
-                total_items=total_books
-            )
+    # GET - retorna todos os livros (paginação por página ou por cursor)
+    @staticmethod
+    def get_books(page: int = 1, per_page: int = 20, cursor: Optional[str] = None, exact_total: bool = True) -> Dict[str, Any]:
+        try:
+            with get_cursor() as db_cursor:
+                books, pagination = fetch_page(db_cursor, "books", page, per_page, cursor, exact_total,
+                                               select=f"b.*, {STATS_SELECT}", alias="b", joins=STATS_JOIN)
 
             return {
                 "data": [BookEntity(**book) for book in books],
@@ -49,6 +92,10 @@ class Book:
     # GET - retorna categorias distintas dos livros
     @staticmethod
     def list_distinct_categories() -> Optional[List[str]]:
+        return catalog_cache.get_or_set(CATEGORIES_CACHE_KEY, Book._load_distinct_categories)
+
+    @staticmethod
+    def _load_distinct_categories() -> Optional[List[str]]:
         try:
             with get_cursor() as cursor:
                 cursor.execute(f"SELECT DISTINCT category FROM books;")
@@ -57,6 +104,21 @@ class Book:
         except Exception as e:
             logger.exception(f"Erro ao buscar categorias dos livros: {e}")
             return None
+
+    # Invalida os metadados do catálogo em cache depois que a escrita for confirmada
+    @staticmethod
+    def invalidate_catalog() -> None:
+        on_commit(lambda: catalog_cache.invalidate(CATEGORIES_CACHE_KEY))
+        Book.bump_data_version()
+
+    # Nova versão dos dados do catálogo (após o commit): as páginas em cache deixam de valer
+    @staticmethod
+    def bump_data_version() -> None:
+        on_commit(lambda: catalog_cache.bump(DATA_VERSION_KEY))
+
+    @staticmethod
+    def data_version() -> str:
+        return catalog_cache.version(DATA_VERSION_KEY)
     
     # GET - retorna livros a partir de um campo
     @staticmethod
@@ -66,7 +128,7 @@ class Book:
             if key not in allowed_keys:
                 raise ValueError(f"Invalid column: {key}")
             with get_cursor() as cursor:
-                cursor.execute(f"SELECT * FROM books WHERE {key} = %s",(value,))
+                cursor.execute(f"SELECT b.*, {STATS_SELECT} FROM books b {STATS_JOIN} WHERE b.{key} = %s",(value,))
                 if key in {"id", "upc"}:
                     book = cursor.fetchone()
                     return BookEntity(**book) if book else None
@@ -77,6 +139,124 @@ class Book:
             logger.exception(f"Erro ao buscar livros: {e}")
             return None
 
+    # GET - retorna vários livros de uma vez a partir dos IDs (evita N+1)
+    @staticmethod
+    def get_books_by_ids(ids: Iterable[str]) -> Dict[str, BookEntity]:
+        try:
+            unique_ids = list(dict.fromkeys(i for i in ids if i))
+            books: Dict[str, BookEntity] = {}
+            if not unique_ids:
+                return books
+            with get_cursor() as cursor:
+                for start in range(0, len(unique_ids), IN_BATCH_SIZE):
+                    chunk = unique_ids[start:start + IN_BATCH_SIZE]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cursor.execute(f"SELECT * FROM books WHERE id IN ({placeholders})", tuple(chunk))
+                    books.update({b["id"]: BookEntity(**b) for b in cursor.fetchall()})
+            return books
+        except Exception as e:
+            logger.exception(f"Erro ao buscar livros por IDs: {e}")
+            return {}
+
+    # GET - quantos livros usam uma capa (capas iguais compartilham o mesmo arquivo)
+    @staticmethod
+    def count_by_img_link(img_link: str) -> Optional[int]:
+        try:
+            with get_cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) AS total FROM books WHERE img_link = %s", (img_link,))
+                return cursor.fetchone()["total"]
+        except Exception as e:
+            logger.exception(f"Erro ao contar livros por capa: {e}")
+            return None
+
+    # GET - valores distintos de img_link que começam com um dos prefixos (capas locais ou URLs externas)
+    @staticmethod
+    def list_img_links(*prefixes: str) -> Optional[List[str]]:
+        try:
+            conditions = " OR ".join(["img_link LIKE %s"] * len(prefixes))
+            with get_cursor(dictionary=False) as cursor:
+                # "_" e "%" do prefixo são literais no LIKE ("cover_uploads/")
+                patterns = tuple(prefix.replace("\\", "\\\\").replace("_", "\\_").replace("%", "\\%") + "%"
+                                 for prefix in prefixes)
+                cursor.execute(f"SELECT DISTINCT img_link FROM books WHERE {conditions}", patterns)
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.exception(f"Erro ao listar capas: {e}")
+            return None
+
+    # GET - busca full-text (título, autor, descrição, categoria) ordenada por relevância
+    @staticmethod
+    def search(query: str, category: Optional[str] = None, per_page: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        empty = {"data": [], "pagination": PaginationInfo(1, per_page, 0, has_more=False), "facets": []}
+        try:
+            # Cada termo é obrigatório (+) e casa por prefixo (*); tokens menores que
+            # innodb_ft_min_token_size (3) não são indexados e são descartados
+            terms = tokenize(query, min_length=FULLTEXT_MIN_TOKEN)
+            if not terms:
+                return empty
+            boolean_query = " ".join(f"+{term}*" for term in terms)
+
+            where = [SEARCH_MATCH]
+            params: List[Any] = [boolean_query]
+            if category:
+                where.append("category = %s")
+                params.append(category)
+
+            keyset = decode_score_cursor(cursor) if cursor else None
+            having, order = "", "score DESC, id ASC"
+            if keyset:
+                direction, score, last_id = keyset
+                if direction == "next":
+                    having = "HAVING score < %s OR (score = %s AND id > %s)"
+                else:
+                    having, order = "HAVING score > %s OR (score = %s AND id < %s)", "score ASC, id DESC"
+                params += [score, score, last_id]
+
+            with get_cursor() as db_cursor:
+                db_cursor.execute(
+                    f"SELECT b.*, {STATS_SELECT}, {SEARCH_MATCH} AS score FROM books b {STATS_JOIN} "
+                    f"WHERE {' AND '.join(where)} "
+                    f"{having} ORDER BY {order} LIMIT %s",
+                    (boolean_query, *params, per_page + 1),
+                )
+                rows = db_cursor.fetchall()
+
+                # Contagem por categoria sobre todos os resultados (sem o filtro de categoria)
+                db_cursor.execute(
+                    f"SELECT category, COUNT(*) AS total FROM books WHERE {SEARCH_MATCH} "
+                    f"GROUP BY category ORDER BY total DESC",
+                    (boolean_query,),
+                )
+                facets = db_cursor.fetchall()
+
+            more = len(rows) > per_page
+            rows = rows[:per_page]
+            if keyset and keyset[0] == "prev":
+                rows.reverse()
+                has_more, has_before = True, more
+            else:
+                has_more, has_before = more, bool(keyset)
+
+            total = sum(f["total"] for f in facets if not category or f["category"] == category)
+            scores = [row.pop("score") for row in rows]
+            pagination = PaginationInfo(
+                page=1,
+                per_page=per_page,
+                total_items=total,
+                next_cursor=encode_score_cursor("next", scores[-1], rows[-1]["id"]) if rows and has_more else None,
+                prev_cursor=encode_score_cursor("prev", scores[0], rows[0]["id"]) if rows and has_before else None,
+                has_more=has_more,
+            )
+
+            return {
+                "data": [BookEntity(**book) for book in rows],
+                "pagination": pagination,
+                "facets": facets,
+            }
+        except Exception as e:
+            logger.exception(f"Erro ao buscar livros por texto: {e}")
+            return empty
+
     # POST - criar livro
     @staticmethod
     def create_book(book: BookEntity) -> bool:
@@ -88,7 +268,14 @@ class Book:
                         VALUES (%s, %s, %s, %s, %s, %s, %s)
                     """, (book.id, book.upc, book.title, book.author, book.img_link, book.description, book.category),
                 )
+            Book.invalidate_catalog()
+            on_commit(lambda: suggest_index.add(book.id, book.title, book.author))
             return True
+        except IntegrityError as e:
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                raise DuplicateUpcError(book.upc) from e
+            logger.exception(f"Erro ao criar livro: {e}")
+            return False
         except Exception as e:
             logger.exception(f"Erro ao criar livro: {e}")
             return False
@@ -102,7 +289,14 @@ class Book:
                     "UPDATE books SET upc = %s, title = %s, author = %s, img_link = %s, description = %s, category = %s WHERE id = %s",
                     (book.upc, book.title, book.author, book.img_link, book.description, book.category, book.id),
                 )
+            Book.invalidate_catalog()
+            on_commit(lambda: suggest_index.add(book.id, book.title, book.author))
             return True
+        except IntegrityError as e:
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                raise DuplicateUpcError(book.upc) from e
+            logger.exception(f"Erro ao atualizar livro: {e}")
+            return False
         except Exception as e:
             logger.exception(f"Erro ao atualizar livro: {e}")
             return False
@@ -113,6 +307,8 @@ class Book:
         try:
             with get_cursor() as cursor:
                 cursor.execute("DELETE FROM books WHERE id = %s", (id,))
+            Book.invalidate_catalog()
+            on_commit(lambda: suggest_index.remove(id))
             return True
         except Exception as e:
             logger.exception(f"Erro ao deletar livro: {e}")
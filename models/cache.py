@@ -0,0 +1,165 @@
+import pickle
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+from loguru import logger
+
+from config import cache_config
+
+_MISSING = object()
+
+VERSION_TTL = 30 * 86400  # versões expiradas/descartadas viram uma versão nova (só invalida, nunca serve dado velho)
+
+
+class LocalBackend:
+    """Armazenamento em memória do processo, com expiração por TTL."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value = item
+            if expires_at < monotonic():
+                del self._data[key]
+                return _MISSING
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                # Descarta primeiro os expirados; se não bastar, o mais antigo inserido
+                now = monotonic()
+                for expired in [k for k, (exp, _) in self._data.items() if exp < now]:
+                    del self._data[expired]
+                if len(self._data) >= self.max_entries:
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (monotonic() + ttl, value)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend:
+    """Armazenamento compartilhado entre processos/servidores (requer o pacote `redis`)."""
+
+    def __init__(self, url: str, prefix: str = "litscore:"):
+        import redis  # dependência opcional, só necessária com CACHE_REDIS_URL
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(self.prefix + key)
+        return _MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+class Cache:
+    """
+    Cache de leitura com TTL, invalidação explícita e contadores de hit/miss.
+    Falhas do backend nunca derrubam a requisição: a consulta original é usada.
+    """
+
+    def __init__(self, backend, default_ttl: float = 300):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Cache indisponível ao ler '{key}': {e}")
+            value = _MISSING
+
+        if value is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        # None indica erro no model: não guarda para tentar de novo na próxima leitura
+        if value is not None:
+            try:
+                self.backend.set(key, value, ttl or self.default_ttl)
+            except Exception as e:
+                logger.warning(f"Cache indisponível ao gravar '{key}': {e}")
+        return value
+
+    def invalidate(self, *keys: str) -> None:
+        try:
+            self.backend.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Cache indisponível ao invalidar {keys}: {e}")
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def version(self, key: str) -> str:
+        """Token da versão atual de um conjunto de dados (criado na primeira leitura)."""
+        try:
+            value = self.backend.get(key)
+            if value is _MISSING:
+                value = uuid4().hex
+                self.backend.set(key, value, VERSION_TTL)
+            return value
+        except Exception as e:
+            logger.warning(f"Cache indisponível ao ler versão '{key}': {e}")
+            return uuid4().hex  # sem backend: nada é reaproveitado
+
+    def bump(self, key: str) -> None:
+        """Troca o token: tudo que foi guardado com a versão anterior deixa de ser encontrado."""
+        try:
+            self.backend.set(key, uuid4().hex, VERSION_TTL)
+        except Exception as e:
+            logger.warning(f"Cache indisponível ao atualizar versão '{key}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def make_backend(max_entries: int = cache_config["max_entries"], prefix: str = "litscore:"):
+    if cache_config["redis_url"]:
+        try:
+            return RedisBackend(cache_config["redis_url"], prefix)
+        except Exception as e:
+            logger.warning(f"Backend Redis indisponível, usando cache local: {e}")
+    return LocalBackend(max_entries)
+
+
+# Metadados do catálogo (categorias, autores...): mudam pouco e são lidos em quase toda página
+catalog_cache = Cache(make_backend(), default_ttl=cache_config["ttl"])
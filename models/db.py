@@ -1,11 +1,23 @@
+import hashlib
+import os
+import threading
 from uuid import uuid4
 from loguru import logger
+from collections import deque
 from contextlib import contextmanager
 from datetime import datetime, timezone
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, List, Optional
+from flask import Flask, g, has_app_context
 from mysql.connector import connect, Error
 
-from config import db_config
+from config import db_config, pool_config
+from models import query_log
+
+# Máximo de valores por cláusula "WHERE id IN (...)" nas cargas em lote
+IN_BATCH_SIZE = 500
+
 
 @dataclass(kw_only=True)
 class BaseEntity:
@@ -13,23 +25,410 @@ class BaseEntity:
     created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
+    @property
+    def cache_key(self) -> str:
+        """
+        Identifica esta versão da linha: usada no cache de fragmentos dos templates.
+        updated_at tem resolução de 1 s (DATETIME), então o conteúdo das colunas também entra:
+        duas edições no mesmo segundo geram chaves diferentes.
+        """
+        content = "\x1f".join(repr(getattr(self, f.name)) for f in fields(self) if f.metadata.get("column", True))
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        return f"{type(self).__name__}:{self.id}:{self.updated_at}:{digest}"
+
+
+class PoolTimeoutError(Error):
+    """Nenhuma conexão ficou disponível dentro do timeout do pool."""
+
+
+@dataclass
+class PooledConnection:
+    conn: Any
+    created_at: float = field(default_factory=monotonic)
+    released_at: float = field(default_factory=monotonic)
+
+
+class ConnectionPool:
+    """
+    Pool de conexões MySQL com tamanho fixo + overflow, health check no checkout,
+    reciclagem por tempo de vida máximo e timeout de espera.
+    """
+
+    RATE_WINDOW = 60  # janela (s) usada no cálculo de checkouts por segundo
+
+    def __init__(self, size: int = 5, max_overflow: int = 10, timeout: float = 30,
+                 recycle: int = 3600, pre_ping: bool = True, ping_interval: float = 5,
+                 **connect_kwargs):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+        self.connect_kwargs = connect_kwargs
+
+        self._idle: Deque[PooledConnection] = deque()
+        self._cond = threading.Condition()
+        self._opened = 0
+        self._in_use = 0
+
+        # --- estatísticas ---
+        self._started_at = monotonic()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._rate_buckets = [(0, 0)] * self.RATE_WINDOW  # (segundo, checkouts)
+
+    # --- ciclo de vida das conexões ---
+    def _connect(self) -> PooledConnection:
+        return PooledConnection(conn=connect(**self.connect_kwargs))
+
+    def _is_expired(self, entry: PooledConnection) -> bool:
+        return bool(self.recycle) and monotonic() - entry.created_at > self.recycle
+
+    def _close(self, entry: PooledConnection) -> None:
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _validate(self, entry: PooledConnection) -> PooledConnection:
+        """Recicla conexões expiradas e reabre conexões que não respondem ao ping."""
+        if self._is_expired(entry):
+            self._close(entry)
+            self._recycled += 1
+            return self._connect()
+
+        if self.pre_ping and monotonic() - entry.released_at > self.ping_interval:
+            if not entry.conn.is_connected():
+                self._close(entry)
+                self._recycled += 1
+                return self._connect()
+        return entry
+
+    def acquire(self) -> PooledConnection:
+        start = monotonic()
+        deadline = start + self.timeout
+        entry = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._opened < self.size + self.max_overflow:
+                    self._opened += 1
+                    break
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        msg=f"Timeout de {self.timeout}s aguardando conexão do pool "
+                            f"(size={self.size}, overflow={self.max_overflow})"
+                    )
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        try:
+            entry = self._validate(entry) if entry else self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._opened -= 1
+                self._cond.notify()
+            raise
+
+        self._record_checkout(monotonic() - start)
+        return entry
+
+    def release(self, entry: PooledConnection, discard: bool = False) -> None:
+        with self._cond:
+            self._in_use -= 1
+            # Conexões de overflow, expiradas ou com erro são fechadas ao voltar
+            if discard or len(self._idle) >= self.size or self._is_expired(entry):
+                self._opened -= 1
+                self._close(entry)
+            else:
+                entry.released_at = monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+    def dispose(self) -> None:
+        """Fecha todas as conexões ociosas (ex.: no shutdown ou após fork)."""
+        with self._cond:
+            while self._idle:
+                self._close(self._idle.pop())
+                self._opened -= 1
+
+    # --- estatísticas ---
+    def _record_checkout(self, waited: float) -> None:
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+            second = int(monotonic())
+            index = second % self.RATE_WINDOW
+            bucket_second, count = self._rate_buckets[index]
+            self._rate_buckets[index] = (second, count + 1 if bucket_second == second else 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna conexões em uso/ociosas, tempo de espera e checkouts por segundo."""
+        with self._cond:
+            now = int(monotonic())
+            recent = sum(count for second, count in self._rate_buckets if now - second < self.RATE_WINDOW)
+            window = min(self.RATE_WINDOW, max(1.0, monotonic() - self._started_at))
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "opened": self._opened,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "overflow": max(0, self._opened - self.size),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "wait_time_total": round(self._wait_total, 6),
+                "wait_time_avg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "wait_time_max": round(self._wait_max, 6),
+                "checkouts_per_second": round(recent / window, 3),
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Cria o pool sob demanda (um por processo, seguro após fork de workers)."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(**pool_config, **db_config)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
+
+
+class DbSession:
+    """
+    Unidade de trabalho: uma conexão e uma transação compartilhadas por todas as
+    chamadas dos models dentro do mesmo escopo (request Flask ou unit_of_work).
+    """
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.entry: Optional[PooledConnection] = None
+        self.failed = False      # transação perdida (deadlock, conexão caiu...) → rollback no final
+        self.errors = 0          # blocos de get_cursor que falharam (desfeitos pelo savepoint do bloco)
+        self.depth = 0           # nível atual de savepoints aninhados
+        self.after_commit: List[Callable[[], None]] = []
+
+    @property
+    def conn(self):
+        # A conexão só é retirada do pool no primeiro uso
+        if self.entry is None:
+            self.entry = self.pool.acquire()
+        return self.entry.conn
+
+    def execute(self, statement: str) -> None:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    def close(self, commit: bool = True) -> None:
+        committed = commit and not self.failed
+        self.failed = False  # a sessão pode ser reutilizada (nova transação no próximo comando)
+        if self.entry is not None:
+            discard = False
+            try:
+                if committed:
+                    self.entry.conn.commit()
+                else:
+                    self.entry.conn.rollback()
+            except Exception as e:
+                logger.exception(f"Erro ao finalizar transação: {e}")
+                committed = False
+                discard = True
+                try:
+                    self.entry.conn.rollback()
+                except Exception:
+                    pass
+            finally:
+                self.pool.release(self.entry, discard=discard)
+                self.entry = None
+
+        callbacks, self.after_commit = self.after_commit, []
+        if committed:
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.exception(f"Erro em callback pós-commit: {e}")
+
+
+_local = threading.local()
+
+
+def _current_session() -> Optional[DbSession]:
+    if has_app_context():
+        if "db_session" not in g:
+            g.db_session = DbSession(get_pool())
+        return g.db_session
+    return getattr(_local, "session", None)
+
+
+def on_commit(callback: Callable[[], None]) -> None:
+    """
+    Executa `callback` depois que a transação atual for confirmada (ex.: invalidar caches).
+    Fora de uma unidade de trabalho o comando já foi confirmado, então executa na hora.
+    """
+    session = _current_session()
+    if session is None:
+        callback()
+    else:
+        session.after_commit.append(callback)
+
+
+def end_transaction() -> None:
+    """
+    Finaliza já a transação atual (commit, ou rollback se algo falhou) e devolve a conexão ao
+    pool; o próximo comando abre outra. Usado antes de esperas longas fora do banco (bcrypt),
+    para que um pico de logins não prenda todas as conexões do pool.
+    """
+    session = _current_session()
+    if session is not None:
+        session.close()
+
+
+def init_app(app: Flask) -> None:
+    """Finaliza a transação do request (commit ou rollback) no teardown do app context."""
+    query_log.init_app(app)
+
+    @app.teardown_appcontext
+    def close_db_session(exc: Optional[BaseException]):
+        session = g.pop("db_session", None)
+        if session is not None:
+            session.close(commit=exc is None)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Abre uma unidade de trabalho fora de um request (scripts, jobs em background).
+    Dentro de um request apenas reutiliza a sessão já existente.
+    """
+    session = _current_session()
+    if session is not None:
+        yield session
+        return
+
+    session = DbSession(get_pool())
+    _local.session = session
+    ok = False
+    try:
+        yield session
+        ok = True
+    finally:
+        _local.session = None
+        # Fora de request não há flash a preservar: qualquer erro, mesmo engolido, desfaz tudo
+        session.close(commit=ok and not session.errors)
+
+
+@contextmanager
+def savepoint():
+    """
+    Bloco aninhado dentro da transação atual. Se algo falhar dentro dele
+    (exceção ou erro engolido pelos models), apenas o bloco é desfeito — inclusive
+    os comandos de outros get_cursor do bloco que tinham dado certo.
+    """
+    with unit_of_work() as session:
+        name = f"sp_{session.depth}"
+        prior_failed = session.failed
+        prior_errors = session.errors
+        session.execute(f"SAVEPOINT {name}")
+        session.depth += 1
+        try:
+            yield session
+        except Exception:
+            session.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            session.failed = prior_failed
+            raise
+        else:
+            if (session.failed and not prior_failed) or session.errors > prior_errors:
+                session.execute(f"ROLLBACK TO SAVEPOINT {name}")
+                session.failed = prior_failed
+            else:
+                session.execute(f"RELEASE SAVEPOINT {name}")
+        finally:
+            session.depth -= 1
+
 
 @contextmanager
 def get_cursor(dictionary: bool = True):
-    conn = None
+    session = _current_session()
+    if session is not None:
+        # Dentro de uma unidade de trabalho: commit/rollback ficam para o final dela.
+        # Cada bloco abre um savepoint: um erro (mesmo engolido pelo model) desfaz só o bloco,
+        # e o resto da transação (ex.: a sessão com o flash do erro) continua valendo.
+        name = f"cursor_{session.depth}"
+        cursor = None
+        session.depth += 1
+        try:
+            session.execute(f"SAVEPOINT {name}")
+            cursor = session.conn.cursor(dictionary=dictionary)
+            yield query_log.wrap_cursor(cursor)
+        except Exception as e:
+            if isinstance(e, Error):
+                logger.exception(f"Erro ao conectar no banco: {e}")
+            session.errors += 1
+            try:
+                if cursor:
+                    cursor.close()
+                    cursor = None
+                session.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            except Exception:
+                # Savepoint perdido (deadlock desfaz a transação inteira, conexão caiu...)
+                session.failed = True
+            raise
+        finally:
+            session.depth -= 1
+            if cursor:
+                cursor.close()
+        return
+
+    pool = get_pool()
+    entry = None
     cursor = None
+    discard = False
     try:
-        conn = connect(**db_config)
-        cursor = conn.cursor(dictionary=dictionary)
-        yield cursor
-        conn.commit()
-    except Error as e:
-        logger.exception(f"Erro ao conectar no banco: {e}")
-        if conn:
-            conn.rollback()
+        entry = pool.acquire()
+        cursor = entry.conn.cursor(dictionary=dictionary)
+        yield query_log.wrap_cursor(cursor)
+        entry.conn.commit()
+    except Exception as e:
+        if isinstance(e, Error):
+            logger.exception(f"Erro ao conectar no banco: {e}")
+        if entry:
+            try:
+                entry.conn.rollback()
+            except Exception:
+                discard = True
         raise
     finally:
         if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+            try:
+                cursor.close()
+            except Exception:
+                discard = True
+        if entry:
+            pool.release(entry, discard=discard)
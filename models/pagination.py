@@ -1,26 +1,40 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from dataclasses import dataclass
+from datetime import datetime
 from math import ceil
+from typing import Any, Dict, List, Optional, Tuple
 
 @dataclass
 class PaginationInfo:
     page: int
     per_page: int
     total_items: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    has_more: Optional[bool] = None   # conhecido sem COUNT quando a página busca per_page + 1 itens
+    approximate: bool = False         # total_items estimado (information_schema)
 
     @property
     def total_pages(self) -> int:
         """Calcula o número total de páginas."""
-        return ceil(self.total_items / self.per_page) if self.per_page else 1
+        pages = ceil(self.total_items / self.per_page) if self.per_page else 1
+        if self.approximate:
+            # A estimativa nunca pode ficar atrás da página que o usuário já alcançou
+            pages = max(pages, self.page + (1 if self.has_more else 0))
+        return pages
 
     @property
     def has_next(self) -> bool:
         """Verifica se há próxima página."""
+        if self.has_more is not None:
+            return self.has_more
         return self.page < self.total_pages
 
     @property
     def has_prev(self) -> bool:
         """Verifica se há página anterior."""
-        return self.page > 1
+        return self.page > 1 or self.prev_cursor is not None
 
     def to_dict(self) -> dict:
         """Retorna os metadados da paginação em formato de dicionário."""
@@ -31,4 +45,125 @@ class PaginationInfo:
             "total_pages": self.total_pages,
             "has_next": self.has_next,
             "has_prev": self.has_prev,
+            "next_cursor": self.next_cursor,
+            "prev_cursor": self.prev_cursor,
+            "approximate": self.approximate,
         }
+
+
+# ==========================================================
+# 🔖 Paginação por keyset (cursor opaco com created_at + id)
+# ==========================================================
+def _encode_token(payload: list) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_token(token: str) -> list:
+    padded = token + "=" * (-len(token) % 4)
+    payload = json.loads(urlsafe_b64decode(padded.encode("ascii")))
+    if not isinstance(payload, list) or len(payload) != 3 or payload[0] not in {"n", "p"}:
+        raise ValueError("cursor inválido")
+    payload[0] = "next" if payload[0] == "n" else "prev"
+    return payload
+
+
+def encode_cursor(direction: str, created_at: datetime, id: str) -> str:
+    """Gera o token opaco de um cursor ('next' ou 'prev') a partir da linha de borda da página."""
+    return _encode_token([direction[0], created_at.isoformat(), id])
+
+
+def decode_cursor(token: str) -> Optional[Tuple[str, datetime, str]]:
+    """Decodifica o token; retorna None se for inválido ou adulterado."""
+    try:
+        direction, created_at, id = _decode_token(token)
+        return direction, datetime.fromisoformat(created_at), str(id)
+    except (ValueError, TypeError):
+        return None
+
+
+def encode_score_cursor(direction: str, score: float, id: str) -> str:
+    """Cursor para listas ordenadas por relevância (score DESC, id ASC), como a busca."""
+    return _encode_token([direction[0], float(score), id])
+
+
+def decode_score_cursor(token: str) -> Optional[Tuple[str, float, str]]:
+    try:
+        direction, score, id = _decode_token(token)
+        return direction, float(score), str(id)
+    except (ValueError, TypeError):
+        return None
+
+
+def approximate_count(cursor, table: str) -> int:
+    """Total estimado de linhas a partir das estatísticas do InnoDB (sem varrer a tabela)."""
+    cursor.execute(
+        "SELECT TABLE_ROWS AS total FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    row = cursor.fetchone()
+    return int(row["total"] or 0) if row else 0
+
+
+def fetch_page(cursor, table: str, page: int = 1, per_page: int = 20,
+               cursor_token: Optional[str] = None, exact_total: bool = True,
+               select: str = "*", alias: str = "", joins: str = "") -> Tuple[List[Dict[str, Any]], PaginationInfo]:
+    """
+    Busca uma página de `table` ordenada por (created_at, id).
+    - Sem cursor → LIMIT/OFFSET pelo número da página.
+    - Com cursor → keyset (WHERE created_at/id após a borda), custo constante em qualquer profundidade.
+    O total é exato (COUNT) ou aproximado (information_schema) conforme exact_total.
+    `select`, `alias` e `joins` permitem trazer colunas de tabelas relacionadas na mesma query.
+    """
+    keyset = decode_cursor(cursor_token) if cursor_token else None
+    source = " ".join(part for part in (table, alias, joins) if part)
+    t = alias or table
+
+    if keyset:
+        direction, created_at, last_id = keyset
+        if direction == "next":
+            cursor.execute(
+                f"SELECT {select} FROM {source} WHERE {t}.created_at > %s OR ({t}.created_at = %s AND {t}.id > %s) "
+                f"ORDER BY {t}.created_at ASC, {t}.id ASC LIMIT %s",
+                (created_at, created_at, last_id, per_page + 1),
+            )
+        else:
+            cursor.execute(
+                f"SELECT {select} FROM {source} WHERE {t}.created_at < %s OR ({t}.created_at = %s AND {t}.id < %s) "
+                f"ORDER BY {t}.created_at DESC, {t}.id DESC LIMIT %s",
+                (created_at, created_at, last_id, per_page + 1),
+            )
+    else:
+        offset = (page - 1) * per_page
+        cursor.execute(
+            f"SELECT {select} FROM {source} ORDER BY {t}.created_at ASC, {t}.id ASC LIMIT %s OFFSET %s",
+            (per_page + 1, offset),
+        )
+
+    rows = cursor.fetchall()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if keyset and keyset[0] == "prev":
+        rows.reverse()
+        has_more, has_before = True, more
+    else:
+        has_more, has_before = more, bool(keyset) or page > 1
+
+    if exact_total:
+        cursor.execute(f"SELECT COUNT(*) AS total FROM {table}")
+        total = cursor.fetchone()["total"]
+    else:
+        total = approximate_count(cursor, table)
+
+    pagination = PaginationInfo(
+        page=page,
+        per_page=per_page,
+        total_items=total,
+        next_cursor=encode_cursor("next", rows[-1]["created_at"], rows[-1]["id"]) if rows and has_more else None,
+        prev_cursor=encode_cursor("prev", rows[0]["created_at"], rows[0]["id"]) if rows and has_before else None,
+        has_more=has_more,
+        approximate=not exact_total,
+    )
+    return rows, pagination
@@ -0,0 +1,176 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, g, has_request_context, request
+from loguru import logger
+
+from config import metrics_config, query_log_config
+from services.metrics import DB_QUERIES, DB_QUERY_LATENCY
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize(statement: str) -> str:
+    """SQL sem valores ("WHERE id IN (%s, %s)" → "WHERE id IN (?)"), usado para agrupar repetições."""
+    text = _STRING.sub("?", statement)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(?)", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    duration: float
+    rows: int = 0
+
+
+@dataclass
+class RequestQueries:
+    """Consultas executadas durante um request."""
+    count: int = 0
+    total_time: float = 0.0
+    records: List[QueryRecord] = field(default_factory=list)
+    repeats: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, record: QueryRecord) -> None:
+        self.count += 1
+        self.total_time += record.duration
+        normalized = normalize(record.statement)
+        self.repeats[normalized] = self.repeats.get(normalized, 0) + 1
+        if len(self.records) < query_log_config["max_records"]:
+            self.records.append(record)
+
+    def n_plus_one(self, threshold: int) -> Dict[str, int]:
+        return {statement: count for statement, count in self.repeats.items() if count > threshold}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_time * 1000, 3),
+            "queries": [
+                {"statement": normalize(r.statement), "ms": round(r.duration * 1000, 3), "rows": r.rows}
+                for r in self.records
+            ],
+        }
+
+
+def current_queries() -> Optional[RequestQueries]:
+    return g.get("db_queries") if has_request_context() else None
+
+
+def _record(statement: Any, duration: float, rows: int) -> QueryRecord:
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", "replace")
+    record = QueryRecord(str(statement), duration, rows)
+    DB_QUERIES.inc()
+    DB_QUERY_LATENCY.observe(duration)
+    if not query_log_config["enabled"]:
+        return record
+    queries = current_queries()
+    if queries is not None:
+        queries.add(record)
+    if duration * 1000 >= query_log_config["slow_ms"]:
+        logger.bind(slow_query=True).warning(
+            f"Consulta lenta ({duration * 1000:.1f} ms): {normalize(record.statement)}"
+        )
+    return record
+
+
+class InstrumentedCursor:
+    """
+    Proxy do cursor do mysql.connector que mede cada execute/executemany e conta as
+    linhas retornadas pelos fetch*. Só é usado com QUERY_LOG_ENABLED ou METRICS_ENABLED.
+    """
+
+    __slots__ = ("_cursor", "_last")
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._last: Optional[QueryRecord] = None
+
+    def _timed(self, method, statement, args, kwargs):
+        started = perf_counter()
+        try:
+            return method(statement, *args, **kwargs)
+        finally:
+            # Em DML o rowcount são as linhas afetadas; em SELECT as linhas vêm dos fetch*
+            rows = 0 if getattr(self._cursor, "with_rows", False) else max(self._cursor.rowcount, 0)
+            self._last = _record(statement, perf_counter() - started, rows)
+
+    def execute(self, statement, *args, **kwargs):
+        return self._timed(self._cursor.execute, statement, args, kwargs)
+
+    def executemany(self, statement, *args, **kwargs):
+        return self._timed(self._cursor.executemany, statement, args, kwargs)
+
+    def _count(self, rows: int) -> None:
+        if self._last is not None:
+            self._last.rows += rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count(row is not None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+_WRAP = query_log_config["enabled"] or metrics_config["enabled"]
+
+
+def wrap_cursor(cursor):
+    return InstrumentedCursor(cursor) if _WRAP else cursor
+
+
+def init_app(app: Flask) -> None:
+    """Coleta as consultas de cada request, aponta N+1 e devolve o header Server-Timing."""
+    if not query_log_config["enabled"]:
+        return
+
+    if query_log_config["slow_log_path"]:
+        logger.add(query_log_config["slow_log_path"], filter=lambda r: r["extra"].get("slow_query"),
+                   rotation="50 MB", retention=5, enqueue=True)
+
+    @app.before_request
+    def start_query_log():
+        g.db_queries = RequestQueries()
+
+    @app.after_request
+    def finish_query_log(response):
+        queries = g.pop("db_queries", None)
+        if queries is None:
+            return response
+
+        for statement, count in queries.n_plus_one(query_log_config["n_plus_one_threshold"]).items():
+            logger.warning(f"Possível N+1 em {request.method} {request.path}: {count}x {statement}")
+
+        if query_log_config["server_timing"]:
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={queries.total_time * 1000:.2f};desc="{queries.count} queries"',
+            )
+        return response
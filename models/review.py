@@ -1,10 +1,73 @@
 from loguru import logger
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
 
-from models.book import BookEntity
-from models.db import BaseEntity, get_cursor
-from models.user import UserEntity
+from models.book import Book, BookEntity
+from models.db import BaseEntity, get_cursor, unit_of_work
+from models.user import User, UserEntity
+
+
+def _entity_columns(entity_cls) -> List[str]:
+    """Colunas do banco de uma entidade (ignora relações e campos agregados)."""
+    return [f.name for f in fields(entity_cls) if f.metadata.get("column", True)]
+
+
+# ==========================================================
+# 📊 Manutenção de book_stats (mesma transação da escrita na review)
+# ==========================================================
+def _rating_column(rating: Any) -> str:
+    rating = int(rating)
+    if rating not in range(1, 6):
+        raise ValueError(f"Invalid rating: {rating}")
+    return f"rating_{rating}"
+
+
+def _stats_add(cursor, book_id: str, rating: Any) -> None:
+    column = _rating_column(rating)
+    cursor.execute(
+        f"""
+            INSERT INTO book_stats (book_id, review_count, rating_sum, {column}, last_review_at)
+            VALUES (%s, 1, %s, 1, NOW())
+            ON DUPLICATE KEY UPDATE review_count = review_count + 1, rating_sum = rating_sum + %s,
+                                    {column} = {column} + 1, last_review_at = NOW()
+        """, (book_id, int(rating), int(rating)),
+    )
+
+
+def _stats_remove(cursor, book_id: str, rating: Any) -> None:
+    # Executado depois do DELETE/UPDATE: recalcula a última data pelo índice (book_id, created_at)
+    column = _rating_column(rating)
+    cursor.execute(
+        f"""
+            UPDATE book_stats
+            SET review_count = review_count - 1, rating_sum = rating_sum - %s, {column} = {column} - 1,
+                last_review_at = (SELECT MAX(created_at) FROM reviews WHERE book_id = %s)
+            WHERE book_id = %s
+        """, (int(rating), book_id, book_id),
+    )
+
+
+def _stats_change_rating(cursor, book_id: str, old_rating: Any, new_rating: Any) -> None:
+    old_column, new_column = _rating_column(old_rating), _rating_column(new_rating)
+    if old_column == new_column:
+        return
+    cursor.execute(
+        f"""
+            UPDATE book_stats
+            SET rating_sum = rating_sum - %s + %s, {old_column} = {old_column} - 1, {new_column} = {new_column} + 1
+            WHERE book_id = %s
+        """, (int(old_rating), int(new_rating), book_id),
+    )
+
+
+def _prefixed_select(alias: str, entity_cls) -> str:
+    return ", ".join(f"{alias}.{col} AS {alias}__{col}" for col in _entity_columns(entity_cls))
+
+
+def _split_prefixed(row: Dict[str, Any], alias: str) -> Optional[Dict[str, Any]]:
+    prefix = f"{alias}__"
+    data = {key[len(prefix):]: value for key, value in row.items() if key.startswith(prefix)}
+    return data if data.get("id") is not None else None
 
 
 @dataclass
@@ -13,8 +76,13 @@ class ReviewEntity(BaseEntity):
     book_id: str
     rating: int
     comment: str
-    user: Optional[UserEntity] = None
-    book: Optional[BookEntity] = None
+    user: Optional[UserEntity] = field(default=None, metadata={"column": False})
+    book: Optional[BookEntity] = field(default=None, metadata={"column": False})
+
+    @property
+    def cache_key(self) -> str:
+        # O nome do autor é exibido junto com a avaliação
+        return f"{super().cache_key}:{self.user.cache_key if self.user else ''}"
 
 
 class Review:
@@ -49,6 +117,62 @@ class Review:
             logger.exception(f"Erro ao buscar avaliações: {e}")
             return None
 
+    # GET - avaliações a partir de um campo, já com usuário/livro carregados via JOIN (1 query)
+    @staticmethod
+    def get_reviews_with_relations(key: str, value: str, with_user: bool = True, with_book: bool = False) -> List[ReviewEntity]:
+        try:
+            allowed_keys = {"user_id", "book_id", "rating"}
+            if key not in allowed_keys:
+                raise ValueError(f"Invalid column: {key}")
+
+            columns = [_prefixed_select("r", ReviewEntity)]
+            joins = []
+            if with_user:
+                columns.append(_prefixed_select("u", UserEntity))
+                joins.append("LEFT JOIN users u ON u.id = r.user_id")
+            if with_book:
+                columns.append(_prefixed_select("b", BookEntity))
+                joins.append("LEFT JOIN books b ON b.id = r.book_id")
+
+            with get_cursor() as cursor:
+                cursor.execute(
+                    f"SELECT {', '.join(columns)} FROM reviews r {' '.join(joins)} "
+                    f"WHERE r.{key} = %s ORDER BY r.created_at DESC",
+                    (value,),
+                )
+                rows = cursor.fetchall()
+
+            reviews = []
+            for row in rows:
+                review = ReviewEntity(**_split_prefixed(row, "r"))
+                user = _split_prefixed(row, "u") if with_user else None
+                book = _split_prefixed(row, "b") if with_book else None
+                review.user = UserEntity(**user) if user else None
+                review.book = BookEntity(**book) if book else None
+                reviews.append(review)
+            return reviews
+        except Exception as e:
+            logger.exception(f"Erro ao buscar avaliações com relacionamentos: {e}")
+            return []
+
+    # Preenche review.user / review.book de uma lista já carregada (1 query por relação)
+    @staticmethod
+    def load_relations(reviews: List[ReviewEntity], with_user: bool = True, with_book: bool = True) -> List[ReviewEntity]:
+        if not reviews:
+            return reviews
+
+        if with_user:
+            users = User.get_users_by_ids(review.user_id for review in reviews)
+            for review in reviews:
+                review.user = users.get(review.user_id)
+
+        if with_book:
+            books = Book.get_books_by_ids(review.book_id for review in reviews)
+            for review in reviews:
+                review.book = books.get(review.book_id)
+
+        return reviews
+
     # POST - criar avaliação
     @staticmethod
     def create_review(review: ReviewEntity) -> bool:
@@ -60,6 +184,8 @@ class Review:
                         VALUES (%s, %s, %s, %s, %s)
                     """, (review.id, review.user_id, review.book_id, review.rating, review.comment,),
                 )
+                _stats_add(cursor, review.book_id, review.rating)
+            Book.bump_data_version()
             return True
         except Exception as e:
             logger.exception(f"Erro ao criar avaliação: {e}")
@@ -70,10 +196,18 @@ class Review:
     def update_review(review: ReviewEntity) -> bool:
         try:
             with get_cursor() as cursor:
+                cursor.execute("SELECT book_id, rating FROM reviews WHERE id = %s FOR UPDATE", (review.id,))
+                previous = cursor.fetchone()
                 cursor.execute(
                     "UPDATE reviews SET user_id = %s, book_id = %s, rating = %s, comment = %s WHERE id = %s",
                     (review.user_id, review.book_id, review.rating, review.comment, review.id),
                 )
+                if previous and previous["book_id"] == review.book_id:
+                    _stats_change_rating(cursor, review.book_id, previous["rating"], review.rating)
+                elif previous:
+                    _stats_remove(cursor, previous["book_id"], previous["rating"])
+                    _stats_add(cursor, review.book_id, review.rating)
+            Book.bump_data_version()
             return True
         except Exception as e:
             logger.exception(f"Erro ao atualizar avaliação: {e}")
@@ -84,8 +218,48 @@ class Review:
     def delete_review(id: str) -> bool:
         try:
             with get_cursor() as cursor:
+                cursor.execute("SELECT book_id, rating FROM reviews WHERE id = %s FOR UPDATE", (id,))
+                previous = cursor.fetchone()
                 cursor.execute("DELETE FROM reviews WHERE id = %s", (id,))
+                if previous:
+                    _stats_remove(cursor, previous["book_id"], previous["rating"])
+            Book.bump_data_version()
             return True
         except Exception as e:
             logger.exception(f"Erro ao deletar avaliação: {e}")
             return False
+
+    # Reconstrói book_stats inteira a partir de reviews (job de reconciliação)
+    @staticmethod
+    def rebuild_book_stats() -> bool:
+        try:
+            with unit_of_work():
+                with get_cursor() as cursor:
+                    cursor.execute(
+                        """
+                            INSERT INTO book_stats (book_id, review_count, rating_sum, rating_1, rating_2,
+                                                    rating_3, rating_4, rating_5, last_review_at)
+                            SELECT book_id, COUNT(*), SUM(rating),
+                                   SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5),
+                                   MAX(created_at)
+                            FROM reviews
+                            GROUP BY book_id
+                            ON DUPLICATE KEY UPDATE review_count = VALUES(review_count), rating_sum = VALUES(rating_sum),
+                                rating_1 = VALUES(rating_1), rating_2 = VALUES(rating_2), rating_3 = VALUES(rating_3),
+                                rating_4 = VALUES(rating_4), rating_5 = VALUES(rating_5),
+                                last_review_at = VALUES(last_review_at)
+                        """
+                    )
+                    # Livros que perderam todas as avaliações
+                    cursor.execute(
+                        """
+                            DELETE s FROM book_stats s
+                            LEFT JOIN reviews r ON r.book_id = s.book_id
+                            WHERE r.id IS NULL
+                        """
+                    )
+                Book.bump_data_version()
+            return True
+        except Exception as e:
+            logger.exception(f"Erro ao reconstruir estatísticas dos livros: {e}")
+            return False
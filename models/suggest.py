@@ -0,0 +1,186 @@
+import sys
+import threading
+from bisect import bisect_left, insort
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from config import suggest_config
+from models.db import get_cursor
+from models.text import fold
+
+# (chave normalizada, tipo, texto exibido, id do livro)
+Entry = Tuple[str, str, str, str]
+
+
+class SuggestIndex:
+    """
+    Índice de prefixos em memória para o autocomplete de títulos e autores.
+    Mantém uma lista ordenada de chaves normalizadas (sem acento/minúsculas) e responde
+    com bisect em O(log n). Cada palavra do título/autor também vira ponto de entrada,
+    então "aneis" encontra "O Senhor dos Anéis".
+    """
+
+    LATENCY_SAMPLES = 1024
+
+    def __init__(self, max_entries: int = 2_000_000, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: List[Entry] = []
+        self._by_book: Dict[str, List[Entry]] = {}
+        self._bytes = 0
+        self._truncated = False
+        self._lock = threading.RLock()
+        # Alterações feitas enquanto um rebuild lê o banco: reaplicadas sobre o índice novo
+        self._pending: Optional[List[Tuple[str, Optional[str], Optional[str]]]] = None
+        self._latencies: List[float] = []
+        self._latency_pos = 0
+
+    # --- construção das chaves ---
+    @staticmethod
+    def _keys_for(text: str) -> List[str]:
+        words = fold(text).split()
+        return list(dict.fromkeys(" ".join(words[i:]) for i in range(len(words))))
+
+    @classmethod
+    def _entries_for(cls, book_id: str, title: Optional[str], author: Optional[str]) -> List[Entry]:
+        entries = []
+        for kind, text in (("title", title), ("author", author)):
+            if text:
+                entries.extend((key, kind, text, book_id) for key in cls._keys_for(text))
+        return entries
+
+    @staticmethod
+    def _size_of(entry: Entry) -> int:
+        # Estimativa: strings + tupla + slot na lista (os textos exibidos são compartilhados)
+        return sys.getsizeof(entry[0]) + sys.getsizeof(entry) + 8
+
+    def _fits(self, entries: List[Entry]) -> bool:
+        size = sum(self._size_of(e) for e in entries)
+        if len(self._entries) + len(entries) > self.max_entries or self._bytes + size > self.max_bytes:
+            if not self._truncated:
+                logger.warning("Índice de sugestões atingiu o limite de memória; novos livros não serão indexados.")
+            self._truncated = True
+            return False
+        self._bytes += size
+        return True
+
+    # --- atualização incremental ---
+    def add(self, book_id: str, title: Optional[str], author: Optional[str]) -> None:
+        entries = self._entries_for(book_id, title, author)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((book_id, title, author))
+            self._add_locked(book_id, entries)
+
+    def remove(self, book_id: str) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((book_id, None, None))
+            self._remove_locked(book_id)
+
+    def _add_locked(self, book_id: str, entries: List[Entry]) -> None:
+        self._remove_locked(book_id)
+        if not entries or not self._fits(entries):
+            return
+        for entry in entries:
+            insort(self._entries, entry)
+        self._by_book[book_id] = entries
+
+    def _remove_locked(self, book_id: str) -> None:
+        for entry in self._by_book.pop(book_id, []):
+            index = bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+                self._bytes -= self._size_of(entry)
+
+    def rebuild(self) -> None:
+        """
+        Reconstrói o índice em uma única passada (cursor sem buffer) e troca de forma atômica.
+        add/remove feitos durante a leitura (o snapshot do banco pode não vê-los) são
+        reaplicados sobre o índice novo antes de ele entrar em uso.
+        """
+        started = perf_counter()
+        entries: List[Entry] = []
+        by_book: Dict[str, List[Entry]] = {}
+        size = 0
+        truncated = False
+        with self._lock:
+            self._pending = []
+        try:
+            with get_cursor() as cursor:
+                cursor.execute("SELECT id, title, author FROM books")
+                while True:
+                    rows = cursor.fetchmany(1000)
+                    if not rows:
+                        break
+                    for row in rows:
+                        book_entries = self._entries_for(row["id"], row["title"], row["author"])
+                        book_size = sum(self._size_of(e) for e in book_entries)
+                        if len(entries) + len(book_entries) > self.max_entries or size + book_size > self.max_bytes:
+                            truncated = True
+                            continue
+                        entries.extend(book_entries)
+                        by_book[row["id"]] = book_entries
+                        size += book_size
+        except Exception as e:
+            with self._lock:
+                self._pending = None
+            logger.exception(f"Erro ao reconstruir índice de sugestões: {e}")
+            return
+
+        entries.sort()
+        with self._lock:
+            self._entries, self._by_book, self._bytes, self._truncated = entries, by_book, size, truncated
+            pending, self._pending = self._pending, None
+            for book_id, title, author in pending:
+                self._add_locked(book_id, self._entries_for(book_id, title, author))
+        logger.info(f"Índice de sugestões reconstruído: {len(by_book)} livros, "
+                    f"{len(entries)} chaves em {perf_counter() - started:.2f}s")
+
+    # --- consulta ---
+    def suggest(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
+        started = perf_counter()
+        prefix = " ".join(fold(query).split())
+        results: List[Dict[str, Any]] = []
+        if prefix:
+            seen = set()
+            with self._lock:
+                index = bisect_left(self._entries, (prefix,))
+                # Percorre no máximo algumas vezes o limite para remover repetidos (ex.: mesmo autor)
+                for key, kind, text, book_id in self._entries[index:index + limit * 10]:
+                    if not key.startswith(prefix):
+                        break
+                    if (kind, text) in seen:
+                        continue
+                    seen.add((kind, text))
+                    results.append({"text": text, "kind": kind, "book_id": book_id})
+                    if len(results) >= limit:
+                        break
+        self._record_latency(perf_counter() - started)
+        return results
+
+    def _record_latency(self, elapsed: float) -> None:
+        with self._lock:
+            if len(self._latencies) < self.LATENCY_SAMPLES:
+                self._latencies.append(elapsed)
+            else:
+                self._latencies[self._latency_pos] = elapsed
+                self._latency_pos = (self._latency_pos + 1) % self.LATENCY_SAMPLES
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._latencies)
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+            return {
+                "books": len(self._by_book),
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "truncated": self._truncated,
+                "p99_ms": round(p99 * 1000, 3),
+            }
+
+
+suggest_index = SuggestIndex(suggest_config["max_entries"], suggest_config["max_bytes"])
@@ -0,0 +1,28 @@
+import re
+import unicodedata
+from typing import List
+
+# Stopwords em português (mesma lista da tabela ft_stopwords_pt da migração 0002)
+STOPWORDS_PT = {
+    "que", "para", "com", "não", "nao", "uma", "uns", "umas", "dos", "das", "nos", "nas",
+    "pelo", "pela", "pelos", "pelas", "mas", "como", "mais", "por", "seu", "sua", "seus",
+    "suas", "ele", "ela", "eles", "elas", "isso", "este", "esta", "esse", "essa", "aos",
+    "num", "numa", "sem", "sob", "sobre", "entre", "até", "ate", "quando", "muito",
+    "também", "tambem", "the", "and", "for", "with",
+}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos ("Coração" → "coracao")."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text: str, min_length: int = 1) -> List[str]:
+    """Quebra o texto em palavras normalizadas, sem stopwords e sem tokens curtos."""
+    return [
+        token for token in _WORD.findall(fold(text))
+        if len(token) >= min_length and token not in STOPWORDS_PT
+    ]
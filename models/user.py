@@ -1,9 +1,10 @@
 from loguru import logger
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
-from models.db import BaseEntity, get_cursor
-from models.pagination import PaginationInfo
+from models.book import Book
+from models.db import IN_BATCH_SIZE, BaseEntity, get_cursor
+from models.pagination import PaginationInfo, fetch_page
 
 
 @dataclass
@@ -16,30 +17,20 @@ class UserEntity(BaseEntity):
 
 class User:
 
-    # GET - retorna todos os usuários
+    # GET - retorna todos os usuários (paginação por página ou por cursor)
     @staticmethod
-    def get_users(page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def get_users(page: int = 1, per_page: int = 20, cursor: Optional[str] = None, exact_total: bool = True) -> Dict[str, Any]:
         try:
-            offset = (page - 1) * per_page
-            with get_cursor() as cursor:
-                cursor.execute("SELECT COUNT(*) AS total FROM users")
-                total_users = cursor.fetchone()["total"]
-                cursor.execute("SELECT * FROM users ORDER BY created_at ASC LIMIT %s OFFSET %s", (per_page, offset))
-                users = cursor.fetchall()
-                
-            pagination = PaginationInfo(
-                page=page,
-                per_page=per_page,
-                total_items=total_users
-            )
-            
+            with get_cursor() as db_cursor:
+                users, pagination = fetch_page(db_cursor, "users", page, per_page, cursor, exact_total)
+
             return {
                 "data": [UserEntity(**user) for user in users],
                 "pagination": pagination,
             }
         except Exception as e:
             logger.exception(f"Erro ao buscar usuários: {e}")
-            return []
+            return {"data": [], "pagination": PaginationInfo(page, per_page, 0)}
 
     # GET - retorna usuários a partir de um campo
     @staticmethod
@@ -58,6 +49,55 @@ class User:
             logger.exception(f"Erro ao buscar usuários: {e}")
             return None
 
+    # GET - resolve várias chaves de identidade (email/username) em uma única consulta
+    @staticmethod
+    def find_by_identity(**keys: Optional[str]) -> Dict[str, UserEntity]:
+        """
+        Ex.: find_by_identity(email=x, username=x) → {"email": user} / {"username": user} / {}.
+        Um SELECT por chave unida com UNION ALL: cada parte é um seek no índice único da coluna.
+        """
+        try:
+            allowed_keys = {"email", "username"}
+            keys = {key: value for key, value in keys.items() if value}
+            if not keys:
+                return {}
+            if not keys.keys() <= allowed_keys:
+                raise ValueError(f"Invalid column: {set(keys) - allowed_keys}")
+
+            query = " UNION ALL ".join(
+                f"SELECT *, '{key}' AS matched_by FROM final_project_db.users WHERE {key} = %s"
+                for key in keys
+            )
+            with get_cursor() as cursor:
+                cursor.execute(query, tuple(keys.values()))
+                matches = {}
+                for row in cursor.fetchall():
+                    matched_by = row.pop("matched_by")
+                    matches[matched_by] = UserEntity(**row)
+                return matches
+        except Exception as e:
+            logger.exception(f"Erro ao buscar usuário por identidade: {e}")
+            return {}
+
+    # GET - retorna vários usuários de uma vez a partir dos IDs (evita N+1)
+    @staticmethod
+    def get_users_by_ids(ids: Iterable[str]) -> Dict[str, UserEntity]:
+        try:
+            unique_ids = list(dict.fromkeys(i for i in ids if i))
+            users: Dict[str, UserEntity] = {}
+            if not unique_ids:
+                return users
+            with get_cursor() as cursor:
+                for start in range(0, len(unique_ids), IN_BATCH_SIZE):
+                    chunk = unique_ids[start:start + IN_BATCH_SIZE]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cursor.execute(f"SELECT * FROM final_project_db.users WHERE id IN ({placeholders})", tuple(chunk))
+                    users.update({u["id"]: UserEntity(**u) for u in cursor.fetchall()})
+            return users
+        except Exception as e:
+            logger.exception(f"Erro ao buscar usuários por IDs: {e}")
+            return {}
+
     # POST - criar usuário
     @staticmethod
     def create_user(user: UserEntity) -> bool:
@@ -88,12 +128,45 @@ class User:
             logger.exception(f"Erro ao atualizar usuário: {e}")
             return False
 
+    # PUT - atualizar apenas o hash da senha (redefinição / rehash no login)
+    @staticmethod
+    def update_password(id: str, password: str) -> bool:
+        try:
+            with get_cursor() as cursor:
+                cursor.execute("UPDATE final_project_db.users SET password = %s WHERE id = %s", (password, id))
+            return True
+        except Exception as e:
+            logger.exception(f"Erro ao atualizar senha do usuário: {e}")
+            return False
+
     # DELETE - deletar usuário a partir do ID
     @staticmethod
     def delete_user(id: str) -> bool:
         try:
             with get_cursor() as cursor:
+                # As avaliações somem em cascata: desconta-as de book_stats antes (mesma transação)
+                cursor.execute(
+                    """
+                        UPDATE book_stats bs
+                        JOIN (
+                            SELECT book_id, COUNT(*) AS total, SUM(rating) AS rating_sum,
+                                   SUM(rating = 1) AS rating_1, SUM(rating = 2) AS rating_2, SUM(rating = 3) AS rating_3,
+                                   SUM(rating = 4) AS rating_4, SUM(rating = 5) AS rating_5
+                            FROM reviews
+                            WHERE user_id = %s
+                            GROUP BY book_id
+                        ) r ON r.book_id = bs.book_id
+                        SET bs.review_count = bs.review_count - r.total, bs.rating_sum = bs.rating_sum - r.rating_sum,
+                            bs.rating_1 = bs.rating_1 - r.rating_1, bs.rating_2 = bs.rating_2 - r.rating_2,
+                            bs.rating_3 = bs.rating_3 - r.rating_3, bs.rating_4 = bs.rating_4 - r.rating_4,
+                            bs.rating_5 = bs.rating_5 - r.rating_5,
+                            bs.last_review_at = (SELECT MAX(o.created_at) FROM reviews o
+                                                 WHERE o.book_id = bs.book_id AND o.user_id <> %s)
+                    """, (id, id),
+                )
                 cursor.execute("DELETE FROM final_project_db.users WHERE id = %s", (id,))
+            # Notas dos livros mudaram: invalida o catálogo e troca a versão dos dados (páginas em cache)
+            Book.invalidate_catalog()
             return True
         except Exception as e:
             logger.exception(f"Erro ao deletar usuário: {e}")
@@ -0,0 +1,10 @@
+from loguru import logger
+
+from models.review import Review
+
+# Recalcula book_stats (contagem, soma, histograma e última avaliação) a partir de reviews.
+# Útil após importações em massa ou se algum agregado divergir.
+if Review.rebuild_book_stats():
+    print("Estatísticas dos livros reconstruídas!")
+else:
+    logger.error("Falha ao reconstruir as estatísticas dos livros.")
@@ -0,0 +1,257 @@
+import csv
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+from uuid import uuid4
+
+from loguru import logger
+
+from models.book import Book, BookEntity
+from models.db import get_cursor
+from models.suggest import suggest_index
+
+# Limites das colunas de books (database.sql)
+MAX_LENGTHS = {"upc": 50, "title": 255, "author": 255, "category": 100}
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("csv", "jsonl")
+JOB_RETENTION = 3600       # segundos que um job concluído continua consultável
+MAX_FINISHED_JOBS = 100
+
+UPSERT_SQL = """
+    INSERT INTO books (id, upc, title, author, img_link, description, category)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE {on_duplicate}
+"""
+ON_DUPLICATE = {
+    # Atualiza os dados do livro já existente com o mesmo UPC
+    "update": "title = VALUES(title), author = VALUES(author), img_link = VALUES(img_link), "
+              "description = VALUES(description), category = VALUES(category)",
+    # Mantém o livro existente (no-op)
+    "skip": "id = id",
+}
+
+
+@dataclass
+class ImportProgress:
+    job_id: str = field(default_factory=lambda: uuid4().hex)
+    status: str = "running"
+    rows_read: int = 0
+    rows_written: int = 0
+    rows_invalid: int = 0
+    rows_skipped: int = 0      # já processadas numa execução anterior (checkpoint)
+    batches: int = 0
+    errors: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return round(self.rows_read / elapsed, 1) if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["errors"] = self.errors[-20:]
+        data["rows_per_second"] = self.rows_per_second
+        return data
+
+
+# ==========================================================
+# 📄 Leitura em streaming (memória constante)
+# ==========================================================
+def iter_rows(stream: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        while True:
+            # Campo acima de csv.field_size_limit ou aspas malformadas: só o registro é rejeitado
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield {"_invalid": f"CSV inválido ({e})"}
+                continue
+            yield row
+    elif fmt == "jsonl":
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield {"_invalid": f"JSON inválido ({e})"}
+    else:
+        raise ValueError(f"Formato não suportado: {fmt}")
+
+
+def detect_format(path: str) -> str:
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def to_entity(row: Dict[str, Any]) -> BookEntity:
+    """Valida uma linha do arquivo e converte em BookEntity (levanta ValueError se inválida)."""
+    if not isinstance(row, dict) or "_invalid" in row:
+        raise ValueError(row.get("_invalid") if isinstance(row, dict) else "linha não é um objeto")
+    data = {key: (str(value).strip() if value is not None else None) for key, value in row.items() if key}
+    upc, title = data.get("upc"), data.get("title")
+    if not upc or not title:
+        raise ValueError("upc e title são obrigatórios")
+
+    for column, limit in MAX_LENGTHS.items():
+        if data.get(column) and len(data[column]) > limit:
+            raise ValueError(f"{column} excede {limit} caracteres")
+
+    img_link = data.get("img_link") or None
+    if img_link and not img_link.startswith(("http://", "https://", "cover_uploads/")):
+        raise ValueError("img_link deve ser uma URL http(s) ou um caminho cover_uploads/")
+
+    return BookEntity(
+        upc=upc,
+        title=title,
+        author=data.get("author") or "Unknown",
+        img_link=img_link,
+        description=data.get("description") or None,
+        category=data.get("category") or None,
+    )
+
+
+# ==========================================================
+# 💾 Checkpoint (retomada após falha)
+# ==========================================================
+def _checkpoint_path(source: str) -> str:
+    return f"{source}.checkpoint"
+
+
+def _load_checkpoint(source: str) -> int:
+    try:
+        with open(_checkpoint_path(source), encoding="utf-8") as file:
+            return int(json.load(file)["rows_done"])
+    except (FileNotFoundError, ValueError, KeyError):
+        return 0
+
+
+def _save_checkpoint(source: str, rows_done: int) -> None:
+    tmp_path = _checkpoint_path(source) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"rows_done": rows_done, "saved_at": time.time()}, file)
+    os.replace(tmp_path, _checkpoint_path(source))
+
+
+# ==========================================================
+# 🚚 Importação em lotes
+# ==========================================================
+def _write_batch(batch: Dict[str, BookEntity], on_duplicate: str) -> int:
+    # Uma transação por lote (get_cursor faz commit ao final); executemany vira um INSERT multi-linhas
+    with get_cursor() as cursor:
+        cursor.executemany(
+            UPSERT_SQL.format(on_duplicate=ON_DUPLICATE[on_duplicate]),
+            [(b.id, b.upc, b.title, b.author, b.img_link, b.description, b.category) for b in batch.values()],
+        )
+    return len(batch)
+
+
+def import_books(source: str, fmt: Optional[str] = None, batch_size: int = 1000,
+                 on_duplicate: str = "update", resume: bool = True,
+                 progress: Optional[ImportProgress] = None,
+                 on_progress: Optional[Callable[[ImportProgress], None]] = None) -> ImportProgress:
+    """
+    Importa livros de um CSV/JSONL de qualquer tamanho.
+    Deduplica por UPC (dentro do lote e no banco via ON DUPLICATE KEY UPDATE), grava em lotes
+    com executemany e salva um checkpoint após cada lote confirmado para poder retomar.
+    """
+    fmt = fmt or detect_format(source)
+    progress = progress or ImportProgress()
+    batch: Dict[str, BookEntity] = {}
+
+    def flush() -> None:
+        if batch:
+            progress.rows_written += _write_batch(batch, on_duplicate)
+            progress.batches += 1
+            batch.clear()
+        _save_checkpoint(source, progress.rows_read)
+        if on_progress:
+            on_progress(progress)
+
+    try:
+        # Dentro do try: num job em segundo plano, o erro vira status "failed" (e não "running" para sempre)
+        if on_duplicate not in ON_DUPLICATE:
+            raise ValueError(f"on_duplicate deve ser um de {sorted(ON_DUPLICATE)}")
+        already_done = _load_checkpoint(source) if resume else 0
+        with open(source, encoding="utf-8-sig", newline="") as stream:
+            for line_number, row in enumerate(iter_rows(stream, fmt), start=1):
+                progress.rows_read += 1
+                if line_number <= already_done:
+                    progress.rows_skipped += 1
+                    continue
+                try:
+                    book = to_entity(row)
+                    batch[book.upc] = book  # último valor vence para UPC repetido no lote
+                except (ValueError, TypeError) as e:
+                    progress.rows_invalid += 1
+                    if len(progress.errors) < MAX_REPORTED_ERRORS:
+                        progress.errors.append(f"linha {line_number}: {e}")
+                if len(batch) >= batch_size:
+                    flush()
+            flush()
+        progress.status = "done"
+        os.remove(_checkpoint_path(source))
+    except Exception as e:
+        logger.exception(f"Erro ao importar livros de {source}: {e}")
+        progress.status = "failed"
+        progress.errors.append(str(e))
+    finally:
+        progress.finished_at = time.time()
+        if progress.rows_written:
+            # Metadados derivados do catálogo
+            Book.invalidate_catalog()
+            threading.Thread(target=suggest_index.rebuild, name="suggest-rebuild", daemon=True).start()
+    return progress
+
+
+# ==========================================================
+# 🧵 Jobs em segundo plano (endpoint administrativo)
+# ==========================================================
+_jobs: Dict[str, ImportProgress] = {}
+_jobs_lock = threading.Lock()
+
+
+def _prune_jobs() -> None:
+    # Jobs concluídos saem depois de JOB_RETENTION (e os mais antigos além de MAX_FINISHED_JOBS)
+    now = time.time()
+    finished = sorted((job.finished_at, job_id) for job_id, job in _jobs.items() if job.finished_at)
+    for index, (finished_at, job_id) in enumerate(finished):
+        if now - finished_at > JOB_RETENTION or len(finished) - index > MAX_FINISHED_JOBS:
+            del _jobs[job_id]
+
+
+def _run_job(source: str, progress: ImportProgress, options: Dict[str, Any]) -> None:
+    try:
+        import_books(source, progress=progress, **options)
+    finally:
+        # O arquivo enviado (até IMPORT_MAX_UPLOAD_MB) pertence ao job: não fica no spool
+        for path in (source, _checkpoint_path(source)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def start_import_job(source: str, **options) -> ImportProgress:
+    """Importa em segundo plano um arquivo do spool de uploads; o arquivo é removido ao final."""
+    progress = ImportProgress()
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[progress.job_id] = progress
+    thread = threading.Thread(
+        target=_run_job, args=(source, progress, options),
+        name=f"book-import-{progress.job_id}", daemon=True,
+    )
+    thread.start()
+    return progress
+
+
+def get_import_job(job_id: str) -> Optional[ImportProgress]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
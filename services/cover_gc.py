@@ -0,0 +1,66 @@
+import os
+import time
+from typing import Callable, Dict, Optional, Set
+
+from loguru import logger
+
+from models.book import Book
+from services.cover_mirror import cover_mirror
+from services.covers import COVER_PREFIX, VARIANT_FORMATS, CoverPipeline, cover_pipeline
+
+
+def _owner(name: str) -> str:
+    """Capa a que o arquivo pertence, sem extensão ("abc_240.webp" → "abc"; "abc.jpg" → "abc")."""
+    stem, ext = os.path.splitext(name)
+    base, _, width = stem.rpartition("_")
+    if base and width.isdigit() and ext[1:] in VARIANT_FORMATS:
+        return base
+    return stem
+
+
+def referenced_stems() -> Optional[Set[str]]:
+    """Capas em uso: img_link locais dos livros e cópias das capas externas (None se o banco falhar)."""
+    links = Book.list_img_links(COVER_PREFIX)
+    if links is None:
+        return None
+    stems = set()
+    for link in (*links, *cover_mirror.mirrored_links()):
+        name = CoverPipeline.name_of(link)
+        if name:
+            stems.add(os.path.splitext(name)[0])
+    return stems
+
+
+def sweep(grace: float = 3600, dry_run: bool = False,
+          on_progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """
+    Remove do storage das capas os arquivos que nenhum livro (nem o espelho) referencia:
+    capas trocadas/removidas cuja limpeza falhou, variantes órfãs e temporários abandonados.
+    Arquivos mais novos que `grace` segundos são mantidos (upload cujo request ainda não
+    confirmou a transação).
+    """
+    stats = {"scanned": 0, "kept": 0, "removed": 0, "bytes_removed": 0}
+    referenced = referenced_stems()
+    if referenced is None:
+        # Sem a lista de referências, tudo pareceria órfão: não remove nada
+        raise RuntimeError("Não foi possível listar as capas em uso; varredura cancelada.")
+
+    started = time.time()
+    for item in cover_pipeline.storage.list():
+        stats["scanned"] += 1
+        stem = os.path.splitext(item.name)[0]
+        if (started - item.modified < grace
+                or (not item.name.endswith(".tmp") and (stem in referenced or _owner(item.name) in referenced))):
+            stats["kept"] += 1
+        else:
+            if not dry_run:
+                try:
+                    cover_pipeline.storage.delete(item.name)
+                except Exception as e:
+                    logger.warning(f"Não foi possível remover {item.name}: {e}")
+                    continue
+            stats["removed"] += 1
+            stats["bytes_removed"] += item.size
+        if on_progress and stats["scanned"] % 1000 == 0:
+            on_progress(stats)
+    return stats
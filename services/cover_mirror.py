@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import requests
+from flask import Flask
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import cover_mirror_config
+from models.book import Book
+from services.covers import CoverPipeline, InvalidCover, cover_pipeline
+from services.metrics import COVER_MIRROR_FETCHES
+
+USER_AGENT = "LitScore-CoverMirror/1.0"
+MIRROR_FOLDER = "mirror/"  # separado dos uploads: remover a capa de um livro nunca apaga uma cópia espelhada
+MAX_CACHED_ENTRIES = 50_000  # entradas do índice mantidas em memória (LRU)
+
+
+class CoverTooLarge(Exception):
+    """Capa remota acima de COVER_MIRROR_MAX_MB."""
+
+
+class _LimitedReader:
+    """Lê o corpo da resposta (já descomprimido) e interrompe ao passar de `limit` bytes."""
+
+    def __init__(self, response: requests.Response, limit: int):
+        self.raw = response.raw
+        self.limit = limit
+        self.total = 0
+
+    def read(self, size: int) -> bytes:
+        data = self.raw.read(size, decode_content=True)
+        self.total += len(data)
+        if self.total > self.limit:
+            raise CoverTooLarge(f"Capa maior que {self.limit} bytes")
+        return data
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """Session com conexões reaproveitadas (keep-alive) por host, uma por download simultâneo."""
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504)))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def is_remote(img_link: Optional[str]) -> bool:
+    return bool(img_link) and img_link.startswith(("http://", "https://"))
+
+
+class CoverMirror:
+    """
+    Cópia local das capas hospedadas em outros sites (books.img_link com URL externa).
+
+    - A primeira exibição agenda o download em um pool de threads limitado (uma
+      requests.Session com pool de conexões); até lá o template usa a URL original.
+    - A imagem baixada entra no CoverPipeline: arquivo por hash em cover_uploads/mirror/
+      e variantes WebP/JPEG, como as capas enviadas.
+    - O índice URL → img_link local fica em um JSON por URL (compartilhado entre workers)
+      e guarda ETag/Last-Modified: a revalidação periódica é um GET condicional (304).
+    - Falhas (timeout, 404, arquivo grande demais, não é imagem) só são tentadas de novo
+      depois de `retry_after` segundos.
+    """
+
+    def __init__(self, index_dir: str, pipeline: CoverPipeline, workers: int = 4, max_pending: int = 200,
+                 max_bytes: int = 5 * 1024 * 1024, timeout: float = 10, revalidate_after: float = 7 * 86400,
+                 retry_after: float = 3600):
+        self.index_dir = index_dir
+        self.pipeline = pipeline
+        self.max_pending = max_pending
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.revalidate_after = revalidate_after
+        self.retry_after = retry_after
+
+        self.session = make_session(workers)
+        self._executor = ThreadPoolExecutor(max(1, workers), thread_name_prefix="cover-mirror")
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: set = set()
+        os.makedirs(index_dir, exist_ok=True)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # ==========================================================
+    # 🗂️ Índice URL → capa local
+    # ==========================================================
+    def _index_path(self, url: str) -> str:
+        return os.path.join(self.index_dir, f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json")
+
+    def _remember(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[entry["url"]] = entry
+            self._entries.move_to_end(entry["url"])
+            if len(self._entries) > MAX_CACHED_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def entry(self, url: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(url)
+        if entry is None:
+            try:
+                with open(self._index_path(url), encoding="utf-8") as file:
+                    entry = json.load(file)
+            except (FileNotFoundError, ValueError):
+                return None
+            self._remember(entry)
+        return entry
+
+    def _save_entry(self, entry: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, self._index_path(entry["url"]))
+        self._remember(entry)
+
+    def mirrored_links(self) -> Iterator[str]:
+        """img_link local de todas as URLs espelhadas (lido do disco)."""
+        with os.scandir(self.index_dir) as entries:
+            for item in entries:
+                if not item.name.endswith(".json"):
+                    continue
+                try:
+                    with open(item.path, encoding="utf-8") as file:
+                        img_link = json.load(file).get("img_link")
+                except (OSError, ValueError):
+                    continue
+                if img_link:
+                    yield img_link
+
+    def _due(self, entry: Optional[Dict[str, Any]]) -> bool:
+        if entry is None:
+            return True
+        max_age = self.revalidate_after if entry.get("img_link") else self.retry_after
+        return time.time() - entry.get("checked_at", 0) > max_age
+
+    def is_due(self, url: str) -> bool:
+        """Nunca baixada, cópia mais velha que revalidate_after ou falha mais velha que retry_after."""
+        return self._due(self.entry(url))
+
+    # ==========================================================
+    # 🔁 Resolução no template
+    # ==========================================================
+    def resolve(self, img_link: Optional[str]) -> Optional[str]:
+        """img_link local da capa remota, ou None se ainda não foi baixada (agenda o download)."""
+        if not is_remote(img_link):
+            return None
+        entry = self.entry(img_link)
+        if self._due(entry):
+            self.schedule(img_link)
+        return entry.get("img_link") if entry else None
+
+    def schedule(self, url: str) -> bool:
+        with self._lock:
+            if url in self._pending or len(self._pending) >= self.max_pending:
+                return False  # fila cheia: a próxima exibição tenta de novo
+            self._pending.add(url)
+        self._executor.submit(self._fetch_in_background, url)
+        return True
+
+    def _fetch_in_background(self, url: str) -> None:
+        try:
+            self.fetch(url)
+        except Exception as e:
+            logger.exception(f"Erro ao espelhar capa {url}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    # ==========================================================
+    # 🌐 Download (condicional quando já existe cópia)
+    # ==========================================================
+    def fetch(self, url: str) -> Dict[str, Any]:
+        entry = dict(self.entry(url) or {"url": url})
+        headers = {}
+        # Sem o arquivo local (removido do storage) o download é completo, não condicional
+        if entry.get("img_link") and self.pipeline.exists(entry["img_link"]):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        entry["checked_at"] = time.time()
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304:
+                    COVER_MIRROR_FETCHES.inc("not_modified")
+                    entry.pop("error", None)
+                    self._save_entry(entry)
+                    return entry
+                response.raise_for_status()
+
+                # Recusa antes de baixar quando o servidor informa o tamanho
+                if int(response.headers.get("Content-Length") or 0) > self.max_bytes:
+                    raise CoverTooLarge(f"Content-Length {response.headers['Content-Length']}")
+                if not response.headers.get("Content-Type", "image/").startswith("image/"):
+                    raise InvalidCover(f"Content-Type {response.headers.get('Content-Type')}")
+
+                entry["img_link"] = self.pipeline.save_stream(_LimitedReader(response, self.max_bytes), MIRROR_FOLDER)
+                entry["etag"] = response.headers.get("ETag")
+                entry["last_modified"] = response.headers.get("Last-Modified")
+                entry.pop("error", None)
+                COVER_MIRROR_FETCHES.inc("fetched")
+        except Exception as e:
+            # Rede, HTTP, tamanho ou conteúdo inválido: mantém a cópia anterior (se houver)
+            # e só tenta de novo depois de retry_after
+            COVER_MIRROR_FETCHES.inc("failed")
+            entry["error"] = str(e)[:500]
+            logger.warning(f"Não foi possível espelhar a capa {url}: {e}")
+        self._save_entry(entry)
+        return entry
+
+
+# ==========================================================
+# 📚 Backfill (mirror_covers.py)
+# ==========================================================
+def backfill(force: bool = False, workers: int = 4,
+             on_progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """Espelha todas as capas externas do catálogo (as já atualizadas são puladas, exceto com force)."""
+    stats = {"total": 0, "skipped": 0, "mirrored": 0, "failed": 0}
+
+    def tally(futures) -> None:
+        for future in futures:
+            entry = future.result()
+            stats["failed" if entry.get("error") else "mirrored"] += 1
+        if on_progress:
+            on_progress(stats)
+
+    cover_mirror.session = make_session(workers)  # uma conexão por thread do backfill
+    with ThreadPoolExecutor(max(1, workers), thread_name_prefix="cover-backfill") as executor:
+        in_flight = set()
+        for url in Book.list_img_links("http://", "https://") or []:
+            stats["total"] += 1
+            if not force and not cover_mirror.is_due(url):
+                stats["skipped"] += 1
+                continue
+            in_flight.add(executor.submit(cover_mirror.fetch, url))
+            # Submissão limitada: não enfileira o catálogo inteiro de uma vez
+            if len(in_flight) >= workers * 4:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                tally(done)
+        tally(wait(in_flight).done)
+    return stats
+
+
+def init_app(app: Flask) -> None:
+    """Disponibiliza mirrored_cover(img_link) nos templates (COVER_MIRROR_ENABLED=False desliga)."""
+    if cover_mirror_config["enabled"]:
+        app.jinja_env.globals["mirrored_cover"] = cover_mirror.resolve
+    else:
+        app.jinja_env.globals["mirrored_cover"] = lambda img_link: None
+
+
+cover_mirror = CoverMirror(
+    cover_mirror_config["index_dir"],
+    cover_pipeline,
+    workers=cover_mirror_config["workers"],
+    max_pending=cover_mirror_config["max_pending"],
+    max_bytes=cover_mirror_config["max_bytes"],
+    timeout=cover_mirror_config["timeout"],
+    revalidate_after=cover_mirror_config["revalidate_after"],
+    retry_after=cover_mirror_config["retry_after"],
+)
@@ -0,0 +1,312 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from time import monotonic
+from typing import BinaryIO, Dict, Optional, Sequence, Set
+
+from flask import Flask
+from loguru import logger
+from PIL import Image, ImageOps
+from werkzeug.datastructures import FileStorage
+
+from config import cover_config
+from models.book import Book
+from services.metrics import COVER_PROCESS_LATENCY
+from services.storage import make_storage
+
+COVER_PREFIX = "cover_uploads/"
+
+# Formato detectado pelo Pillow → extensão do original
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+# Formatos das variantes: extensão → (formato do Pillow, opções de gravação)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"method": 4}),
+    "jpg": ("JPEG", {"optimize": True, "progressive": True}),
+}
+
+# Largura em que cada capa aparece na página (atributo sizes do srcset; ver books.css e book-details.css)
+SIZES = {
+    "thumb": "220px",
+    "detail": "(max-width: 900px) 250px, 450px",
+}
+
+# Uploads recentes lembrados para discard() (os mais antigos ficam para a varredura)
+MAX_FRESH = 1024
+
+
+class InvalidCover(ValueError):
+    """Arquivo enviado não é uma imagem suportada."""
+
+
+class CoverPipeline:
+    """
+    Capas enviadas no cadastro de livros.
+    - O original é gravado com o SHA-256 do conteúdo como nome: a mesma capa enviada
+      para vários livros ocupa um único arquivo.
+    - Variantes redimensionadas (grade e detalhes, 1x/2x) em WebP e JPEG são geradas
+      em threads fora do request; até ficarem prontas os templates usam o original.
+    - Capas antigas (nomes não derivados do hash) ganham variantes na primeira exibição.
+    - Os arquivos ficam no storage configurado (diretório local ou bucket S3).
+    - Capas gravadas ou reaproveitadas há menos de `release_grace` segundos nunca são removidas
+      por release(): um request ainda não confirmado pode estar apontando para elas.
+    """
+
+    def __init__(self, storage, widths: Dict[str, Sequence[int]], quality: int = 80, workers: int = 2,
+                 missing_ttl: float = 300, release_grace: float = 3600):
+        self.storage = storage
+        self.widths = {size: tuple(sorted(values)) for size, values in widths.items()}
+        self.quality = quality
+        self.missing_ttl = missing_ttl
+        self.release_grace = release_grace
+        self._executor = ThreadPoolExecutor(max(1, workers), thread_name_prefix="covers")
+        self._lock = threading.Lock()
+        self._files_lock = threading.Lock()  # gravação/reuso x remoção do mesmo arquivo
+        self._ready: Set[str] = set()
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()
+        self._missing: Dict[str, float] = {}  # nome → até quando (monotonic) não consultar o storage
+        self._fresh: "OrderedDict[str, Optional[float]]" = OrderedDict()  # criados aqui → data gravada
+
+    @property
+    def all_widths(self) -> Sequence[int]:
+        return sorted({width for values in self.widths.values() for width in values})
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @staticmethod
+    def name_of(img_link: Optional[str]) -> Optional[str]:
+        """Nome do arquivo local de uma capa ("cover_uploads/abc.jpg" → "abc.jpg"); None para URLs externas."""
+        if not img_link or not img_link.startswith(COVER_PREFIX):
+            return None
+        return img_link[len(COVER_PREFIX):] or None
+
+    def _variant_names(self, name: str):
+        stem = os.path.splitext(name)[0]
+        for width in self.all_widths:
+            for ext in VARIANT_FORMATS:
+                yield f"{stem}_{width}.{ext}"
+
+    # ==========================================================
+    # 📥 Upload
+    # ==========================================================
+    def save_upload(self, upload: FileStorage) -> str:
+        """Grava a capa enviada no formulário; retorna o img_link."""
+        return self.save_stream(upload.stream)
+
+    def save_stream(self, stream: BinaryIO, folder: str = "") -> str:
+        """
+        Grava a imagem (em blocos, calculando o hash) e agenda as variantes; retorna o img_link.
+        `folder` separa capas de origens diferentes (ex.: "mirror/") para que a remoção de uma
+        não apague o arquivo da outra.
+        """
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.storage.temp_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in iter(lambda: stream.read(64 * 1024), b""):
+                    digest.update(chunk)
+                    file.write(chunk)
+
+            # Só lê o cabeçalho: o formato vem do conteúdo, não da extensão enviada
+            try:
+                with Image.open(tmp_path) as image:
+                    ext = EXTENSIONS.get(image.format)
+            except Exception as e:
+                raise InvalidCover(f"Arquivo de capa inválido: {e}") from e
+            if not ext:
+                raise InvalidCover("Formato de capa não suportado (use JPEG, PNG, WebP ou GIF).")
+
+            name = f"{folder}{digest.hexdigest()}.{ext}"
+            with self._files_lock:
+                if self.storage.exists(name):
+                    # Capa repetida: reaproveita o arquivo (renovando a data, para a varredura e o
+                    # release() não o removerem) e deixa de ser descartável por quem o criou
+                    os.remove(tmp_path)
+                    self.storage.touch(name)
+                    self._fresh.pop(name, None)
+                else:
+                    self.storage.save_file(name, tmp_path)
+                    self._fresh[name] = self.storage.modified(name)
+                    while len(self._fresh) > MAX_FRESH:
+                        self._fresh.popitem(last=False)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.schedule(name)
+        return f"{COVER_PREFIX}{name}"
+
+    # ==========================================================
+    # 🖼️ Variantes redimensionadas
+    # ==========================================================
+    def schedule(self, name: str) -> None:
+        with self._lock:
+            if name in self._ready or name in self._pending or name in self._failed:
+                return
+            self._pending.add(name)
+        self._executor.submit(self._process, name)
+
+    def _process(self, name: str) -> None:
+        try:
+            with COVER_PROCESS_LATENCY.time(), self.storage.open(name) as file, Image.open(file) as image:
+                largest = self.all_widths[-1]
+                image.draft("RGB", (largest, largest * 2))  # JPEG: decodifica já reduzido
+                image = ImageOps.exif_transpose(image)
+                if image.mode in ("RGBA", "LA", "P"):
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                elif image.mode != "RGB":
+                    image = image.convert("RGB")
+
+                stem = os.path.splitext(name)[0]
+                for width in self.all_widths:
+                    # Nunca amplia: capas pequenas mantêm o tamanho original no nome da variante
+                    target = min(width, image.width)
+                    resized = image.resize((target, max(1, round(image.height * target / image.width))),
+                                           Image.LANCZOS)
+                    for ext, (fmt, options) in VARIANT_FORMATS.items():
+                        self._write(f"{stem}_{width}.{ext}", resized, fmt, options)
+            with self._lock:
+                self._ready.add(name)
+                self._missing.pop(name, None)
+        except Exception as e:
+            logger.exception(f"Erro ao gerar variantes da capa {name}: {e}")
+            with self._lock:
+                self._failed.add(name)
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def _write(self, name: str, image: Image.Image, fmt: str, options: Dict) -> None:
+        buffer = BytesIO()
+        image.save(buffer, fmt, quality=self.quality, **options)
+        buffer.seek(0)
+        self.storage.save(name, buffer)
+
+    def _has_variants(self, name: str) -> bool:
+        with self._lock:
+            if name in self._ready:
+                return True
+            if name in self._pending or name in self._failed:
+                return False
+            # Ausência consultada há pouco: não repete o HEAD (no S3) a cada card renderizado
+            if self._missing.get(name, 0) > monotonic():
+                return False
+        # A última variante gravada por _process: se existe, todas existem (uma consulta só)
+        if self.storage.exists(list(self._variant_names(name))[-1]):
+            with self._lock:
+                self._ready.add(name)
+                self._missing.pop(name, None)
+            return True
+        if self.storage.exists(name):
+            self.schedule(name)
+        else:
+            self._remember_missing(name)
+        return False
+
+    def _remember_missing(self, name: str) -> None:
+        now = monotonic()
+        with self._lock:
+            if len(self._missing) >= 10_000:
+                self._missing = {key: until for key, until in self._missing.items() if until > now}
+            self._missing[name] = now + self.missing_ttl
+
+    def variants(self, img_link: Optional[str], size: str = "thumb") -> Optional[Dict[str, str]]:
+        """
+        srcset das variantes WebP/JPEG de uma capa local para o template, ou None enquanto
+        não existirem (o template cai no original).
+        """
+        name = self.name_of(img_link)
+        if not name or not self._has_variants(name):
+            return None
+
+        stem = os.path.splitext(name)[0]
+
+        def srcset(ext: str) -> str:
+            return ", ".join(f"{self.storage.url(f'{stem}_{width}.{ext}')} {width}w" for width in self.widths[size])
+
+        return {
+            "webp": srcset("webp"),
+            "jpeg": srcset("jpg"),
+            "src": self.storage.url(f"{stem}_{self.widths[size][0]}.jpg"),
+            "sizes": SIZES[size],
+        }
+
+    def url(self, img_link: Optional[str]) -> Optional[str]:
+        """URL pública do original de uma capa local (URLs externas passam direto)."""
+        name = self.name_of(img_link)
+        return self.storage.url(name) if name else img_link
+
+    def exists(self, img_link: Optional[str]) -> bool:
+        name = self.name_of(img_link)
+        return bool(name) and self.storage.exists(name)
+
+    # ==========================================================
+    # 🗑️ Remoção
+    # ==========================================================
+    def release(self, img_link: Optional[str]) -> None:
+        """
+        Agenda (fora do request) a remoção de uma capa local (e variantes) que nenhum livro usa mais.
+        Capas gravadas ou reaproveitadas dentro de `release_grace` ficam para cover_gc.sweep.
+        """
+        name = self.name_of(img_link)
+        if name:
+            self._executor.submit(self._remove_if_unused, name, img_link)
+
+    def discard(self, img_link: Optional[str]) -> None:
+        """
+        Desfaz um save_upload cujo livro não foi gravado (UPC repetido, erro no banco): remove o
+        arquivo só se foi criado por este upload e ninguém o reaproveitou desde então.
+        """
+        name = self.name_of(img_link)
+        if name:
+            self._executor.submit(self._remove_if_unused, name, img_link, True)
+
+    def _remove_if_unused(self, name: str, img_link: str, discard: bool = False) -> None:
+        try:
+            # Mesmo lock da gravação: um reuso não acontece entre as verificações e a remoção
+            with self._files_lock:
+                modified = self.storage.modified(name)
+                if discard:
+                    # A data muda com o touch de um reuso (inclusive vindo de outro processo)
+                    if name not in self._fresh or self._fresh.pop(name) != modified:
+                        return
+                elif modified is not None and time.time() - modified < self.release_grace:
+                    # Reuso recente: o livro que aponta para ela pode ainda não ter sido confirmado
+                    return
+                # Capas são compartilhadas entre livros (mesmo hash): só remove sem referências
+                if Book.count_by_img_link(img_link) != 0:
+                    return
+                for filename in (name, *self._variant_names(name)):
+                    self.storage.delete(filename)
+            with self._lock:
+                self._ready.discard(name)
+        except Exception as e:
+            logger.exception(f"Erro ao remover capa {name}: {e}")
+
+
+def init_app(app: Flask) -> None:
+    """Disponibiliza cover_url(img_link) e cover_variants(img_link, size) nos templates."""
+    app.jinja_env.globals["cover_url"] = cover_pipeline.url
+    app.jinja_env.globals["cover_variants"] = cover_pipeline.variants
+
+
+cover_pipeline = CoverPipeline(
+    make_storage(cover_config),
+    {"thumb": cover_config["thumb_widths"], "detail": cover_config["detail_widths"]},
+    quality=cover_config["quality"],
+    workers=cover_config["workers"],
+    missing_ttl=cover_config["missing_ttl"],
+    release_grace=cover_config["release_grace"],
+)
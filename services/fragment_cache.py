@@ -0,0 +1,156 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic, perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from config import fragment_cache_config
+from services.metrics import FRAGMENT_CACHE, FRAGMENT_CACHE_SAVED
+
+
+@dataclass
+class Fragment:
+    html: str           # Markup quando o template usa autoescape (não é escapado de novo)
+    render_time: float  # segundos gastos na renderização original (economizados a cada hit)
+    size: int
+
+
+class LRUFragmentStore:
+    """
+    Fragmentos de HTML em memória do processo, limitados por total de bytes e por número
+    de entradas; ao estourar, sai o usado há mais tempo.
+    Qualquer objeto com get(key) / set(key, fragment) / clear() serve como store.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, max_entries: int = 20_000, ttl: float = 3600):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self._data: "OrderedDict[str, Tuple[float, Fragment]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Fragment]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < monotonic():
+                if item is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += item[1].render_time
+            return item[1]
+
+    def set(self, key: str, fragment: Fragment) -> None:
+        if fragment.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (monotonic() + self.ttl, fragment)
+            self.bytes += fragment.size
+            while self.bytes > self.max_bytes or len(self._data) > self.max_entries:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, fragment = self._data.pop(key)
+        self.bytes -= fragment.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "saved_seconds": round(self.saved_seconds, 4),
+            }
+
+
+def _key_part(value: Any) -> str:
+    # Entidades entram pelo id + updated_at + hash das colunas (cache_key); o resto pelo valor
+    return value.cache_key if hasattr(value, "cache_key") else repr(value)
+
+
+def fragment_key(template: str, name: str, parts: List[Any]) -> str:
+    digest = hashlib.sha256("\x1f".join(_key_part(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+    return f"{template}:{name}:{digest}"
+
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache "nome", entidade, outros valores... %} ... {% endcache %}
+
+    Guarda o HTML renderizado do bloco. A chave é o nome + os valores seguintes: entidades
+    (BookEntity, ReviewEntity...) contribuem com id, updated_at e um hash das colunas, então
+    editar um livro (mesmo duas vezes no mesmo segundo) só re-renderiza o card dele. Tudo o que o bloco exibe e pode mudar (papel do usuário logado,
+    capa resolvida...) precisa estar na chave.
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        parts = []
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        args = [nodes.Const(parser.name or "<string>"), name, nodes.List(parts)]
+        return nodes.CallBlock(self.call_method("_render", args), [], [], body).set_lineno(lineno)
+
+    def _render(self, template: str, name: str, parts: List[Any], caller) -> str:
+        store = self.environment.fragment_cache
+        if store is None:
+            return caller()
+
+        key = fragment_key(template, name, parts)
+        fragment = store.get(key)
+        if fragment is not None:
+            FRAGMENT_CACHE.inc(name, "hit")
+            FRAGMENT_CACHE_SAVED.inc(name, amount=fragment.render_time)
+            return fragment.html
+
+        FRAGMENT_CACHE.inc(name, "miss")
+        started = perf_counter()
+        html = caller()
+        store.set(key, Fragment(html, perf_counter() - started, len(html.encode("utf-8"))))
+        return html
+
+
+def init_app(app: Flask, store=None) -> None:
+    """Habilita {% cache %} nos templates (sem store configurado o bloco é sempre renderizado)."""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if fragment_cache_config["enabled"]:
+        app.jinja_env.fragment_cache = store or fragment_store
+
+
+fragment_store = LRUFragmentStore(
+    max_bytes=fragment_cache_config["max_bytes"],
+    max_entries=fragment_cache_config["max_entries"],
+    ttl=fragment_cache_config["ttl"],
+)
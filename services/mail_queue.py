@@ -0,0 +1,226 @@
+import json
+import os
+import smtplib
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from flask import Flask
+from flask_mail import Mail, Message
+from loguru import logger
+
+from config import mail_queue_config
+
+# Recusas de uma mensagem (destinatário/remetente inválido, 4xx/5xx no DATA, arquivo corrompido):
+# a conexão SMTP continua utilizável e só essa mensagem volta para a fila
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError,
+                  ValueError, KeyError)
+
+
+class MailQueue:
+    """
+    Fila de e-mails persistida em disco (spool) + pool de threads que entrega via SMTP.
+
+    - enqueue() grava a mensagem em `new/` e retorna na hora (o request não espera o SMTP).
+    - Cada worker "reivindica" um arquivo movendo-o para `processing/` (rename atômico,
+      seguro entre threads e processos) e reutiliza a mesma conexão SMTP enquanto houver fila.
+    - Falhas voltam para `new/` com backoff exponencial; depois de max_attempts vão para `failed/`.
+      Uma mensagem recusada não atrasa as outras; só erros de conexão pausam o worker.
+    - Mensagens presas em `processing/` (processo morto no meio do envio) são devolvidas
+      periodicamente, não só na inicialização.
+    """
+
+    def __init__(self, spool_dir: str, workers: int = 2, max_attempts: int = 5,
+                 backoff: float = 30, max_backoff: float = 3600, poll_interval: float = 5,
+                 stale_after: float = 600):
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.recover_interval = min(60.0, stale_after / 2)
+
+        self.app: Optional[Flask] = None
+        self.mail: Optional[Mail] = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._recover_lock = threading.Lock()
+        self._next_recover = 0.0
+
+        for folder in ("new", "processing", "failed"):
+            os.makedirs(os.path.join(spool_dir, folder), exist_ok=True)
+
+    def _path(self, folder: str, name: str = "") -> str:
+        return os.path.join(self.spool_dir, folder, name)
+
+    # ==========================================================
+    # 📥 Enfileiramento
+    # ==========================================================
+    def enqueue(self, subject: str, recipients: List[str], body: str,
+                html: Optional[str] = None, sender: Optional[str] = None) -> str:
+        message_id = uuid4().hex
+        payload = {
+            "id": message_id,
+            "subject": subject,
+            "recipients": recipients,
+            "body": body,
+            "html": html,
+            "sender": sender,
+            "attempts": 0,
+            "next_attempt_at": 0,
+        }
+        self._write("new", self._name_for(payload), payload)
+        self._wakeup.set()
+        return message_id
+
+    @staticmethod
+    def _name_for(payload: Dict[str, Any]) -> str:
+        # O nome começa pelo horário da próxima tentativa: a listagem ordenada já é a fila
+        return f"{payload['next_attempt_at']:017.6f}_{payload['id']}.json"
+
+    @staticmethod
+    def _due_at(name: str) -> float:
+        try:
+            return float(name.split("_", 1)[0])
+        except ValueError:
+            return 0.0
+
+    def _write(self, folder: str, name: str, payload: Dict[str, Any]) -> None:
+        # Grava em arquivo temporário e renomeia: um worker nunca lê JSON pela metade
+        tmp_path = self._path(folder, f".{name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(payload, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self._path(folder, name))
+
+    def depth(self) -> int:
+        """Mensagens aguardando entrega (inclui as que estão em backoff)."""
+        return sum(1 for name in os.listdir(self._path("new")) if name.endswith(".json"))
+
+    # ==========================================================
+    # 🚚 Entrega
+    # ==========================================================
+    def init_app(self, app: Flask, mail: Mail) -> None:
+        self.app = app
+        self.mail = mail
+        self._maybe_recover_stale()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"mail-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+
+    def _recover_stale(self) -> None:
+        # Mensagens presas em processing/ (processo morto no meio do envio) voltam para a fila.
+        # O mtime é o horário do claim (_claim faz utime): mensagens em envio não são tocadas
+        now = time.time()
+        for name in os.listdir(self._path("processing")):
+            path = self._path("processing", name)
+            try:
+                if name.endswith(".json") and now - os.path.getmtime(path) > self.stale_after:
+                    os.replace(path, self._path("new", name))
+            except FileNotFoundError:
+                continue  # entregue (ou recuperada por outro processo) nesse meio tempo
+
+    def _maybe_recover_stale(self) -> None:
+        # Um worker por vez, a cada recover_interval segundos
+        now = time.monotonic()
+        with self._recover_lock:
+            if now < self._next_recover:
+                return
+            self._next_recover = now + self.recover_interval
+        try:
+            self._recover_stale()
+        except OSError as e:
+            logger.warning(f"Erro ao recuperar e-mails presos em processing/: {e}")
+
+    def _claim(self) -> Optional[str]:
+        now = time.time()
+        for name in sorted(os.listdir(self._path("new"))):
+            if not name.endswith(".json"):
+                continue
+            if self._due_at(name) > now:
+                break  # as demais estão em backoff
+            try:
+                os.replace(self._path("new", name), self._path("processing", name))
+            except FileNotFoundError:
+                continue  # outro worker levou o arquivo primeiro
+            try:
+                # O rename preserva o mtime da gravação; sem isso, uma mensagem antiga pareceria
+                # abandonada no instante do claim e outro processo a reenviaria
+                os.utime(self._path("processing", name))
+            except FileNotFoundError:
+                continue
+            return name
+        return None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._maybe_recover_stale()
+            name = self._claim()
+            if name is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            # Abre uma conexão SMTP e a reaproveita enquanto houver mensagens prontas
+            try:
+                with self.app.app_context(), self.mail.connect() as connection:
+                    while name is not None and not self._stop.is_set():
+                        try:
+                            self._deliver(connection, name)
+                        except MESSAGE_ERRORS as e:
+                            logger.warning(f"E-mail {name} recusado: {e}")
+                            self._retry(name, str(e))
+                        self._maybe_recover_stale()
+                        name = self._claim()
+            except Exception as e:
+                logger.exception(f"Erro na conexão SMTP: {e}")
+                if name is not None:
+                    self._retry(name, str(e))
+                self._stop.wait(self.backoff)
+
+    def _deliver(self, connection, name: str) -> None:
+        path = self._path("processing", name)
+        with open(path, encoding="utf-8") as file:
+            payload = json.load(file)
+
+        message = Message(
+            subject=payload["subject"],
+            recipients=payload["recipients"],
+            body=payload["body"],
+            html=payload["html"],
+            sender=payload["sender"],
+        )
+        connection.send(message)
+        os.remove(path)
+
+    def _retry(self, name: str, error: str) -> None:
+        path = self._path("processing", name)
+        try:
+            with open(path, encoding="utf-8") as file:
+                payload = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+
+        payload["attempts"] += 1
+        payload["last_error"] = error
+        if payload["attempts"] >= self.max_attempts:
+            logger.error(f"E-mail {payload['id']} descartado após {payload['attempts']} tentativas: {error}")
+            self._write("failed", name, payload)
+        else:
+            delay = min(self.max_backoff, self.backoff * 2 ** (payload["attempts"] - 1))
+            payload["next_attempt_at"] = time.time() + delay
+            self._write("new", self._name_for(payload), payload)
+        os.remove(path)
+
+
+mail_queue = MailQueue(**mail_queue_config)
@@ -0,0 +1,316 @@
+import threading
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, abort, g, request
+from loguru import logger
+
+from config import metrics_config
+
+Labels = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _Shard:
+    """Valores escritos por uma única thread (sem lock no caminho quente)."""
+
+    __slots__ = ("values", "thread")
+
+    def __init__(self):
+        self.values: Dict[Tuple[str, Labels], Any] = {}
+        self.thread = weakref.ref(threading.current_thread())
+
+    @property
+    def alive(self) -> bool:
+        thread = self.thread()
+        return thread is not None and thread.is_alive()
+
+
+def _merge(target: Dict[Tuple[str, Labels], Any], values: Dict[Tuple[str, Labels], Any]) -> None:
+    for key, value in values.items():
+        if isinstance(value, list):
+            cell = target.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                cell[index] += item
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+class Registry:
+    """
+    Métricas no formato de exposição do Prometheus.
+    Cada thread incrementa o próprio shard; a soma entre threads só acontece no scrape.
+    Shards de threads encerradas (o servidor threaded cria uma por request) são
+    consolidados e descartados a cada nova thread e a cada coleta.
+    Desabilitado (METRICS_ENABLED=False), contadores e histogramas não guardam nada.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._retired: Dict[Tuple[str, Labels], Any] = {}
+        self._metrics: Dict[str, "Metric"] = {}
+
+    def values(self) -> Dict[Tuple[str, Labels], Any]:
+        try:
+            return self._local.values
+        except AttributeError:
+            shard = _Shard()
+            with self._lock:
+                # Sem scrape (ou com scrape raro) a lista não cresce uma entrada por request
+                self._retire_dead()
+                self._shards.append(shard)
+            self._local.values = shard.values
+            return shard.values
+
+    def _retire_dead(self) -> None:
+        """Consolida em _retired os shards de threads encerradas (chamar com _lock)."""
+        alive = []
+        for shard in self._shards:
+            if shard.alive:
+                alive.append(shard)
+            else:
+                _merge(self._retired, shard.values)
+        self._shards = alive
+
+    def snapshot(self) -> Dict[Tuple[str, Labels], Any]:
+        with self._lock:
+            self._retire_dead()
+            merged: Dict[Tuple[str, Labels], Any] = {}
+            _merge(merged, self._retired)
+            for shard in self._shards:
+                _merge(merged, dict(shard.values))
+        return merged
+
+    def _register(self, metric: "Metric") -> "Metric":
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> "Counter":
+        return self._register(Counter(self, name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> "Histogram":
+        return self._register(Histogram(self, name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, kind: str, labels: Sequence[str],
+                 collect: Callable[[], Dict[Labels, float]]) -> "Metric":
+        """Métrica lida no momento do scrape (ex.: estatísticas do pool, tamanho da fila)."""
+        return self._register(CallbackMetric(self, name, help, labels, kind, collect))
+
+    def render(self) -> str:
+        snapshot = self.snapshot()
+        by_name: Dict[str, Dict[Labels, Any]] = {}
+        for (name, labels), value in snapshot.items():
+            by_name.setdefault(name, {})[labels] = value
+
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(by_name.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: Registry, name: str, help: str, labels: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def samples(self, values: Dict[Labels, Any]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+                for labels, value in sorted(values.items())]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if not self.registry.enabled:
+            return
+        values = self.registry.values()
+        key = (self.name, labels)
+        values[key] = values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: Registry, name: str, help: str, labels: Sequence[str],
+                 buckets: Sequence[float]):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        values = self.registry.values()
+        key = (self.name, labels)
+        # [contagem por bucket..., +Inf, soma, total] (não cumulativo; acumulado no render)
+        cell = values.get(key)
+        if cell is None:
+            cell = values[key] = [0] * (len(self.buckets) + 3)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        if not self.registry.enabled:
+            yield
+            return
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started, *labels)
+
+    def samples(self, values: Dict[Labels, Any]) -> List[str]:
+        lines = []
+        for labels, cell in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), cell):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(cell[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cell[-1]}")
+        return lines
+
+
+class CallbackMetric(Metric):
+
+    def __init__(self, registry: Registry, name: str, help: str, labels: Sequence[str],
+                 kind: str, collect: Callable[[], Dict[Labels, float]]):
+        super().__init__(registry, name, help, labels)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self, values: Dict[Labels, Any]) -> List[str]:
+        try:
+            return super().samples(self.collect())
+        except Exception:
+            return []
+
+
+metrics = Registry(enabled=metrics_config["enabled"])
+
+# --- HTTP ---
+HTTP_REQUESTS = metrics.counter("http_requests_total", "Requests atendidos.", ("method", "endpoint", "status"))
+HTTP_LATENCY = metrics.histogram("http_request_duration_seconds", "Latência dos requests.", ("method", "endpoint"))
+RESPONSE_CACHE = metrics.counter("response_cache_total", "Páginas públicas servidas do cache, renderizadas ou sem cache.",
+                                 ("result",))
+FRAGMENT_CACHE = metrics.counter("fragment_cache_total", "Fragmentos de template servidos do cache ou renderizados.",
+                                 ("fragment", "result"))
+FRAGMENT_CACHE_SAVED = metrics.counter("fragment_cache_saved_seconds_total",
+                                       "Tempo de renderização economizado pelos fragmentos em cache.", ("fragment",))
+
+# --- Banco de dados (models/query_log.py) ---
+DB_QUERIES = metrics.counter("db_queries_total", "Comandos SQL executados.")
+DB_QUERY_LATENCY = metrics.histogram("db_query_duration_seconds", "Tempo de execução dos comandos SQL.")
+
+# --- Senhas, PDFs, capas ---
+BCRYPT_LATENCY = metrics.histogram("bcrypt_duration_seconds", "Tempo de hash/verificação bcrypt (inclui fila).",
+                                   ("operation",), buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5))
+PASSWORD_REJECTED = metrics.counter("password_hash_rejected_total", "Operações bcrypt recusadas por fila cheia.",
+                                    ("operation",))
+RATE_LIMITED = metrics.counter("rate_limited_total", "Requests recusados pelo rate limit.", ("limiter",))
+PDF_RENDER_LATENCY = metrics.histogram("pdf_render_duration_seconds", "Tempo de renderização das amostras em PDF.")
+PDF_SAMPLE_CACHE = metrics.counter("pdf_sample_cache_total", "Downloads de amostra servidos do cache ou renderizados.",
+                                   ("result",))
+COVER_PROCESS_LATENCY = metrics.histogram("cover_process_duration_seconds", "Tempo de geração das variantes de uma capa.",
+                                          buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+COVER_MIRROR_FETCHES = metrics.counter("cover_mirror_fetches_total", "Downloads de capas externas por resultado.",
+                                       ("result",))
+
+
+def _register_internals() -> None:
+    """Métricas lidas no scrape a partir das estatísticas que os módulos já mantêm."""
+    from models.cache import catalog_cache
+    from models.db import pool_stats
+    from models.suggest import suggest_index
+    from services.cover_mirror import cover_mirror
+    from services.covers import cover_pipeline
+    from services.fragment_cache import fragment_store
+    from services.mail_queue import mail_queue
+    from services.passwords import password_hasher
+
+    metrics.callback("db_pool_connections", "Conexões do pool por estado.", "gauge", ("state",),
+                     lambda: {(state,): pool_stats()[state] for state in ("in_use", "idle", "opened", "overflow")})
+    metrics.callback("db_pool_checkouts_total", "Conexões retiradas do pool.", "counter", (),
+                     lambda: {(): pool_stats()["checkouts"]})
+    metrics.callback("db_pool_timeouts_total", "Esperas por conexão que estouraram o timeout.", "counter", (),
+                     lambda: {(): pool_stats()["timeouts"]})
+    metrics.callback("db_pool_wait_seconds_total", "Tempo total esperando conexão do pool.", "counter", (),
+                     lambda: {(): pool_stats()["wait_time_total"]})
+    metrics.callback("cache_requests_total", "Consultas ao cache do catálogo.", "counter", ("result",),
+                     lambda: {("hit",): catalog_cache.stats()["hits"], ("miss",): catalog_cache.stats()["misses"]})
+    metrics.callback("fragment_cache_bytes", "Bytes de HTML no cache de fragmentos.", "gauge", (),
+                     lambda: {(): fragment_store.stats()["bytes"]})
+    metrics.callback("fragment_cache_evictions_total", "Fragmentos descartados por falta de espaço.", "counter", (),
+                     lambda: {(): fragment_store.stats()["evictions"]})
+    metrics.callback("suggest_index_entries", "Chaves no índice de autocomplete.", "gauge", (),
+                     lambda: {(): suggest_index.stats()["entries"]})
+    metrics.callback("password_hash_pending", "Operações bcrypt em execução ou na fila.", "gauge", (),
+                     lambda: {(): password_hasher.pending})
+    metrics.callback("cover_process_pending", "Capas aguardando geração das variantes.", "gauge", (),
+                     lambda: {(): cover_pipeline.pending})
+    metrics.callback("cover_mirror_pending", "Capas externas aguardando download.", "gauge", (),
+                     lambda: {(): cover_mirror.pending})
+    metrics.callback("mail_queue_depth", "E-mails aguardando entrega.", "gauge", (),
+                     lambda: {(): mail_queue.depth()})
+
+
+def init_app(app: Flask) -> None:
+    """Mede todos os requests e expõe /metrics (texto no formato do Prometheus)."""
+    if not metrics_config["enabled"]:
+        return
+    if not metrics_config["token"]:
+        logger.warning("/metrics habilitado sem METRICS_TOKEN: as métricas ficam acessíveis a qualquer um.")
+    _register_internals()
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            # Endpoint (nome da view) e não a URL: IDs na rota não explodem a cardinalidade
+            endpoint = request.endpoint or "unmatched"
+            HTTP_REQUESTS.inc(request.method, endpoint, str(response.status_code))
+            HTTP_LATENCY.observe(perf_counter() - started, request.method, endpoint)
+        return response
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        token: Optional[str] = metrics_config["token"]
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            abort(403)
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
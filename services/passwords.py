@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+from typing import Callable, Optional
+
+import bcrypt
+from loguru import logger
+
+from config import password_config
+from services.metrics import BCRYPT_LATENCY, PASSWORD_REJECTED
+
+
+class PasswordServiceBusy(Exception):
+    """Fila de hashing cheia: o request deve ser recusado (ex.: rajada de logins)."""
+
+
+# Executadas nos processos do pool (funções de módulo para poderem ser serializadas)
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def cost_of(hashed: str) -> Optional[int]:
+    """Fator de custo de um hash bcrypt ("$2b$12$..." → 12)."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    bcrypt fora da thread do request, em um pool de processos limitado (usa todos os núcleos).
+    - Controle de admissão: no máximo `max_pending` operações em execução/fila; quem não
+      consegue vaga em `queue_timeout` segundos recebe PasswordServiceBusy.
+    - Custo configurável; hashes com custo diferente são refeitos após um login válido.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_pending: int = 8, queue_timeout: float = 2.0):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._executor: Optional[Executor] = None
+        self._executor_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        # Gravação do hash refeito (banco) fora da thread que entrega os resultados do pool
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="password-rehash")
+
+    # --- pool ---
+    def _get_executor(self) -> Executor:
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = self._create_executor()
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _create_executor(self) -> Executor:
+        if self.workers and "fork" in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"))
+        # Sem fork (Windows) ou PASSWORD_WORKERS=0: threads (o bcrypt libera o GIL durante o hash)
+        return ThreadPoolExecutor(max(1, self.workers or os.cpu_count() or 1), thread_name_prefix="bcrypt")
+
+    def start(self) -> None:
+        """Sobe os processos já no boot, antes das threads da aplicação (fork seguro)."""
+        self._get_executor().submit(int).result()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _submit(self, operation: str, func: Callable, *args, blocking: bool = True) -> Future:
+        if not self._slots.acquire(timeout=self.queue_timeout if blocking else 0):
+            PASSWORD_REJECTED.inc(operation)
+            raise PasswordServiceBusy(f"Fila de hashing cheia ({self.max_pending} operações pendentes)")
+        with self._lock:
+            self._pending += 1
+        started = perf_counter()
+
+        def done(_future: Optional[Future]) -> None:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            BCRYPT_LATENCY.observe(perf_counter() - started, operation)
+
+        try:
+            try:
+                future = self._get_executor().submit(func, *args)
+            except BrokenProcessPool:
+                # Um processo do pool morreu: recria o pool e tenta de novo
+                logger.warning("Pool de hashing quebrado; recriando.")
+                with self._executor_lock:
+                    self._executor = None
+                future = self._get_executor().submit(func, *args)
+        except Exception:
+            done(None)
+            raise
+        future.add_done_callback(done)
+        return future
+
+    # --- API ---
+    def hash(self, password: str) -> str:
+        return self._submit("hash", _hashpw, password.encode("utf-8"), self.rounds).result().decode("utf-8")
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._submit("check", _checkpw, password.encode("utf-8"), hashed.encode("utf-8")).result()
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return cost_of(hashed) != self.rounds
+
+    def rehash_in_background(self, password: str, on_hashed: Callable[[str], None]) -> None:
+        """Refaz o hash com o custo atual sem atrasar o login; se a fila estiver cheia, fica para o próximo."""
+        try:
+            future = self._submit("hash", _hashpw, password.encode("utf-8"), self.rounds, blocking=False)
+        except PasswordServiceBusy:
+            return
+
+        def save(hashed: str) -> None:
+            try:
+                on_hashed(hashed)
+            except Exception as e:
+                logger.exception(f"Erro ao atualizar hash de senha: {e}")
+
+        def hand_off(done: Future) -> None:
+            # Roda na thread de resultados do pool, a mesma que libera todos os logins: só repassa
+            try:
+                self._writer.submit(save, done.result().decode("utf-8"))
+            except Exception as e:
+                logger.exception(f"Erro ao refazer hash de senha: {e}")
+
+        future.add_done_callback(hand_off)
+
+
+password_hasher = PasswordHasher(**password_config)
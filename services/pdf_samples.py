@@ -0,0 +1,121 @@
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+from typing import List
+
+from loguru import logger
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from config import sample_config
+from models.book import BookEntity
+from services.metrics import PDF_RENDER_LATENCY, PDF_SAMPLE_CACHE
+
+# Campos do livro desenhados por render_sample (a chave do cache muda quando qualquer um muda)
+RENDERED_FIELDS = ("title", "author", "description")
+
+
+# ==========================================================
+# 📄 Renderização do PDF de amostra
+# ==========================================================
+def render_sample(book: BookEntity, target) -> None:
+    """Desenha o PDF de amostra do livro em `target` (caminho ou arquivo aberto)."""
+    pdf = canvas.Canvas(target, pagesize=A4)
+    width, height = A4  # Dimensões da página
+
+    # ---------------------------------------------------------
+    # Página 1 — capa da amostra
+    # ---------------------------------------------------------
+
+    # Título do livro em destaque
+    pdf.setFont("Helvetica-Bold", 22)
+    pdf.drawCentredString(width / 2, height - 80, book.title)
+
+    # Autor do livro
+    pdf.setFont("Helvetica", 14)
+    pdf.drawCentredString(width / 2, height - 110, f"por {book.author}")
+
+    # Pequeno trecho da descrição do livro (limita a 100 caracteres)
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(50, height - 160, (book.description or "Nenhuma descrição disponível.")[:100])
+
+    # Avança para a próxima página
+    pdf.showPage()
+
+    # ---------------------------------------------------------
+    # Página 2 — início fictício do capítulo
+    # ---------------------------------------------------------
+
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(50, height - 60, "Capítulo 1")
+
+    # Texto da amostra gerado automaticamente
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(50, height - 100, "Este é apenas um trecho de amostra gerado automaticamente.")
+
+    # Finaliza e grava o conteúdo do PDF
+    pdf.save()
+
+
+# ==========================================================
+# 🗄️ Cache em disco dos PDFs renderizados
+# ==========================================================
+class SampleCache:
+    """
+    Guarda o PDF de cada livro em disco, com chave (id, hash dos campos exibidos).
+    Uma edição no livro gera uma nova chave (mesmo duas no mesmo segundo, que updated_at
+    não distingue); `invalidate` remove as versões antigas.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # Locks fixos compartilhados por hash do ID (o número de livros não faz a memória crescer)
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, book: BookEntity) -> str:
+        content = "\x1f".join(repr(getattr(book, name)) for name in RENDERED_FIELDS)
+        version = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"sample_{book.id}_{version}.pdf")
+
+    def _lock_for(self, book_id: str) -> threading.Lock:
+        return self._locks[hash(book_id) % self.LOCK_STRIPES]
+
+    def get_or_render(self, book: BookEntity) -> str:
+        """Retorna o caminho do PDF, renderizando apenas se ainda não existir."""
+        path = self.path_for(book)
+        if os.path.exists(path):
+            PDF_SAMPLE_CACHE.inc("hit")
+            return path
+
+        # Uma única renderização por livro mesmo com vários downloads simultâneos
+        with self._lock_for(book.id):
+            if os.path.exists(path):
+                PDF_SAMPLE_CACHE.inc("hit")
+                return path
+            PDF_SAMPLE_CACHE.inc("miss")
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as file, PDF_RENDER_LATENCY.time():
+                    render_sample(book, file)
+                os.replace(tmp_path, path)  # troca atômica: ninguém lê um PDF pela metade
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return path
+
+    def invalidate(self, book_id: str) -> None:
+        # O ID vem da URL: "*", "?" e "[" não podem virar curingas que casam com outros livros
+        for path in glob.glob(os.path.join(glob.escape(self.directory), f"sample_{glob.escape(book_id)}_*.pdf")):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Não foi possível remover amostra em cache {path}: {e}")
+
+
+sample_cache = SampleCache(sample_config["cache_dir"])
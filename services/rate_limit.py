@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, List, Tuple
+
+from flask import flash, render_template, request
+from loguru import logger
+
+from config import rate_limit_config
+from services.metrics import RATE_LIMITED
+
+# (contagem da janela anterior, contagem da janela atual, fração decorrida da janela atual)
+Window = Tuple[int, int, float]
+
+
+def _window(period: float) -> Tuple[int, float]:
+    now = time.time()
+    return int(now // period), (now % period) / period
+
+
+class LocalStore:
+    """
+    Contadores em memória do processo: O(1) por chave (índice da janela + duas contagens)
+    e no máximo `max_keys` chaves, descartando as usadas há mais tempo (LRU).
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._data: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str, index: int) -> List[int]:
+        entry = self._data.get(key)
+        if entry is None:
+            entry = self._data[key] = [index, 0, 0]
+            if len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+        else:
+            self._data.move_to_end(key)
+            if entry[0] != index:
+                # Avança a janela: a atual vira anterior (ou zera se passou mais de uma)
+                entry[1] = entry[2] if entry[0] == index - 1 else 0
+                entry[2] = 0
+                entry[0] = index
+        return entry
+
+    def incr(self, key: str, period: float, amount: int = 1) -> Window:
+        index, elapsed = _window(period)
+        with self._lock:
+            entry = self._entry(key, index)
+            entry[2] += amount
+            return entry[1], entry[2], elapsed
+
+    def get(self, key: str, period: float) -> Window:
+        index, elapsed = _window(period)
+        with self._lock:
+            if key not in self._data:
+                return 0, 0, elapsed
+            entry = self._entry(key, index)
+            return entry[1], entry[2], elapsed
+
+    def reset(self, key: str, period: float) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisStore:
+    """Contadores compartilhados entre processos/servidores (requer o pacote `redis`)."""
+
+    def __init__(self, url: str, prefix: str = "litscore:rl:"):
+        import redis  # dependência opcional, só necessária com RATE_LIMIT_REDIS_URL
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _keys(self, key: str, index: int) -> Tuple[str, str]:
+        return f"{self.prefix}{key}:{index - 1}", f"{self.prefix}{key}:{index}"
+
+    def incr(self, key: str, period: float, amount: int = 1) -> Window:
+        index, elapsed = _window(period)
+        previous_key, current_key = self._keys(key, index)
+        pipe = self.client.pipeline()
+        pipe.get(previous_key)
+        pipe.incrby(current_key, amount)
+        pipe.expire(current_key, int(period * 2) + 1)
+        previous, current, _ = pipe.execute()
+        return int(previous or 0), int(current), elapsed
+
+    def get(self, key: str, period: float) -> Window:
+        index, elapsed = _window(period)
+        previous, current = self.client.mget(self._keys(key, index))
+        return int(previous or 0), int(current or 0), elapsed
+
+    def reset(self, key: str, period: float) -> None:
+        self.client.delete(*self._keys(key, _window(period)[0]))
+
+
+class RateLimiter:
+    """
+    Janela deslizante aproximada com duas janelas fixas:
+    estimativa = anterior × (1 − fração decorrida) + atual.
+    """
+
+    def __init__(self, name: str, limit: int, period: float, store):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.store = store
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    @staticmethod
+    def _estimate(window: Window) -> float:
+        previous, current, elapsed = window
+        return previous * (1 - elapsed) + current
+
+    def allowed(self, key: str) -> bool:
+        """Consulta sem contar (ex.: antes de validar a senha, contando só as falhas)."""
+        return self._estimate(self.store.get(self._key(key), self.period)) < self.limit
+
+    def hit(self, key: str) -> bool:
+        """Conta uma tentativa e diz se ela ainda está dentro do limite."""
+        return self._estimate(self.store.incr(self._key(key), self.period)) <= self.limit
+
+    def reset(self, key: str) -> None:
+        self.store.reset(self._key(key), self.period)
+
+    def retry_after(self) -> int:
+        return max(1, int(self.period * (1 - _window(self.period)[1])))
+
+
+def _make_store():
+    if rate_limit_config["redis_url"]:
+        try:
+            return RedisStore(rate_limit_config["redis_url"])
+        except Exception as e:
+            logger.warning(f"Store Redis de rate limit indisponível, usando memória local: {e}")
+    return LocalStore(rate_limit_config["max_keys"])
+
+
+def client_ip() -> str:
+    if rate_limit_config["trust_proxy"] and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or "unknown"
+
+
+def rejected(limiter: RateLimiter, template: str, **context):
+    """Resposta 429 padrão (sem tocar no banco nem no bcrypt)."""
+    RATE_LIMITED.inc(limiter.name)
+    flash("Muitas tentativas. Aguarde alguns minutos e tente novamente.", "warning")
+    return render_template(template, **context), 429, {"Retry-After": str(limiter.retry_after())}
+
+
+def rate_limit(limiter: RateLimiter, template: str, key: Callable[[], str] = client_ip,
+               methods: Tuple[str, ...] = ("POST",), **context):
+    """Conta cada request da rota (por IP, por padrão) e recusa com 429 acima do limite."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method in methods and not limiter.hit(key()):
+                return rejected(limiter, template, **context)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_store = _make_store()
+
+login_ip_limiter = RateLimiter("login_ip", *rate_limit_config["login_ip"], _store)
+login_account_limiter = RateLimiter("login_account", *rate_limit_config["login_account"], _store)
+forgot_password_limiter = RateLimiter("forgot_password_ip", *rate_limit_config["forgot_password_ip"], _store)
+create_user_limiter = RateLimiter("create_user_ip", *rate_limit_config["create_user_ip"], _store)
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from flask import Response, make_response, request, session
+
+from config import response_cache_config
+from models.book import Book
+from models.cache import Cache, make_backend
+from services.metrics import RESPONSE_CACHE
+
+
+@dataclass
+class CachedPage:
+    body: bytes
+    mimetype: str
+    etag: str
+
+
+class _Call:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+
+
+class SingleFlight:
+    """
+    Uma única execução por chave entre as threads do processo: quem chega enquanto a
+    página está sendo renderizada espera e reaproveita o resultado (sem rajada de
+    consultas quando a versão muda e várias visitas encontram o cache vazio).
+    """
+
+    def __init__(self, timeout: float = 10):
+        self.timeout = timeout
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait(self.timeout)
+            return call.result  # None se a líder falhou ou demorou: quem espera renderiza sozinho
+
+        try:
+            call.result = compute()
+            return call.result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class ResponseCache:
+    """
+    Cache das páginas renderizadas para visitantes anônimos (todos veem o mesmo HTML).
+
+    - Chave: endpoint + argumentos da rota + os argumentos da query string que a view usa
+      para visitantes anônimos (declarados em `args`; os demais são ignorados, então
+      ?x=1, ?x=2... não criam entradas novas) + versão dos dados do catálogo
+      (Book.data_version); qualquer escrita em livros/avaliações troca a versão.
+    - ETag forte (hash do corpo): o navegador revalida e recebe 304 sem corpo.
+    - Fica de fora para usuários logados e quando há mensagens flash pendentes
+      (elas são consumidas na renderização).
+    """
+
+    def __init__(self, cache: Cache, ttl: float = 60, max_age: int = 0, enabled: bool = True):
+        self.enabled = enabled
+        self.cache = cache
+        self.ttl = ttl
+        self.max_age = max_age
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def cacheable_request() -> bool:
+        return request.method in ("GET", "HEAD") and not session.get("user") and not session.get("_flashes")
+
+    @staticmethod
+    def _key(kwargs: Dict[str, Any], args: Sequence[str]) -> str:
+        arguments = repr((sorted(kwargs.items()), [(name, request.args.getlist(name)) for name in args]))
+        digest = hashlib.sha256(arguments.encode("utf-8")).hexdigest()[:32]
+        return f"page:{request.endpoint}:{Book.data_version()}:{digest}"
+
+    @staticmethod
+    def _page(response: Response) -> Optional[CachedPage]:
+        # Só compartilha respostas completas que não mexeram na sessão
+        if response.status_code != 200 or response.direct_passthrough or session.modified:
+            return None
+        body = response.get_data()
+        return CachedPage(body, response.mimetype, hashlib.sha256(body).hexdigest()[:32])
+
+    def _respond(self, page: CachedPage) -> Response:
+        if request.if_none_match.contains(page.etag):
+            response = Response(status=304)
+        else:
+            response = Response(page.body, mimetype=page.mimetype)
+        response.set_etag(page.etag)
+        # no-cache: o navegador guarda, mas revalida a cada visita (304 barato); assim a
+        # mesma URL mostra a página do usuário logo depois do login
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}" if self.max_age else "public, no-cache"
+        response.vary.add("Cookie")
+        return response
+
+    def cached(self, view: Optional[Callable] = None, *, args: Sequence[str] = ()) -> Callable:
+        """
+        Decorator das views públicas (depois do @app.route): @response_cache.cached ou
+        @response_cache.cached(args=("q",)) quando a página anônima depende da query string.
+        """
+        if view is None:
+            return lambda view: self.cached(view, args=args)
+        if not self.enabled:
+            return view
+        query_args = tuple(sorted(args))
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.cacheable_request():
+                RESPONSE_CACHE.inc("bypass")
+                return view(*args, **kwargs)
+
+            key = self._key(kwargs, query_args)
+            rendered: Dict[str, Response] = {}
+
+            def render() -> Optional[CachedPage]:
+                rendered["response"] = make_response(view(*args, **kwargs))
+                return self._page(rendered["response"])
+
+            page = self.cache.get_or_set(key, lambda: self._flight.do(key, render), ttl=self.ttl)
+            if page is None:
+                RESPONSE_CACHE.inc("bypass")
+                return rendered["response"] if rendered else view(*args, **kwargs)
+
+            if rendered:
+                RESPONSE_CACHE.inc("miss")
+            elif request.if_none_match.contains(page.etag):
+                RESPONSE_CACHE.inc("not_modified")
+            else:
+                RESPONSE_CACHE.inc("hit")
+            return self._respond(page)
+
+        return wrapper
+
+
+response_cache = ResponseCache(
+    Cache(make_backend(response_cache_config["max_entries"], prefix="litscore:pages:"),
+          default_ttl=response_cache_config["ttl"]),
+    ttl=response_cache_config["ttl"],
+    max_age=response_cache_config["max_age"],
+    enabled=response_cache_config["enabled"],
+)
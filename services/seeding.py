@@ -0,0 +1,294 @@
+import random
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+import bcrypt
+from faker import Faker
+from loguru import logger
+
+from models.db import get_cursor
+
+CATEGORIES = [
+    "Fantasy", "Science Fiction", "Mystery", "Romance", "Horror", "Historical Fiction",
+    "Biography", "History", "Poetry", "Philosophy", "Science", "Travel", "Self Help",
+    "Business", "Childrens", "Young Adult", "Classics", "Humor", "Religion", "Art",
+]
+
+# Reservatório de IDs de usuários usados como autores das avaliações (memória limitada)
+USER_SAMPLE_SIZE = 200_000
+
+# Com --seed as datas são sorteadas antes deste instante fixo (e não de "agora")
+SEED_EPOCH = datetime(2025, 1, 1)
+
+_state: Dict[str, Any] = {}
+
+
+# ==========================================================
+# 🎲 Geração de dados (pools pré-gerados: Faker é lento demais por linha)
+# ==========================================================
+def _init_worker(seed: Optional[int], run: str, password_hash: str, user_ids: Sequence[str]) -> None:
+    """
+    Prepara os pools de nomes/textos do processo (chamado uma vez por worker).
+    Com semente, todos os workers montam pools idênticos; o sorteio de cada lote usa um
+    gerador derivado de (semente, fase, índice do lote) — ver _run_task.
+    """
+    rng = random.Random(seed)
+    fakers = [Faker("pt_BR"), Faker("en_US")]
+    for index, fake in enumerate(fakers):
+        fake.seed_instance(None if seed is None else seed + index)
+
+    _state.update(
+        seed=seed,
+        now=datetime.now() if seed is None else SEED_EPOCH,
+        rng=rng,
+        run=run,
+        password_hash=password_hash,
+        user_ids=user_ids,
+        names=[rng.choice(fakers).name() for _ in range(2000)],
+        user_names=[rng.choice(fakers).user_name() for _ in range(2000)],
+        titles=[fakers[1].catch_phrase() for _ in range(3000)],
+        paragraphs=[rng.choice(fakers).paragraph(nb_sentences=4) for _ in range(1000)],
+        comments=[rng.choice(fakers).sentence(nb_words=12) for _ in range(1000)],
+    )
+
+
+def _random_datetime(rng: random.Random, days: int = 3 * 365) -> datetime:
+    return _state["now"] - timedelta(seconds=rng.randrange(days * 86400))
+
+
+def _random_id(rng: random.Random) -> str:
+    # UUID v4 tirado do gerador do lote: com --seed, os mesmos IDs a cada execução
+    return str(UUID(int=rng.getrandbits(128), version=4))
+
+
+def _run_task(job: Tuple[str, Callable[[Any], int], int, Any]) -> int:
+    """Executa um lote com gerador próprio: o resultado não depende de qual worker o pegou."""
+    phase, func, index, task = job
+    seed = _state["seed"]
+    _state["rng"] = random.Random(None if seed is None else f"{seed}-{phase}-{index}")
+    return func(task)
+
+
+def _user_rows(start: int, count: int) -> List[Tuple]:
+    rng, run = _state["rng"], _state["run"]
+    rows = []
+    for n in range(start, start + count):
+        # Sufixo run+sequência garante username/email únicos sem consultar o banco
+        username = f"{rng.choice(_state['user_names'])}.{run}{n}"
+        created_at = _random_datetime(rng)
+        rows.append((_random_id(rng), username, _state["password_hash"], f"{username}@example.com",
+                     "user", created_at, created_at))
+    return rows
+
+
+def _book_rows(start: int, count: int) -> List[Tuple]:
+    rng, run = _state["rng"], _state["run"]
+    rows = []
+    for n in range(start, start + count):
+        created_at = _random_datetime(rng)
+        rows.append((_random_id(rng), f"SEED-{run}-{n:09d}", rng.choice(_state["titles"]),
+                     rng.choice(_state["names"]), None, rng.choice(_state["paragraphs"]),
+                     rng.choice(CATEGORIES), created_at, created_at))
+    return rows
+
+
+def _review_rows(book_ids: Sequence[str], count: int) -> List[Tuple]:
+    rng, user_ids = _state["rng"], _state["user_ids"]
+    # Popularidade desigual entre livros (poucos livros concentram muitas avaliações)
+    weights = [rng.expovariate(1.0) for _ in book_ids]
+    rows = []
+    for book_id in rng.choices(book_ids, weights=weights, k=count):
+        created_at = _random_datetime(rng)
+        rows.append((_random_id(rng), rng.choice(user_ids), book_id,
+                     rng.choices((1, 2, 3, 4, 5), weights=(5, 8, 20, 35, 32))[0],
+                     rng.choice(_state["comments"]), created_at, created_at))
+    return rows
+
+
+# ==========================================================
+# 💾 Escrita em lotes (uma transação por lote)
+# ==========================================================
+INSERT_SQL = {
+    "users": "INSERT INTO users (id, username, password, email, role, created_at, updated_at) "
+             "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+    "books": "INSERT INTO books (id, upc, title, author, img_link, description, category, created_at, updated_at) "
+             "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+    "reviews": "INSERT INTO reviews (id, user_id, book_id, rating, comment, created_at, updated_at) "
+               "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+}
+
+
+def _insert(table: str, rows: List[Tuple]) -> int:
+    # executemany com INSERT ... VALUES vira um único INSERT multi-linhas; get_cursor faz commit
+    with get_cursor(dictionary=False) as cursor:
+        cursor.executemany(INSERT_SQL[table], rows)
+    return len(rows)
+
+
+def _seed_users_task(task: Tuple[int, int]) -> int:
+    return _insert("users", _user_rows(*task))
+
+
+def _seed_books_task(task: Tuple[int, int]) -> int:
+    return _insert("books", _book_rows(*task))
+
+
+def _seed_reviews_task(task: Tuple[List[str], int]) -> int:
+    book_ids, count = task
+    return _insert("reviews", _review_rows(book_ids, count)) if count else 0
+
+
+def _update_authors_task(task: Tuple[List[str], List[str]]) -> int:
+    """Um UPDATE por lote com CASE, em vez de um UPDATE por livro."""
+    book_ids, authors = task
+    rng = _state["rng"]
+    cases = " ".join("WHEN %s THEN %s" for _ in book_ids)
+    params: List[str] = []
+    for book_id in book_ids:
+        params.extend((book_id, rng.choice(authors)))
+    placeholders = ", ".join(["%s"] * len(book_ids))
+    with get_cursor(dictionary=False) as cursor:
+        cursor.execute(
+            f"UPDATE books SET author = CASE id {cases} END WHERE id IN ({placeholders})",
+            (*params, *book_ids),
+        )
+    return len(book_ids)
+
+
+# ==========================================================
+# 🔁 Streaming de IDs e execução (um ou vários processos)
+# ==========================================================
+def stream_ids(table: str, chunk_size: int) -> Iterator[List[str]]:
+    """Percorre os IDs da tabela em blocos, sem carregar o resultado inteiro na memória."""
+    with get_cursor(dictionary=False) as cursor:
+        # Cursor sem buffer: as linhas vêm do servidor conforme fetchmany é chamado
+        cursor.execute(f"SELECT id FROM {table}")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [row[0] for row in rows]
+
+
+def sample_ids(table: str, size: int, rng: random.Random) -> List[str]:
+    """Amostra uniforme (reservoir sampling) de até `size` IDs em uma única passada."""
+    sample: List[str] = []
+    seen = 0
+    for chunk in stream_ids(table, 10_000):
+        for row_id in chunk:
+            seen += 1
+            if len(sample) < size:
+                sample.append(row_id)
+            else:
+                slot = rng.randrange(seen)
+                if slot < size:
+                    sample[slot] = row_id
+    return sample
+
+
+def _seeded_salt(seed: int, rounds: int = 12) -> bytes:
+    """Salt bcrypt derivado da semente (gensalt usa os.urandom e mudaria o hash a cada execução)."""
+    rng = random.Random(f"{seed}-salt")
+    alphabet = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    # 128 bits em 22 caracteres: o último só carrega 2 bits
+    chars = "".join(rng.choice(alphabet) for _ in range(21)) + rng.choice(".Oeu")
+    return f"$2b${rounds:02d}${chars}".encode("ascii")
+
+
+def _ranges(total: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, total, chunk_size):
+        yield start, min(chunk_size, total - start)
+
+
+class Seeder:
+    """
+    Gera dados sintéticos (usuários, livros, avaliações) em lotes, com um ou vários processos.
+    Cada lote é um INSERT multi-linhas com commit próprio; IDs existentes são lidos em streaming.
+    """
+
+    def __init__(self, workers: int = 1, chunk_size: int = 5000, seed: Optional[int] = None,
+                 password: str = "senha123",
+                 on_progress: Optional[Callable[[str, int, float], None]] = None):
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.seed = seed
+        # Sufixo dos usernames/UPCs gerados; com semente é fixo (rodar de novo no mesmo banco
+        # repete os mesmos valores únicos: use um banco limpo ou outra semente)
+        self.run = uuid4().hex[:6] if seed is None else f"{random.Random(seed).getrandbits(24):06x}"
+        self.rng = random.Random(seed)
+        self.on_progress = on_progress
+        # Um único hash para todos os usuários gerados (bcrypt por linha tornaria a carga inviável)
+        salt = bcrypt.gensalt() if seed is None else _seeded_salt(seed)
+        self.password_hash = bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+    def _execute(self, phase: str, func: Callable[[Any], int], tasks: Iterable[Any],
+                 user_ids: Sequence[str] = ()) -> int:
+        started = time.perf_counter()
+        done = 0
+        initargs = (self.seed, self.run, self.password_hash, user_ids)
+        jobs = ((phase, func, index, task) for index, task in enumerate(tasks))
+        if self.workers == 1:
+            _init_worker(*initargs)
+            results: Iterable[int] = map(_run_task, jobs)
+            pool = None
+        else:
+            pool = Pool(self.workers, initializer=_init_worker, initargs=initargs)
+            results = pool.imap_unordered(_run_task, jobs)
+        try:
+            for written in results:
+                done += written
+                if self.on_progress:
+                    self.on_progress(phase, done, time.perf_counter() - started)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        logger.info(f"{phase}: {done} linhas em {time.perf_counter() - started:.1f}s")
+        return done
+
+    def seed_users(self, count: int) -> int:
+        return self._execute("users", _seed_users_task, _ranges(count, self.chunk_size))
+
+    def seed_books(self, count: int) -> int:
+        return self._execute("books", _seed_books_task, _ranges(count, self.chunk_size))
+
+    def seed_reviews(self, count: int) -> int:
+        """Distribui `count` avaliações entre todos os livros existentes, por usuários existentes."""
+        if count <= 0:
+            return 0
+        user_ids = sample_ids("users", USER_SAMPLE_SIZE, self.rng)
+        with get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) AS total FROM books")
+            total_books = cursor.fetchone()["total"]
+        if not user_ids or not total_books:
+            raise ValueError("É preciso ter usuários e livros antes de gerar avaliações.")
+
+        def tasks() -> Iterator[Tuple[List[str], int]]:
+            # Cota de cada bloco proporcional ao número de livros (arredondamento acumulado = total exato)
+            books_seen = assigned = 0
+            for book_ids in stream_ids("books", self.chunk_size):
+                books_seen += len(book_ids)
+                quota = round(count * books_seen / total_books) - assigned
+                assigned += quota
+                for start in range(0, quota, self.chunk_size):
+                    yield book_ids, min(self.chunk_size, quota - start)
+
+        written = self._execute("reviews", _seed_reviews_task, tasks(), user_ids)
+        # Agregados de avaliações recalculados de uma vez (set-based)
+        from models.review import Review
+        Review.rebuild_book_stats()
+        return written
+
+    def randomize_authors(self, count: int = 50) -> int:
+        """Atribui a cada livro um autor aleatório dentre `count` nomes gerados."""
+        fakers = [Faker("pt_BR"), Faker("en_US")]
+        for index, fake in enumerate(fakers):
+            fake.seed_instance(None if self.seed is None else self.seed + index)
+        authors = [self.rng.choice(fakers).name() for _ in range(count)]
+        return self._execute(
+            "authors", _update_authors_task,
+            ((book_ids, authors) for book_ids in stream_ids("books", self.chunk_size)),
+        )
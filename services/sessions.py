@@ -0,0 +1,296 @@
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Flask, Request, Response
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from loguru import logger
+
+from config import session_config
+from models.db import get_cursor
+
+# (dados, expira em) — datas sempre em UTC sem timezone, como no MySQL
+Loaded = Tuple[Dict[str, Any], datetime]
+
+_serializer = TaggedJSONSerializer()  # o mesmo do cookie padrão do Flask (tuplas, datas, Markup...)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ==========================================================
+# 🗄️ Backends
+# ==========================================================
+class MySQLSessionStore:
+    """Tabela `sessions` (migração 0004); compartilhada por todos os workers e servidores."""
+
+    def load(self, sid: str) -> Optional[Loaded]:
+        with get_cursor() as cursor:
+            cursor.execute("SELECT data, expires_at FROM sessions WHERE id = %s AND expires_at > %s",
+                           (sid, _utcnow()))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        return _serializer.loads(bytes(row["data"]).decode("utf-8")), row["expires_at"]
+
+    def save(self, sid: str, data: Dict[str, Any], expires_at: datetime) -> None:
+        with get_cursor() as cursor:
+            cursor.execute(
+                """
+                    INSERT INTO sessions (id, data, expires_at) VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE data = VALUES(data), expires_at = VALUES(expires_at)
+                """, (sid, _serializer.dumps(data).encode("utf-8"), expires_at),
+            )
+
+    def touch(self, sid: str, expires_at: datetime) -> None:
+        with get_cursor() as cursor:
+            cursor.execute("UPDATE sessions SET expires_at = %s WHERE id = %s", (expires_at, sid))
+
+    def delete(self, sid: str) -> None:
+        with get_cursor() as cursor:
+            cursor.execute("DELETE FROM sessions WHERE id = %s", (sid,))
+
+    def cleanup(self, batch_size: int) -> int:
+        # Lote pequeno por transação: não segura locks da tabela por muito tempo
+        with get_cursor() as cursor:
+            cursor.execute("DELETE FROM sessions WHERE expires_at <= %s LIMIT %s", (_utcnow(), batch_size))
+            return cursor.rowcount
+
+
+class FileSessionStore:
+    """Um arquivo JSON por sessão; serve vários workers na mesma máquina (ex.: /dev/shm)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid: str) -> str:
+        return os.path.join(self.directory, f"{sid}.session")
+
+    def load(self, sid: str) -> Optional[Loaded]:
+        try:
+            with open(self._path(sid), encoding="utf-8") as file:
+                payload = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        expires_at = datetime.fromtimestamp(payload["expires_at"], timezone.utc).replace(tzinfo=None)
+        if expires_at <= _utcnow():
+            return None
+        return _serializer.loads(payload["data"]), expires_at
+
+    def save(self, sid: str, data: Dict[str, Any], expires_at: datetime) -> None:
+        payload = {"data": _serializer.dumps(data), "expires_at": expires_at.replace(tzinfo=timezone.utc).timestamp()}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(payload, file)
+        os.replace(tmp_path, self._path(sid))
+
+    def touch(self, sid: str, expires_at: datetime) -> None:
+        loaded = self.load(sid)
+        if loaded:
+            self.save(sid, loaded[0], expires_at)
+
+    def delete(self, sid: str) -> None:
+        try:
+            os.remove(self._path(sid))
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self, batch_size: int) -> int:
+        removed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if removed >= batch_size:
+                    break
+                if entry.name.endswith(".session"):
+                    sid = entry.name[:-len(".session")]
+                    if self.load(sid) is None:
+                        self.delete(sid)
+                        removed += 1
+                elif entry.name.endswith(".tmp") and time.time() - entry.stat().st_mtime > 3600:
+                    os.remove(entry.path)  # sobra de uma gravação interrompida
+        return removed
+
+
+# ==========================================================
+# 🍪 Sessão carregada sob demanda
+# ==========================================================
+class ServerSession(SessionMixin):
+    """
+    Só consulta o backend no primeiro acesso aos dados: requests que não usam a
+    sessão (arquivos estáticos, /metrics...) não geram leitura nem escrita.
+    """
+
+    def __init__(self, sid: str, loader: Optional[Callable[[str], Optional[Loaded]]] = None):
+        self.sid = sid
+        self.previous_sid: Optional[str] = None
+        self.expires_at: Optional[datetime] = None
+        self.new = loader is None
+        self.modified = False
+        self.accessed = False
+        self._loader = loader
+        self._data: Optional[Dict[str, Any]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        self.accessed = True
+        if self._data is None:
+            loaded = self._loader(self.sid) if self._loader else None
+            if loaded is None:
+                # Sessão inexistente/expirada: começa do zero com um ID novo
+                self._data, self.new = {}, True
+                if self._loader:
+                    self.sid = new_sid()
+            else:
+                self._data, self.expires_at = loaded
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key: str) -> None:
+        del self.data[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def regenerate(self) -> None:
+        """Troca o ID mantendo os dados (chamar no login: evita fixação de sessão)."""
+        self.data  # carrega antes de trocar o ID
+        if not self.new:
+            self.previous_sid = self.sid
+        self.sid = new_sid()
+        self.modified = True
+
+
+def new_sid() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def regenerate_session(session: SessionMixin) -> None:
+    """Novo ID de sessão após o login (no-op com o cookie padrão do Flask)."""
+    if isinstance(session, ServerSession):
+        session.regenerate()
+
+
+class ServerSessionInterface(SessionInterface):
+    """
+    Cookie com apenas o ID da sessão (assinado com a SECRET_KEY); dados no backend.
+    Expiração deslizante: cada uso renova o prazo para permanent_session_lifetime, mas a
+    renovação só é gravada quando passou mais de `refresh_interval` desde a última.
+    """
+
+    def __init__(self, store, refresh_interval: float = 300):
+        self.store = store
+        self.refresh_interval = timedelta(seconds=refresh_interval)
+
+    @staticmethod
+    def _signer(app: Flask) -> Signer:
+        return Signer(app.secret_key, salt="server-session")
+
+    def open_session(self, app: Flask, request: Request) -> ServerSession:
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                # Assinatura inválida nem chega ao backend
+                sid = self._signer(app).unsign(cookie).decode("utf-8")
+                return ServerSession(sid, self.store.load)
+            except BadSignature:
+                pass
+        return ServerSession(new_sid())
+
+    def save_session(self, app: Flask, session: ServerSession, response: Response) -> None:
+        if not session.loaded:
+            return  # sessão não usada neste request
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        response.vary.add("Cookie")
+
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            # Sessão esvaziada (logout): remove do backend e apaga o cookie
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        expires_at = _utcnow() + app.permanent_session_lifetime
+        if session.modified or session.new:
+            self.store.save(session.sid, dict(session), expires_at)
+        elif session.expires_at and expires_at - session.expires_at > self.refresh_interval:
+            self.store.touch(session.sid, expires_at)
+        else:
+            return  # nada mudou e a renovação ainda é recente: sem escrita e sem Set-Cookie
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid.encode("utf-8")).decode("utf-8"),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+# ==========================================================
+# 🧹 Limpeza periódica das sessões expiradas
+# ==========================================================
+def _cleanup_loop(store, interval: float, batch_size: int) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            total = 0
+            while True:
+                removed = store.cleanup(batch_size)
+                total += removed
+                if removed < batch_size:
+                    break
+                time.sleep(0.1)  # respiro entre lotes
+            if total:
+                logger.info(f"{total} sessões expiradas removidas")
+        except Exception as e:
+            logger.exception(f"Erro ao limpar sessões expiradas: {e}")
+
+
+def _make_store():
+    if session_config["backend"] == "file":
+        return FileSessionStore(session_config["file_dir"])
+    return MySQLSessionStore()
+
+
+def init_app(app: Flask) -> None:
+    """Troca o cookie assinado do Flask pela sessão no servidor (SESSION_BACKEND=cookie mantém o padrão)."""
+    if session_config["backend"] == "cookie":
+        return
+    store = _make_store()
+    app.session_interface = ServerSessionInterface(store, session_config["refresh_interval"])
+    threading.Thread(
+        target=_cleanup_loop, args=(store, session_config["cleanup_interval"], session_config["cleanup_batch"]),
+        name="session-cleanup", daemon=True,
+    ).start()
@@ -0,0 +1,216 @@
+import mimetypes
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from io import BytesIO
+from typing import BinaryIO, Iterator, Optional
+
+from flask import url_for
+
+CHUNK_SIZE = 64 * 1024
+
+# Nomes são imutáveis (derivados do hash do conteúdo): o navegador pode guardar para sempre
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@dataclass
+class StoredFile:
+    name: str        # relativo à raiz do storage ("abc.jpg", "mirror/def_240.webp")
+    size: int
+    modified: float  # timestamp
+
+
+class LocalStorage:
+    """
+    Arquivos em um diretório local. Dentro de views/static são servidos pelo próprio Flask
+    (url_for('static')); fora dele, por quem publicar `public_url` (nginx, CDN...).
+    """
+
+    def __init__(self, directory: str, static_prefix: str = "cover_uploads/", public_url: Optional[str] = None):
+        self.directory = directory
+        self.static_prefix = static_prefix
+        self.public_url = public_url.rstrip("/") + "/" if public_url else None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def temp_dir(self) -> str:
+        # Mesmo sistema de arquivos do destino: o rename final é atômico
+        return self.directory
+
+    def _path(self, name: str) -> str:
+        path = os.path.normpath(os.path.join(self.directory, name))
+        if not path.startswith(os.path.normpath(self.directory) + os.sep):
+            raise ValueError(f"Nome de arquivo inválido: {name}")
+        return path
+
+    def save(self, name: str, stream: BinaryIO) -> int:
+        """Grava em blocos em um temporário e troca pelo definitivo (ninguém lê um arquivo pela metade)."""
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                shutil.copyfileobj(stream, file, CHUNK_SIZE)
+                size = file.tell()
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return size
+
+    def save_file(self, name: str, local_path: str) -> None:
+        """Move para o storage um arquivo já gravado em temp_dir."""
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(local_path, path)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def touch(self, name: str) -> None:
+        os.utime(self._path(name))
+
+    def modified(self, name: str) -> Optional[float]:
+        """Data da última gravação/touch (None se o arquivo não existe)."""
+        try:
+            return os.stat(self._path(name)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def open(self, name: str) -> BinaryIO:
+        return open(self._path(name), "rb")
+
+    def delete(self, name: str) -> None:
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def list(self) -> Iterator[StoredFile]:
+        for root, _dirs, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                yield StoredFile(name, stat.st_size, stat.st_mtime)
+
+    def url(self, name: str) -> str:
+        if self.public_url:
+            return self.public_url + name
+        return url_for("static", filename=f"{self.static_prefix}{name}")
+
+
+class S3Storage:
+    """
+    Bucket S3 ou compatível (MinIO, R2...; requer o pacote `boto3`).
+    Um objeto só fica visível quando o upload termina, então as gravações já são atômicas.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "cover_uploads/", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, public_url: Optional[str] = None):
+        import boto3  # dependência opcional, só necessária com COVER_STORAGE=s3
+
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.bucket = bucket
+        self.prefix = prefix
+        if public_url:
+            self.public_url = public_url.rstrip("/") + "/"
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}/{prefix}"
+        else:
+            self.public_url = f"https://{bucket}.s3.amazonaws.com/{prefix}"
+
+    @property
+    def temp_dir(self) -> Optional[str]:
+        return None  # temporários no diretório padrão do sistema
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    @staticmethod
+    def _extra_args(name: str) -> dict:
+        return {
+            "ContentType": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "CacheControl": IMMUTABLE_CACHE_CONTROL,
+        }
+
+    def save(self, name: str, stream: BinaryIO) -> int:
+        # upload_fileobj lê em partes (multipart acima de 8 MB): o arquivo não é carregado inteiro
+        counter = _CountingReader(stream)
+        self.client.upload_fileobj(counter, self.bucket, self._key(name), ExtraArgs=self._extra_args(name))
+        return counter.total
+
+    def save_file(self, name: str, local_path: str) -> None:
+        try:
+            self.client.upload_file(local_path, self.bucket, self._key(name), ExtraArgs=self._extra_args(name))
+        finally:
+            os.remove(local_path)
+
+    def exists(self, name: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def modified(self, name: str) -> Optional[float]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(name))["LastModified"].timestamp()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def touch(self, name: str) -> None:
+        # Copia o objeto sobre ele mesmo só para renovar o LastModified (protege da varredura)
+        self.client.copy_object(
+            Bucket=self.bucket, Key=self._key(name), CopySource={"Bucket": self.bucket, "Key": self._key(name)},
+            MetadataDirective="REPLACE", **self._extra_args(name),
+        )
+
+    def open(self, name: str) -> BinaryIO:
+        # O Pillow precisa de seek: a imagem (alguns MB no máximo) vem inteira para a memória
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(name))["Body"]
+        return BytesIO(body.read())
+
+    def delete(self, name: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+    def list(self) -> Iterator[StoredFile]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                yield StoredFile(item["Key"][len(self.prefix):], item["Size"], item["LastModified"].timestamp())
+
+    def url(self, name: str) -> str:
+        return self.public_url + name
+
+
+class _CountingReader:
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.total = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.total += len(data)
+        return data
+
+
+def make_storage(config: dict):
+    """Storage escolhido por COVER_STORAGE ("local" ou "s3")."""
+    if config["backend"] == "s3":
+        return S3Storage(config["s3_bucket"], prefix=config["s3_prefix"], endpoint_url=config["s3_endpoint_url"],
+                         region=config["s3_region"], public_url=config["public_url"])
+    return LocalStorage(config["upload_dir"], public_url=config["public_url"])
@@ -0,0 +1,27 @@
+import argparse
+
+from services.cover_gc import sweep
+
+
+# Reconcilia o storage das capas (cover_uploads/) com books.img_link: remove originais e
+# variantes que nenhum livro usa e temporários de gravações interrompidas.
+#   python sweep_covers.py --dry-run
+#   python sweep_covers.py --grace 86400
+parser = argparse.ArgumentParser(description="Remove capas órfãs do storage.")
+parser.add_argument("--grace", type=float, default=3600, help="mantém arquivos mais novos que N segundos")
+parser.add_argument("--dry-run", action="store_true", help="só lista o que seria removido")
+args = parser.parse_args()
+
+
+def report(stats):
+    print(
+        f"\r{stats['scanned']} arquivos | {stats['kept']} em uso | "
+        f"{stats['removed']} {'órfãos' if args.dry_run else 'removidos'} "
+        f"({stats['bytes_removed'] / 1024 / 1024:.1f} MB)",
+        end="", flush=True,
+    )
+
+
+result = sweep(grace=args.grace, dry_run=args.dry_run, on_progress=report)
+report(result)
+print()
@@ -0,0 +1,37 @@
+// search-suggest.js — autocomplete de título/autor na busca do catálogo
+const searchInput = document.querySelector('.book-search[data-suggest-url]');
+const suggestionList = document.getElementById('book-suggestions');
+
+if (searchInput && suggestionList) {
+  let timer = null;
+  let controller = null;
+
+  searchInput.addEventListener('input', () => {
+    clearTimeout(timer);
+    const query = searchInput.value.trim();
+    if (query.length < 2) {
+      suggestionList.innerHTML = '';
+      return;
+    }
+
+    // espera o usuário parar de digitar e cancela a requisição anterior
+    timer = setTimeout(async () => {
+      if (controller) controller.abort();
+      controller = new AbortController();
+      try {
+        const url = `${searchInput.dataset.suggestUrl}?q=${encodeURIComponent(query)}`;
+        const response = await fetch(url, { signal: controller.signal });
+        const data = await response.json();
+        suggestionList.innerHTML = '';
+        data.suggestions.forEach((item) => {
+          const option = document.createElement('option');
+          option.value = item.text;
+          option.label = item.kind === 'author' ? 'Autor' : 'Título';
+          suggestionList.appendChild(option);
+        });
+      } catch (e) {
+        if (e.name !== 'AbortError') console.error(e);
+      }
+    }, 120);
+  });
+}